@@ -3,9 +3,13 @@ Módulo para implementar búsqueda AJAX en Streamlit
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
+import re
 import time
 
+from src.database.busqueda import normalizar, normalizar_serie
+
 def setup_ajax_search():
     """
     Configura el CSS y JavaScript necesario para la búsqueda AJAX
@@ -54,123 +58,165 @@ def setup_ajax_search():
     </style>
     """, unsafe_allow_html=True)
 
-def create_ajax_search(df, search_columns, placeholder="Buscar...", key_prefix="ajax_search"):
+# Separador entre columnas para que una búsqueda no coincida a caballo entre dos de ellas
+_SEPARADOR_COLUMNAS = "\x1f"
+
+def huella_datos(df, search_columns):
     """
-    Crea un campo de búsqueda con comportamiento AJAX
+    Calcula una huella de los datos de búsqueda que cambia cuando cambia su contenido
     
     Args:
         df: DataFrame con los datos
-        search_columns: Lista de columnas donde buscar
-        placeholder: Texto de placeholder para el campo de búsqueda
-        key_prefix: Prefijo para las claves de estado de sesión
+        search_columns: Columnas donde se busca
         
     Returns:
-        DataFrame filtrado según la búsqueda
+        Entero que identifica la versión de los datos
     """
-    # Configurar estado de sesión
-    if f'{key_prefix}_original_df' not in st.session_state:
-        st.session_state[f'{key_prefix}_original_df'] = df.copy()
-    
-    if f'{key_prefix}_filtered_df' not in st.session_state:
-        st.session_state[f'{key_prefix}_filtered_df'] = df.copy()
+    columnas = [col for col in search_columns if col in df.columns]
+    return int(pd.util.hash_pandas_object(df[columnas], index=True).sum())
+
+@st.cache_resource(max_entries=16)
+def _texto_busqueda(_df, search_columns, key_prefix, data_version):
+    """
+    Texto normalizado por fila compartido por todas las sesiones
     
-    if f'{key_prefix}_query' not in st.session_state:
-        st.session_state[f'{key_prefix}_query'] = ""
+    Se construye una vez por versión de los datos (el DataFrame no forma parte
+    de la clave para no tener que hashearlo) y es de solo lectura.
+    """
+    columnas = [col for col in search_columns if col in _df.columns]
+    if not columnas:
+        return pd.Series("", index=_df.index)
+    texto = normalizar_serie(_df[columnas[0]].fillna(""))
+    for col in columnas[1:]:
+        texto = texto + _SEPARADOR_COLUMNAS + normalizar_serie(_df[col].fillna(""))
+    return texto
+
+def create_ajax_search(df, search_columns, placeholder="Buscar...", key_prefix="ajax_search", data_version=None):
+    """
+    Crea un campo de búsqueda con comportamiento AJAX
     
-    if f'{key_prefix}_last_update' not in st.session_state:
-        st.session_state[f'{key_prefix}_last_update'] = time.time()
+    Cada sesión solo guarda la consulta y las posiciones de las filas que
+    coinciden; los datos y su texto normalizado se comparten entre sesiones.
     
-    # Función de callback para actualizar resultados
-    def update_search_results():
-        query = st.session_state[f'{key_prefix}_query'].lower()
-        if not query:
-            st.session_state[f'{key_prefix}_filtered_df'] = st.session_state[f'{key_prefix}_original_df'].copy()
-        else:
-            # Crear máscara combinando todas las columnas de búsqueda
-            mask = pd.Series(False, index=st.session_state[f'{key_prefix}_original_df'].index)
-            for col in search_columns:
-                if col in st.session_state[f'{key_prefix}_original_df'].columns:
-                    # Convertir columna a string para buscar
-                    col_str = st.session_state[f'{key_prefix}_original_df'][col].astype(str).str.lower()
-                    mask = mask | col_str.str.contains(query, na=False)
-            
-            # Aplicar filtro
-            st.session_state[f'{key_prefix}_filtered_df'] = st.session_state[f'{key_prefix}_original_df'][mask].copy()
+    Args:
+        df: DataFrame con los datos, que no se modifica (idealmente compartido mediante una caché del proceso)
+        search_columns: Lista de columnas donde buscar
+        placeholder: Texto de placeholder para el campo de búsqueda
+        key_prefix: Prefijo para las claves de estado de sesión
+        data_version: Versión de los datos (por defecto se calcula con huella_datos)
         
-        # Actualizar timestamp
-        st.session_state[f'{key_prefix}_last_update'] = time.time()
+    Returns:
+        DataFrame filtrado según la búsqueda
+    """
+    if data_version is None:
+        data_version = huella_datos(df, search_columns)
+    texto = _texto_busqueda(df, tuple(search_columns), key_prefix, data_version)
     
     # Campo de búsqueda con estilo AJAX
     st.text_input(
         placeholder,
         key=f'{key_prefix}_query',
-        on_change=update_search_results,
         help="Escribe para filtrar resultados en tiempo real"
     )
+    consulta = st.session_state[f'{key_prefix}_query']
+    query = normalizar(consulta)
+    
+    # Recalcular las posiciones solo si cambian la consulta o los datos
+    estado = st.session_state.get(f'{key_prefix}_state')
+    if estado is None or estado["query"] != query or estado["version"] != data_version:
+        inicio = time.perf_counter()
+        posiciones = None
+        if query:
+            posiciones = np.flatnonzero(texto.str.contains(query, regex=False).to_numpy())
+        estado = {
+            "query": query,
+            "version": data_version,
+            "positions": posiciones,
+            "response_ms": round((time.perf_counter() - inicio) * 1000)
+        }
+        st.session_state[f'{key_prefix}_state'] = estado
     
     # Mostrar indicador de búsqueda activa
-    if st.session_state[f'{key_prefix}_query']:
-        st.caption(f"🔍 Buscando: '{st.session_state[f'{key_prefix}_query']}'")
+    if consulta:
+        st.caption(f"🔍 Buscando: '{consulta}'")
         
         # Mostrar tiempo de respuesta
-        response_time = round((time.time() - st.session_state[f'{key_prefix}_last_update']) * 1000)
-        st.caption(f"⚡ Tiempo de respuesta: {response_time}ms")
+        st.caption(f"⚡ Tiempo de respuesta: {estado['response_ms']}ms")
     
     # Devolver DataFrame filtrado
-    return st.session_state[f'{key_prefix}_filtered_df']
+    if estado["positions"] is None:
+        return df
+    return df.iloc[estado["positions"]]
+
+# Variantes acentuadas de cada letra (en minúscula) para resaltar sin distinguir acentos
+_VARIANTES_LETRA = {}
+for _codigo in range(0xC0, 0x250):
+    _caracter = chr(_codigo)
+    _base = normalizar(_caracter)
+    if len(_base) == 1 and _base != _caracter.lower():
+        _VARIANTES_LETRA.setdefault(_base, set()).add(_caracter.lower())
+
+def compilar_patron_resaltado(search_query):
+    """
+    Compila la búsqueda a una expresión regular escapada que no distingue mayúsculas ni acentos
+    
+    Args:
+        search_query: Término de búsqueda
+        
+    Returns:
+        Patrón compilado o None si la búsqueda está vacía
+    """
+    query = normalizar(search_query or "")
+    if not query:
+        return None
+    
+    partes = []
+    for caracter in query:
+        variantes = _VARIANTES_LETRA.get(caracter)
+        if variantes:
+            partes.append("[" + re.escape(caracter + "".join(sorted(variantes))) + "]")
+        else:
+            partes.append(re.escape(caracter))
+    # El texto puede venir descompuesto (letra + tilde combinante)
+    return re.compile("".join(p + "[\u0300-\u036f]*" for p in partes), re.IGNORECASE)
 
-def highlight_search_results(df, text_columns, search_query, key_prefix="ajax_search"):
+def highlight_search_results(df, text_columns, search_query=None, key_prefix="ajax_search", start=0, max_rows=None):
     """
     Resalta los términos de búsqueda en el DataFrame
     
+    La búsqueda se compila una sola vez y se aplica por columnas con
+    str.replace, solo sobre las filas que se van a mostrar.
+    
     Args:
         df: DataFrame filtrado
         text_columns: Columnas de texto donde resaltar
-        search_query: Término de búsqueda
+        search_query: Término de búsqueda (por defecto el de la sesión de key_prefix)
         key_prefix: Prefijo para las claves de estado de sesión
+        start: Posición de la primera fila que se muestra
+        max_rows: Número de filas que se muestran (None para todas desde start)
         
     Returns:
-        DataFrame con los términos resaltados
+        DataFrame con las filas mostradas y los términos resaltados
     """
-    if not st.session_state.get(f'{key_prefix}_query'):
+    if start or max_rows is not None:
+        df = df.iloc[start:None if max_rows is None else start + max_rows]
+    
+    if search_query is None:
+        search_query = st.session_state.get(f'{key_prefix}_query')
+    patron = compilar_patron_resaltado(search_query)
+    if patron is None:
         return df
     
-    # Crear copia para no modificar el original
+    # Crear copia para no modificar el original (solo de las filas mostradas)
     highlighted_df = df.copy()
     
-    # Función para resaltar texto
-    def highlight_text(text):
-        if not isinstance(text, str):
-            return text
-        
-        query = st.session_state[f'{key_prefix}_query'].lower()
-        if query in text.lower():
-            # Encontrar todas las ocurrencias sin distinguir mayúsculas/minúsculas
-            start = 0
-            result = ""
-            text_lower = text.lower()
-            
-            while start < len(text):
-                pos = text_lower.find(query, start)
-                if pos == -1:
-                    result += text[start:]
-                    break
-                
-                # Añadir texto antes de la coincidencia
-                result += text[start:pos]
-                
-                # Añadir texto resaltado
-                result += f"<span class='highlight'>{text[pos:pos+len(query)]}</span>"
-                
-                # Actualizar posición
-                start = pos + len(query)
-            
-            return result
-        return text
-    
-    # Aplicar resaltado a columnas de texto
+    # Aplicar resaltado a columnas de texto; las celdas que no son texto se conservan
     for col in text_columns:
         if col in highlighted_df.columns:
-            highlighted_df[col] = highlighted_df[col].apply(highlight_text)
+            columna = highlighted_df[col]
+            if not pd.api.types.is_object_dtype(columna) and not pd.api.types.is_string_dtype(columna):
+                continue
+            resaltada = columna.str.replace(patron, r"<span class='highlight'>\g<0></span>", regex=True)
+            highlighted_df[col] = resaltada.where(resaltada.notna(), columna)
     
     return highlighted_df
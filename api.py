@@ -1,24 +1,60 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-import sqlite3
 import pandas as pd
 from datetime import datetime
+from typing import List, Optional
 
-app = FastAPI(title="API Sistema de Gestión de Agentes")
+from src.api.cache_respuestas import invalidar_cache
+from src.api.condicional import comprobar_no_modificado
+from src.api.detalle import router as router_detalle
+from src.api.exportar import router as router_exportar
+from src.api.lotes import router as router_lotes
+from src.api.respuestas import NIVEL_GZIP, TAMANO_MINIMO_GZIP, ListaJSONResponse
+from src.database.asistencia import guardar_asistencias
+from src.database.pool import DATABASE_PATH, get_pool
+from src.database.pragmas import verificar_pragmas
+from src.database.migraciones import asegurar_esquema
 
-# Función para obtener la conexión a la base de datos
+# Las respuestas se codifican con orjson
+app = FastAPI(title="API Sistema de Gestión de Agentes", default_response_class=ORJSONResponse)
+
+# Comprimir con gzip las respuestas grandes si el cliente lo admite
+app.add_middleware(GZipMiddleware, minimum_size=TAMANO_MINIMO_GZIP, compresslevel=NIVEL_GZIP)
+
+# Endpoints de escritura por lotes (POST /agentes/bulk, POST /actividades/{id}/agentes/bulk, PATCH /asistencia/bulk)
+app.include_router(router_lotes)
+
+# Exportación en streaming como NDJSON o CSV (GET /export/{tabla})
+app.include_router(router_exportar)
+
+# Actividades con sus agentes asignados (GET /actividades/detalle)
+app.include_router(router_detalle)
+
+# Comprobar al arrancar los PRAGMAs activos y aplicar las migraciones pendientes
+@app.on_event("startup")
+def preparar_base_datos():
+    verificar_pragmas(DATABASE_PATH)
+    asegurar_esquema(DATABASE_PATH)
+
+# Función para obtener la conexión a la base de datos (close() la devuelve al pool)
 def get_db_connection():
-    conn = sqlite3.connect('sistema_agentes.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool(DATABASE_PATH).checkout()
+
+# Los endpoints son funciones síncronas: FastAPI las ejecuta en su pool de hilos,
+# así una consulta lenta a SQLite no bloquea el bucle de eventos ni al resto de
+# peticiones (python -m src.api.concurrencia lo comprueba con carga). Los listados
+# devuelven ya su ListaJSONResponse para que la serialización se haga en el hilo
+# del endpoint, por bloques, y no en el bucle de eventos
 
 # Rutas de la API
 @app.get("/")
-async def root():
+def root():
     return {"message": "API del Sistema de Gestión de Agentes"}
 
 @app.get("/actividades")
-async def get_actividades():
+def get_actividades(request: Request):
     """Obtiene todas las actividades ordenadas por fecha en orden cronológico ascendente"""
     conn = get_db_connection()
     query = """
@@ -28,19 +64,29 @@ async def get_actividades():
         t.nombre as turno, 
         c.nombre as curso,
         a.monitor_nip,
-        (SELECT nombre || ' ' || apellido1 FROM agentes WHERE nip = a.monitor_nip) as monitor_nombre,
-        a.notas
+        m.nombre || ' ' || m.apellido1 as monitor_nombre,
+        a.notas,
+        r.total_agentes,
+        r.asistencia_confirmada,
+        r.asistencia_pendiente
     FROM actividades a
-    JOIN turnos t ON a.turno_id = t.id
+    JOIN resumen_actividades r ON r.actividad_id = a.id
+    JOIN turno t ON a.turno_id = t.id
     JOIN cursos c ON a.curso_id = c.id
+    LEFT JOIN monitores m ON a.monitor_nip = m.nip
     ORDER BY a.fecha ASC
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df.to_dict(orient="records")
+    try:
+        validadores = comprobar_no_modificado(
+            request, conn, "actividades", "agentes_actividades", "turno", "cursos", "monitores"
+        )
+        df = pd.read_sql_query(query, conn)
+    finally:
+        conn.close()
+    return ListaJSONResponse(content=df.to_dict(orient="records"), headers=validadores.cabeceras)
 
 @app.get("/agentes")
-async def get_agentes():
+def get_agentes(request: Request):
     """Obtiene todos los agentes"""
     conn = get_db_connection()
     query = """
@@ -55,12 +101,15 @@ async def get_agentes():
     FROM agentes a
     ORDER BY a.seccion, a.grupo, a.apellido1, a.nombre
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df.to_dict(orient="records")
+    try:
+        validadores = comprobar_no_modificado(request, conn, "agentes")
+        df = pd.read_sql_query(query, conn)
+    finally:
+        conn.close()
+    return ListaJSONResponse(content=df.to_dict(orient="records"), headers=validadores.cabeceras)
 
 @app.get("/agentes_por_actividad/{actividad_id}")
-async def get_agentes_por_actividad(actividad_id: int):
+def get_agentes_por_actividad(actividad_id: int, request: Request):
     """Obtiene los agentes asignados a una actividad específica"""
     conn = get_db_connection()
     query = """
@@ -78,9 +127,12 @@ async def get_agentes_por_actividad(actividad_id: int):
     WHERE aa.actividad_id = ?
     ORDER BY a.seccion, a.grupo, a.apellido1, a.nombre
     """
-    df = pd.read_sql_query(query, conn, params=(actividad_id,))
-    conn.close()
-    return df.to_dict(orient="records")
+    try:
+        validadores = comprobar_no_modificado(request, conn, "agentes_actividades", "agentes")
+        df = pd.read_sql_query(query, conn, params=(actividad_id,))
+    finally:
+        conn.close()
+    return ListaJSONResponse(content=df.to_dict(orient="records"), headers=validadores.cabeceras)
 
 # Modelo para la asistencia
 class AsistenciaUpdate(BaseModel):
@@ -89,7 +141,7 @@ class AsistenciaUpdate(BaseModel):
     asistencia: int
 
 @app.post("/actualizar_asistencia")
-async def actualizar_asistencia(data: AsistenciaUpdate):
+def actualizar_asistencia(data: AsistenciaUpdate):
     """Actualiza la asistencia de un agente a una actividad"""
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -99,8 +151,38 @@ async def actualizar_asistencia(data: AsistenciaUpdate):
             (data.asistencia, data.agente_nip, data.actividad_id)
         )
         conn.commit()
+        invalidar_cache("agentes_actividades")
         return {"success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al actualizar asistencia: {str(e)}")
     finally:
         conn.close()
+
+
+# Modelos para la asistencia de toda una actividad
+class AsistenciaAgente(BaseModel):
+    agente_nip: str
+    asistencia: Optional[int] = None
+
+class AsistenciaActividad(BaseModel):
+    actividad_id: int
+    asistencias: List[AsistenciaAgente]
+
+@app.post("/actualizar_asistencia_actividad")
+def actualizar_asistencia_actividad(data: AsistenciaActividad):
+    """Actualiza en una sola transacción la asistencia de varios agentes de una actividad"""
+    conn = get_db_connection()
+    try:
+        actualizadas = guardar_asistencias(
+            conn,
+            data.actividad_id,
+            [(item.agente_nip, item.asistencia) for item in data.asistencias]
+        )
+        invalidar_cache("agentes_actividades")
+        return {"success": True, "actualizadas": actualizadas}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar asistencia: {str(e)}")
+    finally:
+        conn.close()
@@ -2,10 +2,33 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import sqlite3
 import os
+import time
 from datetime import datetime, timedelta
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode
+from src.database.pool import DATABASE_PATH, get_pool
+from src.database.pragmas import verificar_pragmas
+from src.database.analisis import con_estado, construir_analisis, fecha_referencia, filtrar_analisis
+from src.database.asignaciones import asignar_agentes, nips_por_seccion_grupo
+from src.database.asistencia import guardar_asistencias
+from src.database.busqueda import LIMITE_RESULTADOS, buscar_agentes, construir_consulta_fts
+from src.database.cubo import (
+    actividades_por_curso,
+    actividades_por_estado,
+    asistencia_por_dia,
+    consultar_cubo,
+    cubo_desde_tablas,
+    filtrar_cubo,
+    metricas_cubo,
+)
+from src.database.dashboard import consultar_actividades, consultar_rango_fechas
+from src.database.migraciones import asegurar_esquema
+from src.database.paginacion import (
+    CONSULTA_ACTIVIDADES, CONSULTA_AGENTES, CONSULTA_MONITORES, TAMANO_PAGINA, TAMANOS_PAGINA,
+    filtros_actividades, filtros_agentes
+)
+from src.utils.etiquetas import IndiceEtiquetas
+from src.utils.table_cache import cache_tablas, invalidar_tablas, recurso_tablas
 
 # Configuración de la página
 st.set_page_config(
@@ -20,29 +43,17 @@ st.set_page_config(
     }
 )
 
-# Conectar a SQLite
+# Conectar a SQLite mediante el pool compartido por todas las sesiones
 @st.cache_resource
 def init_connection():
-    return sqlite3.connect('sistema_agentes.db', check_same_thread=False)
+    # Informar una sola vez por proceso de los PRAGMAs activos y aplicar las migraciones pendientes
+    verificar_pragmas(DATABASE_PATH)
+    asegurar_esquema(DATABASE_PATH)
+    return get_pool(DATABASE_PATH)
 
-conn = init_connection()
-
-# Función para obtener la conexión a la base de datos
+# Función para obtener la conexión a la base de datos (close() la devuelve al pool)
 def get_db_connection():
-    conn = sqlite3.connect('sistema_agentes.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# Función auxiliar para filtrar agentes por búsqueda
-def filtrar_agentes_por_busqueda(df, busqueda):
-    if not busqueda:
-        return df
-    
-    busqueda_lower = busqueda.lower()
-    return df[
-        df['nip'].astype(str).str.contains(busqueda_lower) | 
-        df['nombre_completo'].str.lower().str.contains(busqueda_lower)
-    ]
+    return init_connection().checkout()
 
 # Función para estandarizar el formato de fechas a DD/MM/YYYY
 def date_input_es(label, value=None, min_value=None, max_value=None, key=None):
@@ -70,32 +81,34 @@ def format_date_es(date):
     else:
         return date
 
-# Función auxiliar para filtrar agentes por búsqueda
-def filtrar_agentes_por_busqueda(df, busqueda):
+# Función auxiliar para filtrar agentes por búsqueda usando el índice FTS5
+def filtrar_agentes_por_busqueda(df, busqueda, limite=LIMITE_RESULTADOS):
+    """Devuelve las filas de df que coinciden con la búsqueda, ordenadas por relevancia"""
     if not busqueda:
         return df
     
-    busqueda_lower = busqueda.lower()
-    mask = (
-        df["nip"].str.lower().str.contains(busqueda_lower) | 
-        df["nombre_completo"].str.lower().str.contains(busqueda_lower)
-    )
-    return df[mask]
+    resultados = get_busqueda_agentes(busqueda, limite)
+    if resultados is None:
+        return df
+    
+    # Posiciones en df (que puede venir ya filtrado) de los resultados, en el orden del índice
+    posiciones = pd.Index(df["nip"]).get_indexer(resultados["nip"])
+    return df.iloc[posiciones[posiciones >= 0]]
 
-# Función para actualizar la búsqueda de agentes (callback)
-def actualizar_busqueda_agentes():
-    # Esta función se llama cuando cambia el texto de búsqueda
-    st.session_state.agentes_filtrados_busqueda = filtrar_agentes_por_busqueda(
-        st.session_state.agentes_df_original, 
-        st.session_state.texto_busqueda_agentes
-    )
+# Función para limpiar la búsqueda de agentes (callback, se ejecuta antes de dibujar el buscador)
+def limpiar_busqueda_agentes():
+    st.session_state.texto_busqueda_agentes = ""
 
 # Funciones para obtener datos
-@st.cache_data(ttl=300)
+@cache_tablas("actividades", ttl=300)
 def get_actividades():
-    return pd.read_sql_query("SELECT * FROM actividades", conn)
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query("SELECT * FROM actividades", conn)
+    finally:
+        conn.close()
 
-@st.cache_data(ttl=300)
+@cache_tablas("agentes", ttl=300)
 def get_agentes():
     conn = get_db_connection()
     query = """
@@ -113,11 +126,15 @@ def get_agentes():
     conn.close()
     return df
 
-@st.cache_data(ttl=300)
+@cache_tablas("agentes_actividades", ttl=300)
 def get_agentes_actividades():
-    return pd.read_sql_query("SELECT * FROM agentes_actividades", conn)
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query("SELECT * FROM agentes_actividades", conn)
+    finally:
+        conn.close()
 
-@st.cache_data(ttl=300)
+@cache_tablas("cursos", ttl=300)
 def get_cursos(incluir_ocultos=False):
     conn = get_db_connection()
     try:
@@ -145,6 +162,7 @@ def toggle_ocultar_curso(curso_id, ocultar=True):
             (1 if ocultar else 0, curso_id)
         )
         conn.commit()
+        invalidar_tablas("cursos")
         return True
     except Exception as e:
         st.error(f"Error al modificar visibilidad del curso: {e}")
@@ -168,6 +186,7 @@ def delete_curso(curso_id):
         # Si no hay actividades, eliminar el curso
         cursor.execute("DELETE FROM cursos WHERE id = ?", (curso_id,))
         conn.commit()
+        invalidar_tablas("cursos")
         return True, "Curso eliminado correctamente"
     except Exception as e:
         st.error(f"Error al eliminar curso: {e}")
@@ -175,7 +194,7 @@ def delete_curso(curso_id):
     finally:
         conn.close()
 
-@st.cache_data(ttl=300)
+@cache_tablas("monitores", ttl=300)
 def get_monitores():
     conn = get_db_connection()
     query = """
@@ -191,13 +210,75 @@ def get_monitores():
     conn.close()
     return df
 
-@st.cache_data(ttl=300)
+@cache_tablas("turno", ttl=300)
 def get_turnos():
-    return pd.read_sql_query("SELECT * FROM turno", conn)
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query("SELECT * FROM turno", conn)
+    finally:
+        conn.close()
+
+# Búsqueda de agentes en el índice FTS5, sin distinguir mayúsculas ni acentos
+@cache_tablas("agentes", ttl=300)
+def get_busqueda_agentes(texto, limite=LIMITE_RESULTADOS):
+    conn = get_db_connection()
+    try:
+        return buscar_agentes(conn, texto, limite)
+    finally:
+        conn.close()
 
-@st.cache_data(ttl=300)
-def get_vista_actividades_con_agentes():
-    return pd.read_sql_query("SELECT * FROM vista_actividades_con_agentes", conn)
+# Índices clave→etiqueta para los selectores, construidos una vez por versión de cada tabla
+@cache_tablas("agentes", ttl=300)
+def get_indice_agentes():
+    agentes_df = get_agentes()
+    return IndiceEtiquetas(agentes_df["nip"], agentes_df["nombre_completo"], formato="{clave} - {etiqueta}")
+
+@cache_tablas("monitores", ttl=300)
+def get_indice_monitores():
+    monitores_df = get_monitores()
+    return IndiceEtiquetas(monitores_df["nip"], monitores_df["nombre_completo"], formato="{clave} - {etiqueta}")
+
+@cache_tablas("cursos", ttl=300)
+def get_indice_cursos():
+    # Incluye los cursos ocultos para poder mostrar también su nombre
+    cursos_df = get_cursos(incluir_ocultos=True)
+    return IndiceEtiquetas(cursos_df["id"], cursos_df["nombre"])
+
+@cache_tablas("turno", ttl=300)
+def get_indice_turnos():
+    turnos_df = get_turnos()
+    return IndiceEtiquetas(turnos_df["id"], turnos_df["nombre"])
+
+# Rango de fechas con actividades para el selector del dashboard
+@cache_tablas("actividades", ttl=300)
+def get_rango_fechas_actividades():
+    conn = get_db_connection()
+    try:
+        return consultar_rango_fechas(conn)
+    finally:
+        conn.close()
+
+# Actividades del dashboard con los filtros aplicados en SQL; la fecha de
+# referencia del estado forma parte de la clave de caché
+@cache_tablas("actividades", "agentes_actividades", "cursos", "turno", "monitores", ttl=300)
+def get_dashboard_actividades(fecha_inicio, fecha_fin, curso, turno, estado, hoy):
+    conn = get_db_connection()
+    try:
+        return consultar_actividades(
+            conn, hoy=hoy, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, curso=curso, turno=turno, estado=estado
+        )
+    finally:
+        conn.close()
+
+# Cubo de agregados por día, curso y turno para los gráficos y las métricas
+# (no depende del día: el estado se añade al usarlo)
+@cache_tablas("actividades", "agentes_actividades", "cursos", "turno", ttl=300)
+def get_cubo_dashboard():
+    conn = get_db_connection()
+    try:
+        return consultar_cubo(conn)
+    finally:
+        conn.close()
 
 # Función para obtener detalles de una actividad específica
 def get_actividad_detalle(actividad_id):
@@ -233,7 +314,7 @@ def get_actividad_detalle(actividad_id):
         conn.close()
 
 # Función para obtener actividades con detalles adicionales
-@st.cache_data(ttl=300)
+@cache_tablas("actividades", "agentes_actividades", "cursos", "turno", "monitores", ttl=300)
 def get_actividades_detalle():
     conn = get_db_connection()
     query = """
@@ -266,6 +347,7 @@ def add_curso(nombre, descripcion=""):
     try:
         cursor.execute("INSERT INTO cursos (nombre, descripcion) VALUES (?, ?)", (nombre, descripcion))
         conn.commit()
+        invalidar_tablas("cursos")
         return True
     except Exception as e:
         st.error(f"Error al añadir curso: {e}")
@@ -288,6 +370,7 @@ def add_actividad(fecha, turno_id, monitor_nip, curso_id, notas=None):
         st.write(f"Debug - ID generado: {actividad_id}")
         conn.commit()
         st.write("Debug - Commit realizado")
+        invalidar_tablas("actividades")
         return True, actividad_id
     except Exception as e:
         st.error(f"Error al añadir actividad: {e}")
@@ -297,7 +380,7 @@ def add_actividad(fecha, turno_id, monitor_nip, curso_id, notas=None):
         conn.close()
 
 # Función para obtener los agentes asignados a una actividad
-@st.cache_data(ttl=300)
+@cache_tablas("agentes", "agentes_actividades", ttl=300)
 def get_agentes_por_actividad(actividad_id):
     """Obtiene los agentes asignados a una actividad específica"""
     conn = get_db_connection()
@@ -324,31 +407,55 @@ def get_agentes_por_actividad(actividad_id):
 def asignar_agente_actividad(agente_nip, actividad_id, asistencia=None):
     """Asigna un agente a una actividad"""
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        # Verificar si ya existe la asignación
-        cursor.execute(
-            "SELECT COUNT(*) FROM agentes_actividades WHERE actividad_id = ? AND agente_nip = ?",
-            (actividad_id, agente_nip)
-        )
-        count = cursor.fetchone()[0]
-        
-        if count == 0:
-            # Insertar nueva asignación
-            cursor.execute(
-                "INSERT INTO agentes_actividades (actividad_id, agente_nip, asistencia) VALUES (?, ?, ?)",
-                (actividad_id, agente_nip, asistencia if asistencia is not None else 0)
-            )
-            conn.commit()
-            return True
-        else:
-            return False  # Ya existe la asignación
+        anadidos, _ = asignar_agentes(conn, actividad_id, [agente_nip], asistencia if asistencia is not None else 0)
+        if anadidos:
+            invalidar_tablas("agentes_actividades")
+        return anadidos > 0  # False si ya existía la asignación
     except Exception as e:
         st.error(f"Error al asignar agente a actividad: {e}")
         return False
     finally:
         conn.close()
 
+# Texto con el resultado de una asignación por lotes
+def resumen_asignacion(anadidos, ya_asignados):
+    mensaje = f"{anadidos} agentes añadidos a la actividad"
+    if ya_asignados:
+        mensaje += f" ({ya_asignados} ya estaban asignados)"
+    return mensaje
+
+# Función para asignar varios agentes a una actividad en una transacción
+def asignar_agentes_actividad(agente_nips, actividad_id, asistencia=0):
+    """Asigna varios agentes a una actividad y devuelve (éxito, mensaje)"""
+    conn = get_db_connection()
+    try:
+        anadidos, ya_asignados = asignar_agentes(conn, actividad_id, agente_nips, asistencia)
+        if anadidos:
+            invalidar_tablas("agentes_actividades")
+        return True, resumen_asignacion(anadidos, ya_asignados)
+    except Exception as e:
+        return False, f"Error al asignar agentes a la actividad: {e}"
+    finally:
+        conn.close()
+
+# Función para asignar todos los agentes de una sección y/o grupo a una actividad
+def asignar_seccion_grupo_actividad(seccion, grupo, actividad_id, asistencia=0):
+    """Asigna a una actividad los agentes de una sección y grupo y devuelve (éxito, mensaje)"""
+    conn = get_db_connection()
+    try:
+        nips = nips_por_seccion_grupo(conn, seccion, grupo)
+        if not nips:
+            return False, "No hay agentes en la sección y grupo seleccionados"
+        anadidos, ya_asignados = asignar_agentes(conn, actividad_id, nips, asistencia)
+        if anadidos:
+            invalidar_tablas("agentes_actividades")
+        return True, resumen_asignacion(anadidos, ya_asignados)
+    except Exception as e:
+        return False, f"Error al asignar agentes a la actividad: {e}"
+    finally:
+        conn.close()
+
 # Función para eliminar un agente de una actividad
 def desasignar_agente_actividad(agente_nip, actividad_id):
     """Elimina un agente de una actividad"""
@@ -360,6 +467,7 @@ def desasignar_agente_actividad(agente_nip, actividad_id):
             (actividad_id, agente_nip)
         )
         conn.commit()
+        invalidar_tablas("agentes_actividades")
         return True
     except Exception as e:
         st.error(f"Error al eliminar agente de actividad: {e}")
@@ -378,6 +486,7 @@ def actualizar_asistencia_agente(actividad_id, agente_nip, asistencia):
             (asistencia, actividad_id, agente_nip)
         )
         conn.commit()
+        invalidar_tablas("agentes_actividades")
         return True
     except Exception as e:
         st.error(f"Error al actualizar asistencia: {e}")
@@ -385,6 +494,24 @@ def actualizar_asistencia_agente(actividad_id, agente_nip, asistencia):
     finally:
         conn.close()
 
+# Textos de asistencia de la tabla editable y su valor en la base de datos
+TEXTO_A_ASISTENCIA = {"✅ Confirmada": 1, "❌ No confirmada": 0, "❓ Pendiente": None}
+ASISTENCIA_A_TEXTO = {valor: texto for texto, valor in TEXTO_A_ASISTENCIA.items()}
+
+# Función para guardar la asistencia de toda una actividad de una vez
+def actualizar_asistencia_actividad(actividad_id, asistencias):
+    """Guarda en una sola transacción la asistencia {agente_nip: asistencia} de una actividad"""
+    conn = get_db_connection()
+    try:
+        actualizadas = guardar_asistencias(conn, actividad_id, asistencias)
+        invalidar_tablas("agentes_actividades")
+        return True, actualizadas
+    except Exception as e:
+        st.error(f"Error al guardar la asistencia: {e}")
+        return False, 0
+    finally:
+        conn.close()
+
 # Función para eliminar una actividad
 def delete_actividad(actividad_id):
     """Elimina una actividad y todas sus asignaciones de agentes"""
@@ -404,6 +531,7 @@ def delete_actividad(actividad_id):
         )
         
         conn.commit()
+        invalidar_tablas("actividades", "agentes_actividades")
         return True
     except Exception as e:
         st.error(f"Error al eliminar la actividad: {e}")
@@ -426,6 +554,7 @@ def update_actividad(actividad_id, fecha, turno_id, monitor_nip, curso_id, notas
             (fecha.strftime('%Y-%m-%d'), turno_id, monitor_nip, curso_id, notas, actividad_id)
         )
         conn.commit()
+        invalidar_tablas("actividades")
         return True
     except Exception as e:
         st.error(f"Error al actualizar actividad: {e}")
@@ -449,6 +578,7 @@ def delete_monitor(nip):
         # Eliminar el monitor
         cursor.execute("DELETE FROM monitores WHERE nip = ?", (nip,))
         conn.commit()
+        invalidar_tablas("monitores")
         return True, "Monitor eliminado correctamente"
     except Exception as e:
         st.error(f"Error al eliminar monitor: {e}")
@@ -456,73 +586,226 @@ def delete_monitor(nip):
     finally:
         conn.close()
 
+# Agentes compartidos por todas las sesiones sin copiarlos (solo lectura)
+@recurso_tablas("agentes")
+def get_agentes_compartidos():
+    return get_agentes()
+
+# Páginas y totales de los listados paginados por clave
+@cache_tablas("actividades", "agentes_actividades", "cursos", "turno", "monitores", ttl=300)
+def get_pagina_actividades(filtros, tamano, despues_de=None, antes_de=None):
+    conn = get_db_connection()
+    try:
+        condiciones, params = filtros_actividades(*filtros)
+        return CONSULTA_ACTIVIDADES.pagina(conn, condiciones, params, tamano, despues_de, antes_de)
+    finally:
+        conn.close()
+
+@cache_tablas("actividades", "cursos", "turno", ttl=300)
+def get_total_actividades(filtros):
+    conn = get_db_connection()
+    try:
+        return CONSULTA_ACTIVIDADES.contar(conn, *filtros_actividades(*filtros))
+    finally:
+        conn.close()
+
+@cache_tablas("agentes", ttl=300)
+def get_pagina_agentes(filtros, tamano, despues_de=None, antes_de=None):
+    seccion, grupo, busqueda = filtros
+    conn = get_db_connection()
+    try:
+        condiciones, params = filtros_agentes(seccion, grupo, construir_consulta_fts(busqueda))
+        return CONSULTA_AGENTES.pagina(conn, condiciones, params, tamano, despues_de, antes_de)
+    finally:
+        conn.close()
+
+@cache_tablas("agentes", ttl=300)
+def get_total_agentes(filtros):
+    seccion, grupo, busqueda = filtros
+    conn = get_db_connection()
+    try:
+        return CONSULTA_AGENTES.contar(conn, *filtros_agentes(seccion, grupo, construir_consulta_fts(busqueda)))
+    finally:
+        conn.close()
+
+@cache_tablas("monitores", ttl=300)
+def get_pagina_monitores(filtros, tamano, despues_de=None, antes_de=None):
+    conn = get_db_connection()
+    try:
+        return CONSULTA_MONITORES.pagina(conn, tamano=tamano, despues_de=despues_de, antes_de=antes_de)
+    finally:
+        conn.close()
+
+@cache_tablas("monitores", ttl=300)
+def get_total_monitores(filtros):
+    conn = get_db_connection()
+    try:
+        return CONSULTA_MONITORES.contar(conn)
+    finally:
+        conn.close()
+
+# Callback de los botones de navegación de un listado paginado
+def ir_a_pagina(clave_estado, paso, clave_fila):
+    estado = st.session_state[clave_estado]
+    estado["pagina"] = max(1, estado["pagina"] + paso)
+    if estado["pagina"] == 1:
+        estado["despues_de"] = estado["antes_de"] = None
+    elif paso > 0:
+        estado["despues_de"], estado["antes_de"] = clave_fila, None
+    else:
+        estado["despues_de"], estado["antes_de"] = None, clave_fila
+
+# Listado paginado por clave: solo se envía al navegador la página actual
+def listado_paginado(clave, consulta, cargar_pagina, contar, filtros, preparar=None, **opciones_tabla):
+    """
+    Muestra una página de un listado con navegación anterior/siguiente
+
+    Args:
+        clave: Identificador único del listado en la sesión
+        consulta: ConsultaPaginada del listado (para obtener la clave de cada fila)
+        cargar_pagina: Función (filtros, tamano, despues_de, antes_de) -> (DataFrame, hay_mas)
+        contar: Función (filtros) -> total de filas
+        filtros: Tupla con los filtros aplicados; al cambiar se vuelve a la primera página
+        preparar: Función opcional que da formato a la página antes de mostrarla
+        opciones_tabla: Argumentos adicionales para st.dataframe
+
+    Returns:
+        Tupla (página mostrada sin formato, total de filas)
+    """
+    clave_estado = f"paginacion_{clave}"
+    tamano = st.selectbox(
+        "Filas por página",
+        TAMANOS_PAGINA,
+        index=TAMANOS_PAGINA.index(TAMANO_PAGINA),
+        key=f"tamano_pagina_{clave}"
+    )
+    
+    estado = st.session_state.get(clave_estado)
+    if estado is None or estado["filtros"] != filtros or estado["tamano"] != tamano:
+        estado = {"filtros": filtros, "tamano": tamano, "pagina": 1, "despues_de": None, "antes_de": None}
+        st.session_state[clave_estado] = estado
+    
+    pagina_df, hay_mas = cargar_pagina(filtros, tamano, estado["despues_de"], estado["antes_de"])
+    if estado["antes_de"] is not None and not hay_mas:
+        # Al retroceder no quedan filas antes: es la primera página
+        estado.update(pagina=1, despues_de=None, antes_de=None)
+    elif pagina_df.empty and estado["pagina"] > 1:
+        # Las filas de esta página ya no existen: volver al principio
+        estado.update(pagina=1, despues_de=None, antes_de=None)
+        pagina_df, hay_mas = cargar_pagina(filtros, tamano, None, None)
+    
+    total = contar(filtros)
+    total_paginas = max(1, -(-total // tamano))
+    hay_siguiente = hay_mas if estado["antes_de"] is None else True
+    
+    if not pagina_df.empty:
+        st.dataframe(preparar(pagina_df) if preparar else pagina_df, **opciones_tabla)
+    
+    col_anterior, col_info, col_siguiente = st.columns([1, 2, 1])
+    with col_anterior:
+        st.button(
+            "◀ Anterior",
+            key=f"anterior_{clave}",
+            disabled=estado["pagina"] <= 1 or pagina_df.empty,
+            on_click=ir_a_pagina,
+            args=(clave_estado, -1, consulta.clave_de(pagina_df.iloc[0]) if not pagina_df.empty else None)
+        )
+    with col_info:
+        st.caption(f"Página {estado['pagina']} de {total_paginas} · {total} registros")
+    with col_siguiente:
+        st.button(
+            "Siguiente ▶",
+            key=f"siguiente_{clave}",
+            disabled=not hay_siguiente or pagina_df.empty,
+            on_click=ir_a_pagina,
+            args=(clave_estado, 1, consulta.clave_de(pagina_df.iloc[-1]) if not pagina_df.empty else None)
+        )
+    
+    return pagina_df, total
+
+# Comprueba con una consulta ligera que hay actividades y agentes registrados
+@cache_tablas("actividades", "agentes", ttl=300)
+def get_hay_datos():
+    conn = get_db_connection()
+    try:
+        hay_actividades, hay_agentes = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM actividades), EXISTS (SELECT 1 FROM agentes)"
+        ).fetchone()
+        return bool(hay_actividades and hay_agentes)
+    finally:
+        conn.close()
+
+# Cargadores por vista: cada uno lee solo las tablas que pinta su vista
+def cargar_datos_dashboard():
+    # Las actividades se consultan ya filtradas en SQL; aquí solo las opciones de los filtros
+    return {"cursos": get_cursos(), "turnos": get_turnos()}
+
+def cargar_datos_gestion_agentes():
+    return {"agentes": get_agentes_compartidos()}
+
+def cargar_datos_gestion_monitores():
+    return {"monitores": get_monitores(), "agentes": get_agentes()}
+
+def cargar_datos_cursos():
+    return {
+        "actividades": get_actividades_detalle(),
+        "cursos": get_cursos(),
+        "turnos": get_turnos(),
+        "monitores": get_monitores(),
+        "indice_cursos": get_indice_cursos(),
+        "indice_turnos": get_indice_turnos(),
+        "indice_monitores": get_indice_monitores()
+    }
+
+CARGADORES_VISTA = {
+    "Actividades": cargar_datos_dashboard,
+    "Gestión de Agentes": cargar_datos_gestion_agentes,
+    "Gestión de Monitores": cargar_datos_gestion_monitores,
+    "Cursos": cargar_datos_cursos,
+}
+
+# Con APP_MOSTRAR_TIEMPOS=1 la barra lateral muestra cuánto tarda en cargar cada vista
+MOSTRAR_TIEMPOS_CARGA = os.getenv("APP_MOSTRAR_TIEMPOS", "0") == "1"
+
+def cargar_datos_vista(vista):
+    """Carga los datos de una vista (y muestra cuánto ha tardado si MOSTRAR_TIEMPOS_CARGA)"""
+    if not MOSTRAR_TIEMPOS_CARGA:
+        return CARGADORES_VISTA[vista]()
+    inicio = time.perf_counter()
+    datos = CARGADORES_VISTA[vista]()
+    st.sidebar.caption(f"⏱️ Datos de la vista cargados en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return datos
+
+# Análisis de actividades calculado en memoria cuando la vista consolidada no está disponible
+@cache_tablas("actividades", "agentes_actividades", "cursos", "turno", "monitores", ttl=300)
+def get_analisis_sin_vista():
+    return construir_analisis(
+        get_actividades(), get_cursos(incluir_ocultos=True), get_turnos(), get_monitores(), get_agentes_actividades()
+    )
+
+# Cubo del dashboard calculado en memoria cuando la tabla resumen no está disponible
+@cache_tablas("actividades", "agentes_actividades", "cursos", "turno", ttl=300)
+def get_cubo_sin_vista():
+    return cubo_desde_tablas(
+        get_actividades(), get_cursos(incluir_ocultos=True), get_turnos(), get_agentes_actividades()
+    )
+
 # Verificar si la base de datos existe
-if not os.path.exists('sistema_agentes.db'):
+if not os.path.exists(DATABASE_PATH):
     st.warning("La base de datos no existe. Ejecutando script de creación...")
     try:
-        import create_sqlite_db
-        create_sqlite_db.create_database()
+        from src.database.create_sqlite_db import create_database
+        create_database()
         st.success("Base de datos creada con éxito. Recarga la página para ver los datos.")
         st.stop()
     except Exception as e:
         st.error(f"Error al crear la base de datos: {e}")
         st.stop()
 
-# Obtener datos
+# Cargar solo los datos que pinta la vista seleccionada
 try:
-    actividades = get_actividades()
-    agentes = get_agentes()
-    agentes_actividades = get_agentes_actividades()
-    cursos = get_cursos()
-    monitores = get_monitores()
-    turnos = get_turnos()
-    
-    # Intentar obtener la vista consolidada
-    try:
-        vista_actividades = get_vista_actividades_con_agentes()
-        df_analisis = vista_actividades
-    except Exception as e:
-        st.warning(f"No se pudo cargar la vista consolidada: {e}")
-        # Crear un dataframe de análisis manualmente
-        df_actividades = actividades.merge(cursos, left_on='curso_id', right_on='id', suffixes=('', '_curso'))
-        df_actividades = df_actividades.merge(turnos, left_on='turno_id', right_on='id', suffixes=('', '_turno'))
-        
-        # Contar agentes por actividad
-        agentes_por_actividad = agentes_actividades.groupby('actividad_id').size().reset_index(name='total_agentes')
-        df_analisis = df_actividades.merge(agentes_por_actividad, left_on='id', right_on='actividad_id', how='left')
-        df_analisis['total_agentes'] = df_analisis['total_agentes'].fillna(0)
-        
-        # Añadir información de asistencia
-        asistencia = agentes_actividades.groupby('actividad_id').agg(
-            asistencia_confirmada=('asistencia', lambda x: (x == True).sum()),
-            asistencia_pendiente=('asistencia', lambda x: x.isna().sum())
-        ).reset_index()
-        
-        df_analisis = df_analisis.merge(asistencia, left_on='id', right_on='actividad_id', how='left')
-        df_analisis['asistencia_confirmada'] = df_analisis['asistencia_confirmada'].fillna(0)
-        df_analisis['asistencia_pendiente'] = df_analisis['asistencia_pendiente'].fillna(0)
-        
-        # Calcular porcentaje de asistencia
-        df_analisis['asistencia_porcentaje'] = df_analisis.apply(
-            lambda row: (row['asistencia_confirmada'] / row['total_agentes'] * 100) if row['total_agentes'] > 0 else 0, 
-            axis=1
-        )
-        
-        # Añadir campos temporales
-        df_analisis['fecha'] = pd.to_datetime(df_analisis['fecha'])
-        df_analisis['dia_semana'] = df_analisis['fecha'].dt.day_name()
-        df_analisis['mes'] = df_analisis['fecha'].dt.month_name()
-        df_analisis['anio'] = df_analisis['fecha'].dt.year
-        df_analisis['semana_del_anio'] = df_analisis['fecha'].dt.isocalendar().week
-        
-        # Determinar estado
-        hoy = datetime.now().date()
-        df_analisis['estado'] = df_analisis['fecha'].apply(
-            lambda x: 'Completada' if x.date() < hoy else ('En curso' if x.date() == hoy else 'Pendiente')
-        )
-    
-    # Procesar los datos si están vacíos
-    if actividades.empty or agentes.empty:
+    # Comprobación ligera de que hay datos, sin leer las tablas completas
+    if not get_hay_datos():
         st.error("No se pudieron cargar los datos. Verifica la base de datos SQLite.")
         st.stop()
         
@@ -533,28 +816,33 @@ try:
     st.sidebar.header("Filtros")
     
     # Selector de vista
-    vista_seleccionada = st.sidebar.radio("Seleccionar Vista", ["Actividades", "Gestión de Agentes", "Gestión de Monitores", "Cursos"])
+    vista_seleccionada = st.sidebar.radio("Seleccionar Vista", list(CARGADORES_VISTA))
+    datos_vista = cargar_datos_vista(vista_seleccionada)
     
     if vista_seleccionada == "Actividades":
+        cursos = datos_vista["cursos"]
+        turnos = datos_vista["turnos"]
+        
         # Filtro de fecha
-        min_date = pd.to_datetime(actividades['fecha']).min() if not actividades.empty else datetime.now().date()
-        max_date = pd.to_datetime(actividades['fecha']).max() if not actividades.empty else datetime.now().date()
+        fecha_minima, fecha_maxima = get_rango_fechas_actividades()
+        min_date = pd.to_datetime(fecha_minima).date() if fecha_minima else datetime.now().date()
+        max_date = pd.to_datetime(fecha_maxima).date() if fecha_maxima else datetime.now().date()
         
         date_range = date_input_es(
             "Rango de fechas",
-            value=(
-                min_date.date() if isinstance(min_date, pd.Timestamp) else min_date,
-                max_date.date() if isinstance(max_date, pd.Timestamp) else max_date
-            ),
-            min_value=min_date.date() if isinstance(min_date, pd.Timestamp) else min_date,
-            max_value=max_date.date() if isinstance(max_date, pd.Timestamp) else max_date
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date
         )
         
         # Convertir a lista si es una tupla
         if isinstance(date_range, tuple) and len(date_range) == 2:
             start_date, end_date = date_range
+        elif isinstance(date_range, tuple):
+            # Mientras se elige el rango solo hay una fecha seleccionada
+            start_date = end_date = date_range[0] if date_range else min_date
         else:
-            # Si es una sola fecha o no es una tupla, usar la misma fecha para inicio y fin
+            # Si es una sola fecha, usar la misma fecha para inicio y fin
             start_date = end_date = date_range
         
         # Filtro de curso
@@ -575,43 +863,24 @@ try:
         estado_options = ['Todos', 'Pendiente', 'En curso', 'Completada']
         estado_filtro = st.sidebar.selectbox("Estado", estado_options)
         
-        # Aplicar filtros al dataframe de análisis
-        df_filtrado = df_analisis.copy()
-        
-        # Filtro de fecha
-        if 'fecha' in df_filtrado.columns:
-            if isinstance(df_filtrado['fecha'].iloc[0], str):
-                df_filtrado['fecha'] = pd.to_datetime(df_filtrado['fecha'])
-            
-            if isinstance(date_range, tuple) and len(date_range) == 2:
-                fecha_inicio, fecha_fin = date_range
-                df_filtrado = df_filtrado[
-                    (df_filtrado['fecha'].dt.date >= fecha_inicio) & 
-                    (df_filtrado['fecha'].dt.date <= fecha_fin)
-                ]
-            else:
-                # Si es una sola fecha, filtrar por esa fecha específica
-                df_filtrado = df_filtrado[
-                    pd.to_datetime(df_filtrado["fecha"]).dt.date == date_range
-                ]
-        
-        # Filtro de curso
-        if curso_filtro != 'Todos':
-            if 'curso_nombre' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['curso_nombre'] == curso_filtro]
-            elif 'nombre_curso' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['nombre_curso'] == curso_filtro]
-        
-        # Filtro de turno
-        if turno_filtro != 'Todos':
-            if 'turno_nombre' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['turno_nombre'] == turno_filtro]
-            elif 'nombre_turno' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['nombre_turno'] == turno_filtro]
-        
-        # Filtro de estado
-        if estado_filtro != 'Todos':
-            df_filtrado = df_filtrado[df_filtrado['estado'] == estado_filtro]
+        # Consultar solo las actividades y agregados del rango filtrado
+        filtros = (start_date, end_date, curso_filtro, turno_filtro, estado_filtro)
+        # El estado se calcula respecto a hoy; los agregados cacheados no dependen del día
+        hoy = fecha_referencia()
+        try:
+            df_filtrado = get_dashboard_actividades(*filtros, hoy)
+            cubo = get_cubo_dashboard()
+        except Exception as e:
+            st.warning(f"No se pudo cargar la vista consolidada: {e}")
+            # Solo en este caso se leen las tablas completas de actividades y asignaciones;
+            # el estado se añade después de filtrar, solo a las actividades del rango
+            df_filtrado = con_estado(filtrar_analisis(get_analisis_sin_vista(), *filtros[:4]), hoy)
+            df_filtrado = filtrar_analisis(df_filtrado, estado=estado_filtro)
+            cubo = get_cubo_sin_vista()
+
+        # Las métricas y los gráficos suman las celdas del cubo que cumplen los filtros
+        celdas = filtrar_cubo(con_estado(cubo, hoy), *filtros)
+        metricas = metricas_cubo(celdas)
         
         # Dashboard principal
         st.header("Dashboard de Actividades")
@@ -620,22 +889,16 @@ try:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Actividades", len(df_filtrado))
+            st.metric("Total Actividades", int(metricas["total_actividades"]))
         
         with col2:
-            total_agentes_asignados = df_filtrado['total_agentes'].sum()
-            st.metric("Total Agentes Asignados", int(total_agentes_asignados))
+            st.metric("Total Agentes Asignados", int(metricas["total_agentes"]))
         
         with col3:
-            asistencia_confirmada = df_filtrado['asistencia_confirmada'].sum()
-            st.metric("Asistencia Confirmada", int(asistencia_confirmada))
+            st.metric("Asistencia Confirmada", int(metricas["asistencia_confirmada"]))
         
         with col4:
-            if total_agentes_asignados > 0:
-                porcentaje_asistencia = (asistencia_confirmada / total_agentes_asignados) * 100
-            else:
-                porcentaje_asistencia = 0
-            st.metric("Porcentaje Asistencia", f"{porcentaje_asistencia:.2f}%")
+            st.metric("Porcentaje Asistencia", f"{metricas['asistencia_porcentaje']:.2f}%")
         
         # Gráficos
         st.subheader("Análisis de Actividades")
@@ -644,73 +907,33 @@ try:
         
         with tab1:
             # Actividades por curso
-            if 'curso_nombre' in df_filtrado.columns:
-                curso_col = 'curso_nombre'
-            elif 'nombre_curso' in df_filtrado.columns:
-                curso_col = 'nombre_curso'
-            else:
-                curso_col = None
-                
-            if curso_col:
-                actividades_por_curso = df_filtrado.groupby(curso_col).size().reset_index(name='count')
-                fig = px.bar(
-                    actividades_por_curso, 
-                    x=curso_col, 
-                    y='count',
-                    title='Actividades por Curso',
-                    labels={'count': 'Número de Actividades', curso_col: 'Curso'},
-                    color='count',
-                    color_continuous_scale='Viridis'
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            fig = px.bar(
+                actividades_por_curso(celdas),
+                x='curso_nombre',
+                y='count',
+                title='Actividades por Curso',
+                labels={'count': 'Número de Actividades', 'curso_nombre': 'Curso'},
+                color='count',
+                color_continuous_scale='Viridis'
+            )
+            st.plotly_chart(fig, use_container_width=True)
         
         with tab2:
-            # Asistencia por día de la semana
-            if 'dia_semana' in df_filtrado.columns:
-                asistencia_por_dia = df_filtrado.groupby('dia_semana').agg({
-                    'total_agentes': 'sum',
-                    'asistencia_confirmada': 'sum'
-                }).reset_index()
-                
-                asistencia_por_dia['porcentaje'] = (asistencia_por_dia['asistencia_confirmada'] / asistencia_por_dia['total_agentes'] * 100).fillna(0)
-                
-                # Ordenar días de la semana
-                dias_orden = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                dias_orden_es = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-                
-                # Mapear días en inglés a español si es necesario
-                if asistencia_por_dia['dia_semana'].iloc[0] in dias_orden:
-                    asistencia_por_dia['dia_semana'] = pd.Categorical(
-                        asistencia_por_dia['dia_semana'], 
-                        categories=dias_orden, 
-                        ordered=True
-                    )
-                else:
-                    asistencia_por_dia['dia_semana'] = pd.Categorical(
-                        asistencia_por_dia['dia_semana'], 
-                        categories=dias_orden_es, 
-                        ordered=True
-                    )
-                    
-                asistencia_por_dia = asistencia_por_dia.sort_values('dia_semana')
-                
-                fig = px.line(
-                    asistencia_por_dia,
-                    x='dia_semana',
-                    y='porcentaje',
-                    title='Porcentaje de Asistencia por Día de la Semana',
-                    labels={'porcentaje': 'Porcentaje de Asistencia', 'dia_semana': 'Día de la Semana'},
-                    markers=True
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            # Asistencia por día de la semana, ya ordenada de lunes a domingo
+            fig = px.line(
+                asistencia_por_dia(celdas),
+                x='dia_semana',
+                y='porcentaje',
+                title='Porcentaje de Asistencia por Día de la Semana',
+                labels={'porcentaje': 'Porcentaje de Asistencia', 'dia_semana': 'Día de la Semana'},
+                markers=True
+            )
+            st.plotly_chart(fig, use_container_width=True)
         
         with tab3:
             # Distribución de estados
-            estados_count = df_filtrado['estado'].value_counts().reset_index()
-            estados_count.columns = ['Estado', 'Cantidad']
-            
             fig = px.pie(
-                estados_count,
+                actividades_por_estado(celdas),
                 values='Cantidad',
                 names='Estado',
                 title='Distribución de Estados de Actividades',
@@ -743,12 +966,12 @@ try:
         # Filtrar solo las columnas que existen
         columnas_mostrar = [col for col in columnas_mostrar if col in df_filtrado.columns]
         
-        # Formatear fechas para visualización
-        df_filtrado['fecha'] = df_filtrado['fecha'].apply(format_date_es)
+        # Formatear fechas para visualización (la consulta ya viene ordenada por fecha descendente)
+        df_filtrado['fecha'] = pd.to_datetime(df_filtrado['fecha']).apply(format_date_es)
         
         # Mostrar tabla
         st.dataframe(
-            df_filtrado[columnas_mostrar].sort_values('fecha', ascending=False),
+            df_filtrado[columnas_mostrar],
             use_container_width=True,
             hide_index=False
         )
@@ -757,32 +980,13 @@ try:
         # Sección de gestión de agentes
         st.header("Gestión de Agentes")
         
-        # Obtener datos de agentes
-        agentes_df = get_agentes()
-        
-        # Inicializar estados de sesión si no existen
-        if 'agentes_df_original' not in st.session_state:
-            st.session_state.agentes_df_original = agentes_df.copy()
-        
-        if 'agentes_filtrados_busqueda' not in st.session_state:
-            st.session_state.agentes_filtrados_busqueda = agentes_df.copy()
+        # Obtener datos de agentes (compartidos entre sesiones: no se modifican)
+        agentes_df = datos_vista["agentes"]
         
+        # La sesión solo guarda el texto de búsqueda; los resultados salen de la caché compartida
         if 'texto_busqueda_agentes' not in st.session_state:
             st.session_state.texto_busqueda_agentes = ""
         
-        # Función para actualizar la búsqueda de agentes (callback)
-        def actualizar_busqueda_agentes():
-            busqueda = st.session_state.texto_busqueda_agentes.lower()
-            if busqueda:
-                # Filtrar por NIP o nombre
-                st.session_state.agentes_filtrados_busqueda = st.session_state.agentes_df_original[
-                    st.session_state.agentes_df_original["nip"].str.lower().str.contains(busqueda) | 
-                    st.session_state.agentes_df_original["nombre_completo"].str.lower().str.contains(busqueda)
-                ]
-            else:
-                # Si no hay búsqueda, mostrar todos
-                st.session_state.agentes_filtrados_busqueda = st.session_state.agentes_df_original.copy()
-        
         # Opciones de filtrado
         col1, col2, col3 = st.columns(3)
         
@@ -795,7 +999,6 @@ try:
             st.text_input(
                 "Buscar por NIP o Nombre", 
                 key="texto_busqueda_agentes",
-                on_change=actualizar_busqueda_agentes,
                 help="Escribe para filtrar agentes en tiempo real"
             )
             
@@ -803,37 +1006,34 @@ try:
             if st.session_state.texto_busqueda_agentes:
                 st.caption(f"🔍 Buscando: '{st.session_state.texto_busqueda_agentes}'")
         
-        # Aplicar filtros de sección y grupo a los resultados ya filtrados por búsqueda
-        agentes_filtrados = st.session_state.agentes_filtrados_busqueda.copy()
-        
-        if filtro_seccion != "Todas":
-            agentes_filtrados = agentes_filtrados[agentes_filtrados["seccion"] == filtro_seccion]
-        
-        if filtro_grupo != "Todos":
-            agentes_filtrados = agentes_filtrados[agentes_filtrados["grupo"] == filtro_grupo]
+        # Búsqueda, sección y grupo se aplican en SQL y el listado se pagina por NIP
+        filtros_listado = (filtro_seccion, filtro_grupo, st.session_state.texto_busqueda_agentes)
+        total_filtrados = get_total_agentes(filtros_listado)
         
         # Mostrar contador de resultados con estilo mejorado
-        if len(agentes_filtrados) == 0:
+        if total_filtrados == 0:
             st.warning(f"No se encontraron agentes con los criterios de búsqueda")
-        elif len(agentes_filtrados) < len(agentes_df):
-            st.success(f"Mostrando {len(agentes_filtrados)} de {len(agentes_df)} agentes")
+        elif total_filtrados < len(agentes_df):
+            st.success(f"Mostrando {total_filtrados} de {len(agentes_df)} agentes")
         else:
-            st.info(f"Mostrando todos los agentes ({len(agentes_filtrados)})")
+            st.info(f"Mostrando todos los agentes ({total_filtrados})")
         
         # Renombrar columnas para mostrar
-        agentes_display = agentes_filtrados.copy()
-        agentes_display.columns = ["NIP", "Nombre", "Apellido 1", "Apellido 2", "Nombre Completo", "Sección", "Grupo"]
-        
-        # Mostrar dataframe con datos filtrados
-        st.dataframe(agentes_display, use_container_width=True, height=400)
+        def preparar_agentes(pagina):
+            pagina = pagina.copy()
+            pagina.columns = ["NIP", "Nombre", "Apellido 1", "Apellido 2", "Nombre Completo", "Sección", "Grupo"]
+            return pagina
+        
+        # Mostrar solo la página actual de los agentes filtrados
+        listado_paginado(
+            "agentes", CONSULTA_AGENTES, get_pagina_agentes, get_total_agentes, filtros_listado,
+            preparar=preparar_agentes, use_container_width=True, height=400
+        )
         
         # Botón para limpiar filtros
         col1, col2 = st.columns([1, 3])
         with col1:
-            if st.button("Limpiar Filtros", key="limpiar_filtros_agentes_principal"):
-                st.session_state.texto_busqueda_agentes = ""
-                st.session_state.agentes_filtrados_busqueda = st.session_state.agentes_df_original.copy()
-                st.rerun()
+            st.button("Limpiar Filtros", key="limpiar_filtros_agentes_principal", on_click=limpiar_busqueda_agentes)
         
         # Crear pestañas para las diferentes funcionalidades
         tab_listar, tab_editar, tab_agregar = st.tabs(["Listado de Agentes", "Editar Agente", "Añadir Agente"])
@@ -842,16 +1042,16 @@ try:
             # Mostrar tabla de agentes
             st.subheader("Listado Completo de Agentes")
             
-            # Mostrar dataframe con datos filtrados
-            st.dataframe(agentes_display, use_container_width=True, height=400)
+            # Mostrar solo la página actual de los agentes filtrados
+            listado_paginado(
+                "agentes_listado", CONSULTA_AGENTES, get_pagina_agentes, get_total_agentes, filtros_listado,
+                preparar=preparar_agentes, use_container_width=True, height=400
+            )
             
             # Botón para limpiar filtros
             col1, col2 = st.columns([1, 3])
             with col1:
-                if st.button("Limpiar Filtros", key="limpiar_filtros_agentes_listado"):
-                    st.session_state.texto_busqueda_agentes = ""
-                    st.session_state.agentes_filtrados_busqueda = st.session_state.agentes_df_original.copy()
-                    st.rerun()
+                st.button("Limpiar Filtros", key="limpiar_filtros_agentes_listado", on_click=limpiar_busqueda_agentes)
         
         with tab_editar:
             st.subheader("Editar Agente Existente")
@@ -969,8 +1169,8 @@ try:
         st.header("Gestión de Monitores")
         
         # Obtener datos de monitores y agentes
-        monitores_df = get_monitores()
-        agentes_df = get_agentes()
+        monitores_df = datos_vista["monitores"]
+        agentes_df = datos_vista["agentes"]
         
         # Crear pestañas para las diferentes funcionalidades
         tab_listar, tab_agregar = st.tabs(["Listado de Monitores", "Añadir Monitor"])
@@ -981,11 +1181,16 @@ try:
             
             if not monitores_df.empty:
                 # Renombrar columnas para mostrar
-                monitores_display = monitores_df.copy()
-                monitores_display.columns = ["NIP", "Nombre", "Apellido 1", "Apellido 2", "Nombre Completo"]
+                def preparar_monitores(pagina):
+                    pagina = pagina.copy()
+                    pagina.columns = ["NIP", "Nombre", "Apellido 1", "Apellido 2", "Nombre Completo"]
+                    return pagina
                 
-                # Mostrar dataframe con datos
-                st.dataframe(monitores_display, use_container_width=True, height=300)
+                # Mostrar solo la página actual de monitores
+                listado_paginado(
+                    "monitores", CONSULTA_MONITORES, get_pagina_monitores, get_total_monitores, (),
+                    preparar=preparar_monitores, use_container_width=True, height=300
+                )
                 
                 # Sección para eliminar monitores
                 st.subheader("Eliminar Monitor")
@@ -1003,7 +1208,6 @@ try:
                         success, message = delete_monitor(nip_seleccionado)
                         if success:
                             st.success(message)
-                            st.cache_data.clear()  # Limpiar caché para actualizar datos
                             st.rerun()
                         else:
                             st.error(message)
@@ -1012,7 +1216,7 @@ try:
             
             # Botón para actualizar datos
             if st.button("Actualizar Datos", key="actualizar_monitores"):
-                st.cache_data.clear()  # Limpiar caché para actualizar datos
+                invalidar_tablas("monitores", "agentes")  # Recargar solo las tablas de esta vista
                 st.rerun()
         
         with tab_agregar:
@@ -1028,7 +1232,8 @@ try:
             )
             
             # Filtrar agentes según la búsqueda en tiempo real usando la función auxiliar
-            agentes_filtrados = filtrar_agentes_por_busqueda(agentes_df, busqueda)
+            # (los LIMITE_RESULTADOS más relevantes, no todas las coincidencias)
+            agentes_filtrados = filtrar_agentes_por_busqueda(agentes_df, busqueda, limite=LIMITE_RESULTADOS)
             
             # Excluir agentes que ya son monitores
             monitores_nips = monitores_df["nip"].tolist() if not monitores_df.empty else []
@@ -1099,7 +1304,7 @@ try:
                             
                             if success:
                                 st.success(f"Agente {nip} añadido como monitor correctamente")
-                                st.cache_data.clear()  # Limpiar caché para actualizar datos
+                                invalidar_tablas("monitores")
                                 st.rerun()
                             else:
                                 st.error(f"Error al añadir monitor. El NIP {nip} ya existe como monitor")
@@ -1110,12 +1315,14 @@ try:
         # Sección de gestión de cursos y actividades
         st.header("Gestión de Cursos y Actividades")
         
-        # Obtener datos necesarios
-        actividades_df = get_actividades_detalle()
-        cursos_df = get_cursos()
-        turnos_df = get_turnos()
-        monitores_df = get_monitores()
-        agentes_df = get_agentes()
+        # Obtener datos necesarios (los agentes solo se leen al asignarlos a una actividad)
+        actividades_df = datos_vista["actividades"]
+        cursos_df = datos_vista["cursos"]
+        turnos_df = datos_vista["turnos"]
+        monitores_df = datos_vista["monitores"]
+        indice_cursos = datos_vista["indice_cursos"]
+        indice_turnos = datos_vista["indice_turnos"]
+        indice_monitores = datos_vista["indice_monitores"]
         
         # Crear pestañas para las diferentes funcionalidades
         # Inicializar la variable de sesión para controlar la pestaña activa si no existe
@@ -1165,47 +1372,35 @@ try:
                 turnos_opciones = ["Todos"] + turnos_df["nombre"].tolist()
                 turno_filtro = st.selectbox("Filtrar por Turno", turnos_opciones)
             
-            # Aplicar filtros
-            actividades_filtradas = actividades_df.copy()
-            
-            # Filtro de fecha
+            # Filtro de fecha (un rango o una sola fecha)
             if isinstance(fecha_filtro, tuple) and len(fecha_filtro) == 2:
                 fecha_inicio, fecha_fin = fecha_filtro
-                actividades_filtradas = actividades_filtradas[
-                    (pd.to_datetime(actividades_filtradas["fecha"]).dt.date >= fecha_inicio) &
-                    (pd.to_datetime(actividades_filtradas["fecha"]).dt.date <= fecha_fin)
-                ]
+            elif isinstance(fecha_filtro, tuple):
+                # Mientras se elige el rango solo hay una fecha seleccionada
+                fecha_inicio = fecha_fin = fecha_filtro[0] if fecha_filtro else None
             else:
                 # Si es una sola fecha, filtrar por esa fecha específica
-                actividades_filtradas = actividades_filtradas[
-                    pd.to_datetime(actividades_filtradas["fecha"]).dt.date == fecha_filtro
-                ]
+                fecha_inicio = fecha_fin = fecha_filtro
             
-            # Filtro de curso
-            if curso_filtro != "Todos":
-                actividades_filtradas = actividades_filtradas[actividades_filtradas["curso_nombre"] == curso_filtro]
+            # Los filtros se aplican en SQL y solo se envía al navegador la página actual
+            filtros_listado = (fecha_inicio, fecha_fin, curso_filtro, turno_filtro)
             
-            # Filtro de turno
-            if turno_filtro != "Todos":
-                actividades_filtradas = actividades_filtradas[actividades_filtradas["turno_nombre"] == turno_filtro]
+            def preparar_actividades(pagina):
+                pagina = pagina.copy()
+                pagina['fecha'] = pd.to_datetime(pagina['fecha']).apply(format_date_es)
+                return pagina
             
-            # Mostrar tabla de actividades
-            if not actividades_filtradas.empty:
-                # Preparar dataframe para mostrar
-                actividades_display = actividades_filtradas.copy()
-                actividades_display['fecha'] = pd.to_datetime(actividades_display['fecha']).apply(format_date_es)
-                
-                # Mostrar tabla
-                st.dataframe(
-                    actividades_display,
-                    use_container_width=True
+            if get_total_actividades(filtros_listado) > 0:
+                listado_paginado(
+                    "actividades", CONSULTA_ACTIVIDADES, get_pagina_actividades, get_total_actividades, filtros_listado,
+                    preparar=preparar_actividades, use_container_width=True
                 )
             else:
                 st.info("No hay actividades que coincidan con los filtros seleccionados")
             
             # Botón para actualizar datos
             if st.button("Actualizar Datos", key="actualizar_actividades"):
-                st.cache_data.clear()  # Limpiar caché para actualizar datos
+                invalidar_tablas("actividades", "agentes_actividades", "cursos", "turno", "monitores")  # Recargar solo las tablas de esta vista
                 st.rerun()
         
         with tab_crear:
@@ -1222,14 +1417,14 @@ try:
                 curso_id = st.selectbox(
                     "Curso", 
                     options=[int(id) for id in cursos_df[cursos_df['oculto'].fillna(0) == 0]["id"].tolist()],
-                    format_func=lambda x: cursos_df.loc[cursos_df["id"] == x, "nombre"].iloc[0]
+                    format_func=indice_cursos
                 )
                 
                 # Seleccionar turno
                 turno_id = st.selectbox(
                     "Turno", 
                     options=[int(id) for id in turnos_df["id"].tolist()],
-                    format_func=lambda x: turnos_df.loc[turnos_df["id"] == x, "nombre"].iloc[0]
+                    format_func=indice_turnos
                 )
                 
                 # Seleccionar monitor
@@ -1238,7 +1433,7 @@ try:
                     monitor_nip = st.selectbox(
                         "Monitor", 
                         options=[str(nip) for nip in monitores_df["nip"].tolist()],
-                        format_func=lambda x: "" if x == "" else f"{x} - {monitores_df.loc[monitores_df['nip'] == x, 'nombre_completo'].iloc[0]}"
+                        format_func=indice_monitores
                     )
                 else:
                     st.warning("No hay monitores registrados. Añade monitores primero.")
@@ -1283,8 +1478,6 @@ try:
                             st.session_state['actividad_creada'] = True
                             st.session_state['actividad_id'] = actividad_id
                             st.session_state['mostrar_tab_listado'] = True
-                            # Limpiar caché para actualizar los datos
-                            st.cache_data.clear()
                             # Recargar la página para mostrar los cambios
                             st.rerun()
                         else:
@@ -1339,7 +1532,7 @@ try:
                             curso_id = st.selectbox(
                                 "Curso", 
                                 options=cursos_opciones,
-                                format_func=lambda x: cursos_df.loc[cursos_df["id"] == x, "nombre"].iloc[0],
+                                format_func=indice_cursos,
                                 index=cursos_opciones.index(curso_id_actual)
                             )
                             
@@ -1353,7 +1546,7 @@ try:
                             turno_id = st.selectbox(
                                 "Turno", 
                                 options=turnos_opciones,
-                                format_func=lambda x: turnos_df.loc[turnos_df["id"] == x, "nombre"].iloc[0],
+                                format_func=indice_turnos,
                                 index=turnos_opciones.index(turno_id_actual)
                             )
                             
@@ -1373,7 +1566,7 @@ try:
                                 monitor_nip = st.selectbox(
                                     "Monitor", 
                                     options=[str(nip) for nip in monitores_df["nip"].tolist()],
-                                    format_func=lambda x: "" if x == "" else f"{x} - {monitores_df.loc[monitores_df['nip'] == x, 'nombre_completo'].iloc[0]}",
+                                    format_func=indice_monitores,
                                     index=monitor_index
                                 )
                             else:
@@ -1476,10 +1669,11 @@ try:
                         
                         # Obtener agentes asignados a la actividad
                         agentes_asignados = get_agentes_por_actividad(actividad_id)
+                        indice_agentes = get_indice_agentes()
                         
                         if not agentes_asignados.empty:
-                            # Mostrar tabla de agentes asignados con opción para confirmar asistencia
-                            st.write("Agentes asignados a esta actividad:")
+                            # Tabla editable: toda la asistencia se cambia a la vez y se guarda en una transacción
+                            st.write("Agentes asignados a esta actividad (edita la columna Asistencia y guarda):")
                             
                             # Crear una copia del DataFrame para mostrar
                             agentes_display = agentes_asignados.copy()
@@ -1488,46 +1682,61 @@ try:
                             agentes_display.columns = ["NIP", "Nombre", "Apellido 1", "Apellido 2", "Nombre Completo", "Sección", "Grupo", "Asistencia"]
                             
                             # Convertir asistencia a texto
-                            agentes_display["Asistencia"] = agentes_display["Asistencia"].apply(
-                                lambda x: "✅ Confirmada" if x == 1 else "❌ No confirmada" if x == 0 else "❓ Pendiente"
+                            agentes_display["Asistencia"] = agentes_display["Asistencia"].map(
+                                lambda x: ASISTENCIA_A_TEXTO.get(x, ASISTENCIA_A_TEXTO[None]) if pd.notna(x) else ASISTENCIA_A_TEXTO[None]
                             )
                             
-                            # Mostrar tabla
-                            st.dataframe(agentes_display, use_container_width=True)
-                            
-                            # Sección para confirmar asistencia
                             with st.form(key=f"confirmar_asistencia_form_{actividad_id}"):
                                 st.subheader("Confirmar Asistencia")
                                 
-                                # Selector de agente
-                                agente_nip = st.selectbox(
-                                    "Seleccionar Agente", 
-                                    options=agentes_asignados["nip"].tolist(),
-                                    format_func=lambda x: f"{x} - {agentes_asignados.loc[agentes_asignados['nip'] == x, 'nombre_completo'].iloc[0]}"
+                                asistencia_editada = st.data_editor(
+                                    agentes_display,
+                                    use_container_width=True,
+                                    hide_index=True,
+                                    disabled=[col for col in agentes_display.columns if col != "Asistencia"],
+                                    column_config={
+                                        "Asistencia": st.column_config.SelectboxColumn(
+                                            "Asistencia",
+                                            options=list(TEXTO_A_ASISTENCIA),
+                                            required=True
+                                        )
+                                    },
+                                    key=f"editor_asistencia_{actividad_id}"
                                 )
                                 
-                                # Selector de asistencia
-                                asistencia = st.radio(
-                                    "Asistencia", 
-                                    options=[("Confirmada", 1), ("No confirmada", 0), ("Pendiente", None)],
-                                    format_func=lambda x: x[0],
-                                    index=0
-                                )
+                                col_todos, col_guardar = st.columns(2)
+                                with col_todos:
+                                    confirmar_todos = st.form_submit_button("Confirmar a Todos")
+                                with col_guardar:
+                                    confirmar = st.form_submit_button("Guardar Asistencia")
                                 
-                                # Botón para confirmar
-                                confirmar = st.form_submit_button("Guardar Asistencia")
-                                
-                                if confirmar:
-                                    # Actualizar asistencia del agente
-                                    success = actualizar_asistencia_agente(actividad_id, agente_nip, asistencia[1])
+                                if confirmar or confirmar_todos:
+                                    # Solo se envían las filas cuyo valor ha cambiado
+                                    if confirmar_todos:
+                                        nuevos = [1] * len(asistencia_editada)
+                                    else:
+                                        # Búsqueda directa en el diccionario: Series.map convertiría
+                                        # el None de "Pendiente" en NaN y NaN != NaN siempre
+                                        nuevos = [TEXTO_A_ASISTENCIA.get(texto) for texto in asistencia_editada["Asistencia"]]
+                                    anteriores = [TEXTO_A_ASISTENCIA.get(texto) for texto in agentes_display["Asistencia"]]
+                                    cambios = {
+                                        nip: nuevo
+                                        for nip, nuevo, anterior in zip(
+                                            asistencia_editada["NIP"], nuevos, anteriores
+                                        )
+                                        if nuevo != anterior
+                                    }
                                     
-                                    if success:
-                                        st.success(f"Asistencia actualizada para el agente {agente_nip}")
-                                        # Limpiar caché para actualizar datos
-                                        st.cache_data.clear()
-                                        st.rerun()
+                                    if not cambios:
+                                        st.info("No hay cambios de asistencia que guardar")
                                     else:
-                                        st.error("Error al actualizar la asistencia")
+                                        success, actualizadas = actualizar_asistencia_actividad(actividad_id, cambios)
+                                        
+                                        if success:
+                                            st.success(f"Asistencia actualizada para {actualizadas} agentes")
+                                            st.rerun()
+                                        else:
+                                            st.error("Error al actualizar la asistencia")
                         
                             # Botón para quitar agente
                             with st.form(key=f"quitar_agente_form_{actividad_id}"):
@@ -1537,7 +1746,7 @@ try:
                                 agente_quitar = st.selectbox(
                                     "Seleccionar Agente a Quitar", 
                                     options=agentes_asignados["nip"].tolist(),
-                                    format_func=lambda x: f"{x} - {agentes_asignados.loc[agentes_asignados['nip'] == x, 'nombre_completo'].iloc[0]}",
+                                    format_func=indice_agentes,
                                     key=f"quitar_agente_{actividad_id}"
                                 )
                                 
@@ -1550,15 +1759,18 @@ try:
                                     
                                     if success:
                                         st.success(f"Agente {agente_quitar} quitado de la actividad")
-                                        # Limpiar caché para actualizar datos
-                                        st.cache_data.clear()
                                         st.rerun()
                                     else:
                                         st.error("Error al quitar el agente")
                         
+                        # Resultado de la última asignación, guardado antes del rerun
+                        resultado_asignacion = st.session_state.pop(f"resultado_asignacion_{actividad_id}", None)
+                        if resultado_asignacion:
+                            st.success(resultado_asignacion)
+                        
                         # Sección para añadir agentes
                         with st.form(key=f"anadir_agente_form_{actividad_id}"):
-                            st.subheader("Añadir Agente")
+                            st.subheader("Añadir Agentes")
                             
                             # Obtener todos los agentes
                             todos_agentes = get_agentes()
@@ -1570,30 +1782,52 @@ try:
                                 agentes_no_asignados = todos_agentes
                             
                             if not agentes_no_asignados.empty:
-                                # Selector de agente
-                                agente_anadir = st.selectbox(
-                                    "Seleccionar Agente a Añadir", 
+                                # Selector múltiple de agentes
+                                agentes_anadir = st.multiselect(
+                                    "Seleccionar Agentes a Añadir", 
                                     options=agentes_no_asignados["nip"].tolist(),
-                                    format_func=lambda x: f"{x} - {agentes_no_asignados.loc[agentes_no_asignados['nip'] == x, 'nombre_completo'].iloc[0]}",
+                                    format_func=indice_agentes,
                                     key=f"anadir_agente_{actividad_id}"
                                 )
                                 
                                 # Botón para añadir
-                                anadir = st.form_submit_button("Añadir Agente")
+                                anadir = st.form_submit_button("Añadir Agentes Seleccionados")
                                 
                                 if anadir:
-                                    # Asignar agente a la actividad
-                                    success = asignar_agente_actividad(agente_anadir, actividad_id)
-                                    
-                                    if success:
-                                        st.success(f"Agente {agente_anadir} añadido a la actividad")
-                                        # Limpiar caché para actualizar datos
-                                        st.cache_data.clear()
-                                        st.rerun()
+                                    if not agentes_anadir:
+                                        st.warning("Selecciona al menos un agente")
                                     else:
-                                        st.error("Error al añadir el agente")
+                                        # Asignar todos los agentes en una transacción
+                                        success, mensaje = asignar_agentes_actividad(agentes_anadir, actividad_id)
+                                        
+                                        if success:
+                                            st.session_state[f"resultado_asignacion_{actividad_id}"] = mensaje
+                                            st.rerun()
+                                        else:
+                                            st.error(mensaje)
                             else:
                                 st.info("No hay agentes disponibles para añadir a esta actividad")
+                        
+                        # Sección para añadir una sección y/o grupo completos
+                        with st.form(key=f"anadir_grupo_form_{actividad_id}"):
+                            st.subheader("Añadir por Sección y Grupo")
+                            
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                seccion_anadir = st.selectbox("Sección", ["Todas", "Seguridad", "Atestados"], key=f"anadir_seccion_{actividad_id}")
+                            with col2:
+                                grupo_anadir = st.selectbox("Grupo", ["Todos", "G-1", "G-2"], key=f"anadir_grupo_{actividad_id}")
+                            
+                            anadir_grupo = st.form_submit_button("Añadir Sección/Grupo")
+                            
+                            if anadir_grupo:
+                                success, mensaje = asignar_seccion_grupo_actividad(seccion_anadir, grupo_anadir, actividad_id)
+                                
+                                if success:
+                                    st.session_state[f"resultado_asignacion_{actividad_id}"] = mensaje
+                                    st.rerun()
+                                else:
+                                    st.error(mensaje)
                     else:
                         st.error(f"No se pudo obtener la información de la actividad {actividad_id}")
                 else:
@@ -1617,6 +1851,7 @@ try:
                     cursos_df['Estado'] = cursos_df['oculto'].apply(lambda x: "Oculto" if x == 1 else "Visible")
                 else:
                     cursos_df['Estado'] = "Visible"
+                estados_cursos = dict(zip(cursos_df['id'], cursos_df['Estado']))
                 
                 # Mostrar tabla de cursos con IDs
                 st.dataframe(
@@ -1636,10 +1871,10 @@ try:
                         curso_id_toggle = st.selectbox(
                             "Seleccionar Curso", 
                             options=cursos_df["id"].tolist(),
-                            format_func=lambda x: f"{cursos_df.loc[cursos_df['id'] == x, 'nombre'].iloc[0]} ({cursos_df.loc[cursos_df['id'] == x, 'Estado'].iloc[0]})"
+                            format_func=lambda x: f"{indice_cursos.etiqueta(x)} ({estados_cursos[x]})"
                         )
                         
-                        accion = "Ocultar" if cursos_df.loc[cursos_df['id'] == curso_id_toggle, 'Estado'].iloc[0] == "Visible" else "Mostrar"
+                        accion = "Ocultar" if estados_cursos[curso_id_toggle] == "Visible" else "Mostrar"
                         submit_toggle = st.form_submit_button(f"{accion} Curso")
                         
                         if submit_toggle:
@@ -1648,8 +1883,6 @@ try:
                             
                             if success:
                                 st.success(f"Curso {accion.lower()}do correctamente")
-                                # Limpiar caché para actualizar lista de cursos
-                                st.cache_data.clear()
                                 # Recargar página
                                 st.rerun()
                             else:
@@ -1662,7 +1895,7 @@ try:
                         curso_id_eliminar = st.selectbox(
                             "Seleccionar Curso a Eliminar", 
                             options=cursos_df["id"].tolist(),
-                            format_func=lambda x: cursos_df.loc[cursos_df['id'] == x, 'nombre'].iloc[0]
+                            format_func=indice_cursos
                         )
                         
                         submit_eliminar = st.form_submit_button("Eliminar Curso")
@@ -1672,8 +1905,6 @@ try:
                             
                             if success:
                                 st.success(message)
-                                # Limpiar caché para actualizar lista de cursos
-                                st.cache_data.clear()
                                 # Recargar página
                                 st.rerun()
                             else:
@@ -1698,8 +1929,6 @@ try:
                             
                             if success:
                                 st.success(f"Curso '{nombre_curso}' añadido correctamente")
-                                # Limpiar caché para actualizar lista de cursos
-                                st.cache_data.clear()
                                 # Recargar página
                                 st.rerun()
                             else:
@@ -1725,8 +1954,6 @@ try:
                             
                             if success:
                                 st.success(f"Curso '{nombre_curso}' añadido correctamente")
-                                # Limpiar caché para actualizar lista de cursos
-                                st.cache_data.clear()
                                 # Recargar página
                                 st.rerun()
                             else:
@@ -1,12 +1,32 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import sqlite3
 import os
+from datetime import date
 from typing import List, Optional
 
-# Crear la aplicación FastAPI
-app = FastAPI(title="API Sistema de Agentes")
+from src.api.cache_respuestas import cache_api, invalidar_cache, router as router_cache
+from src.api.condicional import comprobar_no_modificado
+from src.api.dependencias import get_db
+from src.api.detalle import router as router_detalle
+from src.api.exportar import router as router_exportar
+from src.api.listados import LIMITE_MAXIMO, LISTADO_ACTIVIDADES, LISTADO_AGENTES
+from src.api.lotes import router as router_lotes
+from src.api.respuestas import NIVEL_GZIP, TAMANO_MINIMO_GZIP, ListaJSONResponse, respuesta_pagina
+from src.database.busqueda import construir_consulta_fts
+from src.database.paginacion import filtros_actividades, filtros_agentes
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import verificar_pragmas
+from src.database.migraciones import asegurar_esquema
+
+# Crear la aplicación FastAPI; las respuestas se codifican con orjson
+app = FastAPI(title="API Sistema de Agentes", default_response_class=ORJSONResponse)
+
+# Comprimir con gzip las respuestas grandes si el cliente lo admite
+app.add_middleware(GZipMiddleware, minimum_size=TAMANO_MINIMO_GZIP, compresslevel=NIVEL_GZIP)
 
 # Configurar CORS para permitir solicitudes desde Streamlit
 app.add_middleware(
@@ -15,19 +35,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "X-Cache"],
 )
 
-# Ruta a la base de datos
-DATABASE_PATH = "sistema_agentes.db"
-
-# Función para obtener conexión a la base de datos
-def get_db():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-    finally:
-        conn.close()
+# Comprobar al arrancar los PRAGMAs activos y aplicar las migraciones pendientes
+@app.on_event("startup")
+def preparar_base_datos():
+    verificar_pragmas(DATABASE_PATH)
+    asegurar_esquema(DATABASE_PATH)
 
 # Modelos Pydantic
 class Agente(BaseModel):
@@ -45,33 +60,48 @@ class AgenteUpdate(BaseModel):
     seccion: Optional[str] = None
     grupo: Optional[str] = None
 
+# Los endpoints son funciones síncronas: FastAPI las ejecuta en su pool de hilos,
+# así una consulta lenta a SQLite no bloquea el bucle de eventos ni al resto de
+# peticiones (python -m src.api.concurrencia lo comprueba con carga). Los listados
+# devuelven ya su ListaJSONResponse para que la serialización se haga en el hilo
+# del endpoint, por bloques, y no en el bucle de eventos
+
 # Endpoints de la API
 @app.get("/")
-async def root():
+def root():
     return {"message": "API Sistema de Agentes"}
 
-# Obtener todos los agentes
+# Obtener los agentes con filtros, orden, paginación por cursor y selección de campos
 @app.get("/agentes", response_model=List[dict])
-async def get_agentes(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT 
-            nip, 
-            nombre, 
-            apellido1, 
-            apellido2, 
-            nombre || ' ' || apellido1 || COALESCE(' ' || apellido2, '') as nombre_completo,
-            seccion, 
-            grupo
-        FROM agentes
-        ORDER BY apellido1, nombre
-    """)
-    agentes = [dict(row) for row in cursor.fetchall()]
-    return agentes
+def get_agentes(
+    request: Request,
+    seccion: Optional[str] = None,
+    grupo: Optional[str] = None,
+    q: Optional[str] = Query(None, description="Búsqueda por NIP, nombre o apellidos"),
+    sort: Optional[str] = Query(None, description="apellidos o nip; con '-' delante, descendente"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por comas"),
+    db: sqlite3.Connection = Depends(get_db)
+):
+    validadores = comprobar_no_modificado(request, db, "agentes")
+    respuesta = cache_api.obtener(request, validadores)
+    if respuesta is not None:
+        return respuesta
+    condiciones, params = filtros_agentes(seccion, grupo, construir_consulta_fts(q) if q else None)
+    try:
+        agentes, siguiente = LISTADO_AGENTES.pagina(db, condiciones, params, sort, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cache_api.guardar(request, validadores, respuesta_pagina(agentes, siguiente, validadores.cabeceras))
 
 # Obtener un agente por NIP
 @app.get("/agentes/{nip}", response_model=dict)
-async def get_agente(nip: str, db: sqlite3.Connection = Depends(get_db)):
+def get_agente(nip: str, request: Request, db: sqlite3.Connection = Depends(get_db)):
+    validadores = comprobar_no_modificado(request, db, "agentes", comodin=False)
+    respuesta = cache_api.obtener(request, validadores)
+    if respuesta is not None:
+        return respuesta
     cursor = db.cursor()
     cursor.execute("""
         SELECT 
@@ -88,11 +118,11 @@ async def get_agente(nip: str, db: sqlite3.Connection = Depends(get_db)):
     agente = cursor.fetchone()
     if agente is None:
         raise HTTPException(status_code=404, detail=f"Agente con NIP {nip} no encontrado")
-    return dict(agente)
+    return cache_api.guardar(request, validadores, ORJSONResponse(content=dict(agente), headers=validadores.cabeceras))
 
 # Crear un nuevo agente
 @app.post("/agentes", response_model=dict)
-async def create_agente(agente: Agente, db: sqlite3.Connection = Depends(get_db)):
+def create_agente(agente: Agente, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     
     # Verificar si el agente ya existe
@@ -113,6 +143,7 @@ async def create_agente(agente: Agente, db: sqlite3.Connection = Depends(get_db)
             agente.grupo
         ))
         db.commit()
+        invalidar_cache("agentes")
         
         # Obtener el agente recién creado
         cursor.execute("""
@@ -134,7 +165,7 @@ async def create_agente(agente: Agente, db: sqlite3.Connection = Depends(get_db)
 
 # Actualizar un agente existente
 @app.put("/agentes/{nip}", response_model=dict)
-async def update_agente(nip: str, agente_update: AgenteUpdate, db: sqlite3.Connection = Depends(get_db)):
+def update_agente(nip: str, agente_update: AgenteUpdate, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     
     # Verificar si el agente existe
@@ -175,6 +206,7 @@ async def update_agente(nip: str, agente_update: AgenteUpdate, db: sqlite3.Conne
     try:
         cursor.execute(query, params)
         db.commit()
+        invalidar_cache("agentes")
         
         if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail=f"No se pudo actualizar el agente con NIP {nip}")
@@ -199,7 +231,7 @@ async def update_agente(nip: str, agente_update: AgenteUpdate, db: sqlite3.Conne
 
 # Eliminar un agente
 @app.delete("/agentes/{nip}")
-async def delete_agente(nip: str, db: sqlite3.Connection = Depends(get_db)):
+def delete_agente(nip: str, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
     
     # Verificar si el agente existe
@@ -210,35 +242,46 @@ async def delete_agente(nip: str, db: sqlite3.Connection = Depends(get_db)):
     try:
         cursor.execute("DELETE FROM agentes WHERE nip = ?", (nip,))
         db.commit()
+        invalidar_cache("agentes")
         return {"message": f"Agente con NIP {nip} eliminado correctamente"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al eliminar agente: {str(e)}")
 
-# Endpoint para obtener actividades
+# Endpoint para obtener actividades con filtros, orden, paginación por cursor y selección de campos
 @app.get("/actividades", response_model=List[dict])
-async def get_actividades(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("""
-        SELECT 
-            a.id,
-            a.fecha,
-            a.hora_inicio,
-            a.hora_fin,
-            c.nombre as curso,
-            a.turno,
-            a.estado,
-            a.observaciones
-        FROM actividades a
-        LEFT JOIN cursos c ON a.id_curso = c.id
-        ORDER BY a.fecha DESC, a.hora_inicio
-    """)
-    actividades = [dict(row) for row in cursor.fetchall()]
-    return actividades
+def get_actividades(
+    request: Request,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    curso: Optional[str] = Query(None, description="Nombre del curso"),
+    turno: Optional[str] = Query(None, description="Nombre del turno"),
+    sort: Optional[str] = Query(None, description="fecha o id; con '-' delante, descendente (por defecto -fecha)"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos separados por comas"),
+    db: sqlite3.Connection = Depends(get_db)
+):
+    validadores = comprobar_no_modificado(
+        request, db, "actividades", "agentes_actividades", "turno", "cursos", "monitores"
+    )
+    respuesta = cache_api.obtener(request, validadores)
+    if respuesta is not None:
+        return respuesta
+    condiciones, params = filtros_actividades(fecha_desde, fecha_hasta, curso, turno)
+    try:
+        actividades, siguiente = LISTADO_ACTIVIDADES.pagina(db, condiciones, params, sort, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cache_api.guardar(request, validadores, respuesta_pagina(actividades, siguiente, validadores.cabeceras))
 
 # Endpoint para obtener agentes asignados a una actividad
 @app.get("/actividades/{actividad_id}/agentes", response_model=List[dict])
-async def get_agentes_actividad(actividad_id: int, db: sqlite3.Connection = Depends(get_db)):
+def get_agentes_actividad(actividad_id: int, request: Request, db: sqlite3.Connection = Depends(get_db)):
+    validadores = comprobar_no_modificado(request, db, "agentes_actividades", "agentes")
+    respuesta = cache_api.obtener(request, validadores)
+    if respuesta is not None:
+        return respuesta
     cursor = db.cursor()
     cursor.execute("""
         SELECT 
@@ -249,12 +292,24 @@ async def get_agentes_actividad(actividad_id: int, db: sqlite3.Connection = Depe
             a.nombre || ' ' || a.apellido1 || COALESCE(' ' || a.apellido2, '') as nombre_completo,
             aa.asistencia
         FROM agentes_actividades aa
-        JOIN agentes a ON aa.id_agente = a.nip
-        WHERE aa.id_actividad = ?
+        JOIN agentes a ON aa.agente_nip = a.nip
+        WHERE aa.actividad_id = ?
         ORDER BY a.apellido1, a.nombre
     """, (actividad_id,))
     agentes = [dict(row) for row in cursor.fetchall()]
-    return agentes
+    return cache_api.guardar(request, validadores, ListaJSONResponse(content=agentes, headers=validadores.cabeceras))
+
+# Endpoints de escritura por lotes (POST /agentes/bulk, POST /actividades/{id}/agentes/bulk, PATCH /asistencia/bulk)
+app.include_router(router_lotes)
+
+# Exportación en streaming como NDJSON o CSV (GET /export/{tabla})
+app.include_router(router_exportar)
+
+# Actividades con sus agentes asignados (GET /actividades/detalle)
+app.include_router(router_detalle)
+
+# Contadores de la caché de respuestas (GET /cache/estadisticas)
+app.include_router(router_cache)
 
 # Ejecutar la aplicación con uvicorn si se ejecuta directamente
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""
+Caché en proceso de las respuestas de lectura de la API
+
+Cada entrada guarda el cuerpo ya codificado de una respuesta, indexado por ruta
+y parámetros, junto con la ETag calculada a partir de cambios_tablas. Una
+entrada solo se sirve mientras la ETag actual de sus tablas coincida, así que
+una escritura hecha desde cualquier proceso (la aplicación Streamlit, un script
+o la otra API) la invalida en el acto. Además, los endpoints de escritura de la
+API llaman a invalidar_cache() con las tablas que modifican para liberar esas
+entradas sin esperar a que se vuelvan a pedir. La caché es LRU, con un máximo
+de entradas y de bytes, y con TTL.
+
+GET /cache/estadisticas devuelve los contadores de aciertos y fallos.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import APIRouter, Response
+
+# Número máximo de respuestas, bytes totales y bytes por respuesta que se guardan
+CACHE_MAX_ENTRADAS = int(os.getenv("API_CACHE_MAX_ENTRADAS", "256"))
+CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_MB", "64")) * 1024 * 1024
+CACHE_MAX_BYTES_ENTRADA = int(os.getenv("API_CACHE_MAX_MB_ENTRADA", "8")) * 1024 * 1024
+
+# Segundos que una respuesta puede estar guardada sin volver a consultarla
+CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))
+
+router = APIRouter()
+
+
+class CacheRespuestas:
+    """LRU con TTL de respuestas codificadas, validadas por ETag, segura entre hilos"""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, max_bytes=CACHE_MAX_BYTES,
+                 max_bytes_entrada=CACHE_MAX_BYTES_ENTRADA, ttl=CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.max_bytes_entrada = max_bytes_entrada
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # clave → (etag, instante, tablas, status, media_type, cabeceras, cuerpo)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._contadores = {"aciertos": 0, "fallos": 0, "invalidadas": 0, "expiradas": 0, "descartadas": 0}
+
+    @staticmethod
+    def clave(request):
+        """Clave de una petición: ruta y parámetros ordenados"""
+        return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+    def _quitar(self, clave):
+        entrada = self._entradas.pop(clave)
+        self._bytes -= len(entrada[-1])
+
+    def obtener(self, request, validadores):
+        """
+        Devuelve la respuesta guardada para la petición si sigue siendo válida
+
+        Returns:
+            Response con el cuerpo guardado o None si no hay entrada válida
+        """
+        clave = self.clave(request)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and time.monotonic() - entrada[1] > self.ttl:
+                self._quitar(clave)
+                self._contadores["expiradas"] += 1
+                entrada = None
+            if entrada is None or entrada[0] != validadores.etag:
+                self._contadores["fallos"] += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self._contadores["aciertos"] += 1
+        _, _, _, status, media_type, cabeceras, cuerpo = entrada
+        respuesta = Response(content=cuerpo, status_code=status, media_type=media_type, headers=cabeceras)
+        respuesta.headers["X-Cache"] = "HIT"
+        return respuesta
+
+    def guardar(self, request, validadores, respuesta):
+        """Guarda una respuesta ya codificada y la devuelve marcada como fallo de caché"""
+        cuerpo = respuesta.body
+        if respuesta.status_code == 200 and len(cuerpo) <= self.max_bytes_entrada:
+            # Se guardan las cabeceras propias de la respuesta; content-length y
+            # content-type los vuelve a calcular Response a partir del cuerpo
+            cabeceras = {
+                nombre: valor for nombre, valor in respuesta.headers.items()
+                if nombre not in ("content-length", "content-type")
+            }
+            clave = self.clave(request)
+            entrada = (validadores.etag, time.monotonic(), validadores.tablas, respuesta.status_code,
+                       respuesta.media_type, cabeceras, cuerpo)
+            with self._lock:
+                if clave in self._entradas:
+                    self._quitar(clave)
+                self._entradas[clave] = entrada
+                self._bytes += len(cuerpo)
+                while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                    self._quitar(next(iter(self._entradas)))
+                    self._contadores["descartadas"] += 1
+        respuesta.headers["X-Cache"] = "MISS"
+        return respuesta
+
+    def invalidar(self, *tablas):
+        """Elimina las entradas que dependen de alguna de las tablas indicadas"""
+        tablas = set(tablas)
+        with self._lock:
+            claves = [clave for clave, entrada in self._entradas.items() if tablas.intersection(entrada[2])]
+            for clave in claves:
+                self._quitar(clave)
+            self._contadores["invalidadas"] += len(claves)
+
+    def estadisticas(self):
+        """Contadores de uso y ocupación de la caché"""
+        with self._lock:
+            consultas = self._contadores["aciertos"] + self._contadores["fallos"]
+            return dict(
+                self._contadores,
+                tasa_aciertos=self._contadores["aciertos"] / consultas if consultas else 0.0,
+                entradas=len(self._entradas),
+                bytes=self._bytes,
+                max_entradas=self.max_entradas,
+                max_bytes=self.max_bytes,
+                ttl=self.ttl,
+            )
+
+
+# Caché compartida por todos los endpoints del proceso
+cache_api = CacheRespuestas()
+
+
+def invalidar_cache(*tablas):
+    """Invalida las respuestas cacheadas que dependen de las tablas indicadas"""
+    cache_api.invalidar(*tablas)
+
+
+# Contadores de la caché para monitorización
+@router.get("/cache/estadisticas")
+def get_estadisticas_cache():
+    return cache_api.estadisticas()
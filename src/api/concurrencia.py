@@ -0,0 +1,123 @@
+"""
+Prueba de concurrencia de la API
+
+Mide la latencia de una petición ligera (por defecto GET /agentes/{nip}) en
+reposo y mientras varios clientes piden sin parar un listado grande (por
+defecto GET /actividades). Si las consultas bloquearan el bucle de eventos, el
+p99 de la petición ligera crecería hasta el tiempo del listado; con los
+endpoints ejecutándose en el pool de hilos debe mantenerse estable.
+
+Uso (con la API en marcha):
+    python -m src.api.concurrencia --url http://localhost:8000 --carga 2
+"""
+
+import argparse
+import math
+import multiprocessing
+import time
+
+import requests
+
+# p99 máximo con carga (ms); si las consultas bloquearan el bucle de eventos
+# se acercaría a lo que tarda el listado completo, del orden de segundos
+LIMITE_P99_MS = 100.0
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def medir_latencias(sesion, url, peticiones):
+    """Lanza peticiones secuenciales y devuelve sus latencias en milisegundos"""
+    latencias = []
+    for _ in range(peticiones):
+        inicio = time.perf_counter()
+        respuesta = sesion.get(url)
+        respuesta.raise_for_status()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+
+def _generar_carga(url, parar, completadas):
+    with requests.Session() as sesion:
+        while not parar.is_set():
+            sesion.get(url).raise_for_status()
+            with completadas.get_lock():
+                completadas.value += 1
+
+
+def probar_concurrencia(base_url, ruta_ligera, ruta_pesada, carga=2, peticiones=200):
+    """
+    Compara la latencia de ruta_ligera en reposo y con carga sobre ruta_pesada
+
+    Returns:
+        Diccionario con p50/p99 en reposo y con carga (ms) y las peticiones
+        pesadas completadas durante la medición
+    """
+    url_ligera = base_url.rstrip("/") + ruta_ligera
+    url_pesada = base_url.rstrip("/") + ruta_pesada
+
+    with requests.Session() as sesion:
+        reposo = medir_latencias(sesion, url_ligera, peticiones)
+
+        # La carga se genera desde otros procesos para que descargar los
+        # listados no compita por el GIL con el cliente que mide
+        parar = multiprocessing.Event()
+        completadas = multiprocessing.Value("i", 0)
+        clientes = [
+            multiprocessing.Process(target=_generar_carga, args=(url_pesada, parar, completadas))
+            for _ in range(carga)
+        ]
+        for cliente in clientes:
+            cliente.start()
+        # Dejar que las peticiones pesadas estén en curso antes de medir
+        time.sleep(0.5)
+        try:
+            con_carga = medir_latencias(sesion, url_ligera, peticiones)
+        finally:
+            parar.set()
+            for cliente in clientes:
+                cliente.join()
+
+    return {
+        "reposo_p50": percentil(reposo, 50),
+        "reposo_p99": percentil(reposo, 99),
+        "carga_p50": percentil(con_carga, 50),
+        "carga_p99": percentil(con_carga, 99),
+        "peticiones_pesadas": completadas.value,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de concurrencia de la API")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API")
+    parser.add_argument("--ligera", default="/agentes/{nip}", help="Ruta de la petición ligera cuya latencia se mide")
+    parser.add_argument("--nip", help="NIP del agente a consultar (por defecto el primero de /agentes)")
+    parser.add_argument("--pesada", default="/actividades", help="Ruta del listado que genera la carga")
+    parser.add_argument("--carga", type=int, default=2, help="Número de clientes pidiendo el listado")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones ligeras en cada medición")
+    parser.add_argument("--limite-ms", type=float, default=LIMITE_P99_MS, help="p99 máximo admitido con carga en milisegundos")
+    args = parser.parse_args()
+
+    nip = args.nip
+    if nip is None and "{nip}" in args.ligera:
+        agentes = requests.get(args.url.rstrip("/") + "/agentes").json()
+        if not agentes:
+            parser.error("No hay agentes; indica --nip")
+        nip = agentes[0]["nip"]
+
+    ruta_ligera = args.ligera.replace("{nip}", str(nip))
+    resultado = probar_concurrencia(args.url, ruta_ligera, args.pesada, args.carga, args.peticiones)
+    print(f"En reposo:  p50 {resultado['reposo_p50']:.1f} ms  p99 {resultado['reposo_p99']:.1f} ms")
+    print(
+        f"Con carga:  p50 {resultado['carga_p50']:.1f} ms  p99 {resultado['carga_p99']:.1f} ms "
+        f"({resultado['peticiones_pesadas']} peticiones a {args.pesada} completadas)"
+    )
+    if resultado["carga_p99"] > args.limite_ms:
+        print(f"ERROR  El p99 con carga supera {args.limite_ms:g} ms.")
+        raise SystemExit(1)
+    print("OK  La latencia de las peticiones ligeras se mantiene estable con carga.")
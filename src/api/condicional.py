@@ -0,0 +1,97 @@
+"""
+GET condicionales con ETag y Last-Modified
+
+Los validadores de una respuesta se calculan a partir de los contadores de
+cambios (cambios_tablas) de las tablas que lee el endpoint, con una consulta
+de una fila por tabla. Si el cliente envía If-None-Match con la misma ETag (o
+If-Modified-Since posterior a la última modificación) se responde 304 sin
+ejecutar la consulta del endpoint.
+"""
+
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import HTTPException
+
+from src.database.cambios import versiones_tablas
+
+
+def _opaca(etiqueta):
+    """Parte opaca de una ETag, sin el prefijo W/ de las débiles"""
+    return etiqueta[2:] if etiqueta.startswith("W/") else etiqueta
+
+
+class Validadores:
+    """
+    ETag débil y fecha de última modificación de una respuesta, y las tablas de las que depende
+
+    La ETag es débil (W/"...") porque GZipMiddleware envía el mismo contenido
+    con y sin compresión: una ETag fuerte tendría que distinguir cada
+    codificación, y If-None-Match compara de todos modos de forma débil.
+    """
+
+    def __init__(self, etag, modificado, tablas=()):
+        self.etag = etag
+        self.modificado = modificado
+        self.tablas = tuple(tablas)
+
+    @property
+    def cabeceras(self):
+        """Cabeceras de la respuesta; no-cache obliga a revalidar antes de reutilizarla"""
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.modificado, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+    def coincide(self, request, comodin=True):
+        """
+        Indica si la copia del cliente sigue siendo válida
+
+        Args:
+            request: Petición con If-None-Match o If-Modified-Since
+            comodin: Si If-None-Match: * coincide; solo es correcto cuando el
+                recurso existe siempre (listados), no antes de buscar una fila
+        """
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match usa la comparación débil: se ignora el prefijo W/
+            etiquetas = [_opaca(etiqueta.strip()) for etiqueta in if_none_match.split(",")]
+            return (comodin and "*" in etiquetas) or _opaca(self.etag) in etiquetas
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            # Last-Modified tiene resolución de segundos: una escritura en el
+            # mismo segundo que la copia del cliente no cambia la fecha, así
+            # que solo vale una fecha estrictamente posterior
+            try:
+                return self.modificado < parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+def validadores_tablas(conn, *tablas):
+    """Calcula los validadores de una respuesta que depende de las tablas indicadas"""
+    versiones = versiones_tablas(conn, tablas)
+    huella = hashlib.sha1(repr(versiones).encode("utf-8")).hexdigest()[:20]
+    return Validadores(f'W/"{huella}"', max(modificado for _, _, modificado in versiones), tablas)
+
+
+def comprobar_no_modificado(request, conn, *tablas, comodin=True):
+    """
+    Calcula los validadores y responde 304 si la copia del cliente sigue siendo válida
+
+    Los endpoints de detalle pasan comodin=False: If-None-Match: * no debe
+    responder 304 antes de saber si la fila existe.
+
+    Returns:
+        Validadores para añadir a la respuesta
+
+    Raises:
+        HTTPException: 304 Not Modified con las cabeceras de validación
+    """
+    validadores = validadores_tablas(conn, *tablas)
+    if validadores.coincide(request, comodin):
+        raise HTTPException(status_code=304, headers=validadores.cabeceras)
+    return validadores
@@ -0,0 +1,14 @@
+"""
+Dependencias compartidas por los endpoints de la API
+"""
+
+from src.database.pool import DATABASE_PATH, get_pool
+
+
+# Conexión a la base de datos desde el pool compartido, devuelta al terminar la petición
+def get_db():
+    conn = get_pool(DATABASE_PATH).checkout()
+    try:
+        yield conn
+    finally:
+        conn.close()
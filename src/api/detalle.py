@@ -0,0 +1,119 @@
+"""
+Actividades con sus agentes asignados en una sola petición
+
+GET /actividades/detalle devuelve un conjunto de actividades (por IDs o por
+rango de fechas) con la lista de sus agentes y su asistencia incrustada. Se
+resuelve con dos consultas, las actividades y todas sus asignaciones, en lugar
+de una petición a /actividades/{id}/agentes por actividad. Ambas APIs incluyen
+este router.
+"""
+
+import sqlite3
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from src.api.cache_respuestas import cache_api
+from src.api.condicional import comprobar_no_modificado
+from src.api.dependencias import get_db
+from src.api.listados import LISTADO_ACTIVIDADES
+from src.api.respuestas import ListaJSONResponse
+from src.database.paginacion import filtros_actividades
+
+# Máximo de actividades por petición (también acota los parámetros del IN)
+LIMITE_ACTIVIDADES_DETALLE = 500
+
+# Agentes de un conjunto de actividades; {marcadores} son los IDs
+SQL_AGENTES_ACTIVIDADES = """
+    SELECT
+        aa.actividad_id,
+        a.nip,
+        a.nombre,
+        a.apellido1,
+        a.apellido2,
+        a.nombre || ' ' || a.apellido1 || COALESCE(' ' || a.apellido2, '') as nombre_completo,
+        a.seccion,
+        a.grupo,
+        aa.asistencia
+    FROM agentes_actividades aa
+    JOIN agentes a ON aa.agente_nip = a.nip
+    WHERE aa.actividad_id IN ({marcadores})
+    ORDER BY aa.actividad_id, a.apellido1, a.nombre
+"""
+
+router = APIRouter()
+
+
+def parsear_ids(ids):
+    """
+    Convierte una lista de IDs separados por comas en enteros sin repetir
+
+    Raises:
+        ValueError: Si algún ID no es un entero
+    """
+    try:
+        return list(dict.fromkeys(int(valor) for valor in ids.split(",") if valor.strip()))
+    except ValueError:
+        raise ValueError(f"IDs no válidos: {ids}")
+
+
+def agentes_por_actividad(conn, actividad_ids):
+    """Devuelve un diccionario actividad_id → lista de agentes con su asistencia"""
+    agentes = {actividad_id: [] for actividad_id in actividad_ids}
+    if not actividad_ids:
+        return agentes
+    marcadores = ", ".join("?" for _ in actividad_ids)
+    for fila in conn.execute(SQL_AGENTES_ACTIVIDADES.format(marcadores=marcadores), list(actividad_ids)):
+        agente = dict(fila)
+        agentes[agente.pop("actividad_id")].append(agente)
+    return agentes
+
+
+def actividades_con_agentes(conn, condiciones, params, limite=LIMITE_ACTIVIDADES_DETALLE):
+    """
+    Devuelve las actividades que cumplen las condiciones, por fecha, con sus agentes
+
+    Raises:
+        ValueError: Si hay más de limite actividades
+    """
+    actividades, siguiente = LISTADO_ACTIVIDADES.pagina(conn, condiciones, params, "fecha", limite)
+    if siguiente is not None:
+        raise ValueError(f"Hay más de {limite} actividades; acota los IDs o el rango de fechas")
+    agentes = agentes_por_actividad(conn, [actividad["id"] for actividad in actividades])
+    for actividad in actividades:
+        actividad["agentes"] = agentes[actividad["id"]]
+    return actividades
+
+
+# Obtener actividades con sus agentes asignados
+@router.get("/actividades/detalle", response_model=List[dict])
+def get_actividades_detalle(
+    request: Request,
+    ids: Optional[str] = Query(None, description="IDs de actividad separados por comas"),
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    db: sqlite3.Connection = Depends(get_db)
+):
+    if ids is None and fecha_desde is None and fecha_hasta is None:
+        raise HTTPException(status_code=400, detail="Indica ids o un rango de fechas")
+    validadores = comprobar_no_modificado(
+        request, db, "actividades", "agentes_actividades", "agentes", "turno", "cursos", "monitores"
+    )
+    respuesta = cache_api.obtener(request, validadores)
+    if respuesta is not None:
+        return respuesta
+    condiciones, params = filtros_actividades(fecha_desde, fecha_hasta)
+    try:
+        if ids is not None:
+            actividad_ids = parsear_ids(ids)
+            if len(actividad_ids) > LIMITE_ACTIVIDADES_DETALLE:
+                raise ValueError(f"Como mucho {LIMITE_ACTIVIDADES_DETALLE} IDs por petición")
+            if not actividad_ids:
+                return ListaJSONResponse(content=[], headers=validadores.cabeceras)
+            condiciones.append(f"a.id IN ({', '.join('?' for _ in actividad_ids)})")
+            params.extend(actividad_ids)
+        actividades = actividades_con_agentes(db, condiciones, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cache_api.guardar(request, validadores, ListaJSONResponse(content=actividades, headers=validadores.cabeceras))
@@ -0,0 +1,248 @@
+"""
+Exportación de tablas en streaming como NDJSON o CSV
+
+GET /export/{tabla} recorre el cursor de SQLite con fetchmany y envía cada
+bloque de filas en cuanto está codificado, así que la memoria usada no depende
+del tamaño del histórico. Además de las tablas base se puede exportar
+'asistencia': cada asignación con los datos de su actividad y de su agente.
+Ambas APIs incluyen este router.
+
+Cada exportación sigue el orden de un índice para que SQLite no tenga que
+ordenar el resultado completo antes de devolver la primera fila;
+python -m src.api.exportar --verificar lo comprueba con EXPLAIN QUERY PLAN.
+
+Uso:
+    python -m src.api.exportar --verificar
+"""
+
+import argparse
+import csv
+import io
+import sqlite3
+import sys
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from src.api.respuestas import codificar
+from src.database.pool import DATABASE_PATH, get_pool
+from src.database.pragmas import aplicar_pragmas
+
+# Filas que se leen y codifican de una vez
+TAMANO_BLOQUE_EXPORTACION = 1000
+
+TIPOS_CONTENIDO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+router = APIRouter()
+
+
+class Exportacion:
+    """
+    Consulta de una exportación
+
+    Args:
+        columnas: Lista de pares (expresión SQL, nombre de la columna)
+        desde: Cláusula FROM con sus JOIN
+        orden: Cláusula ORDER BY; debe coincidir con el orden de un índice
+            para que SQLite no ordene el resultado en memoria
+        indices: Índices que debe usar el plan de la consulta (--verificar)
+        campo_fecha: Expresión con la que se filtra por fecha_desde/fecha_hasta
+            (None si la exportación no admite esos filtros)
+    """
+
+    def __init__(self, columnas, desde, orden, campo_fecha=None, indices=()):
+        self.columnas = columnas
+        self.desde = desde
+        self.orden = orden
+        self.campo_fecha = campo_fecha
+        self.indices = indices
+
+    @property
+    def nombres(self):
+        return [nombre for _, nombre in self.columnas]
+
+    def sql(self, fecha_desde=None, fecha_hasta=None):
+        """Devuelve la consulta y sus parámetros"""
+        condiciones = []
+        params = []
+        if fecha_desde is not None:
+            condiciones.append(f"{self.campo_fecha} >= ?")
+            params.append(fecha_desde.isoformat())
+        if fecha_hasta is not None:
+            condiciones.append(f"{self.campo_fecha} <= ?")
+            params.append(fecha_hasta.isoformat())
+        where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+        seleccion = ", ".join(f"{expresion} as {nombre}" for expresion, nombre in self.columnas)
+        return f"SELECT {seleccion} {self.desde}{where} ORDER BY {self.orden}", params
+
+
+def _columnas(alias, nombres):
+    return [(f"{alias}.{nombre}", nombre) for nombre in nombres]
+
+
+EXPORTACIONES = {
+    "agentes": Exportacion(
+        _columnas("a", ["nip", "nombre", "apellido1", "apellido2", "email", "telefono", "seccion", "grupo"]),
+        "FROM agentes a", "a.nip"
+    ),
+    "actividades": Exportacion(
+        _columnas("a", ["id", "fecha", "turno_id", "monitor_nip", "curso_id", "notas"]),
+        "FROM actividades a", "a.fecha, a.id", campo_fecha="a.fecha",
+        indices=("idx_actividades_fecha",)
+    ),
+    "agentes_actividades": Exportacion(
+        _columnas("aa", ["actividad_id", "agente_nip", "asistencia"]),
+        "FROM agentes_actividades aa", "aa.agente_nip, aa.actividad_id"
+    ),
+    "cursos": Exportacion(_columnas("c", ["id", "nombre", "descripcion"]), "FROM cursos c", "c.id"),
+    "turno": Exportacion(_columnas("t", ["id", "nombre"]), "FROM turno t", "t.id"),
+    "monitores": Exportacion(
+        _columnas("m", ["nip", "nombre", "apellido1", "apellido2"]), "FROM monitores m", "m.nip"
+    ),
+    # Asistencia: una fila por asignación con su actividad y su agente
+    "asistencia": Exportacion(
+        [
+            ("act.id", "actividad_id"),
+            ("act.fecha", "fecha"),
+            ("t.nombre", "turno"),
+            ("c.nombre", "curso"),
+            ("act.monitor_nip", "monitor_nip"),
+            ("ag.nip", "agente_nip"),
+            ("ag.nombre", "nombre"),
+            ("ag.apellido1", "apellido1"),
+            ("ag.apellido2", "apellido2"),
+            ("ag.seccion", "seccion"),
+            ("ag.grupo", "grupo"),
+            ("aa.asistencia", "asistencia"),
+        ],
+        # CROSS JOIN fija el orden de los bucles: actividades por
+        # idx_actividades_fecha y sus asignaciones por (actividad_id,
+        # agente_nip), que ya salen en el orden de ORDER BY. Sin estadísticas
+        # (ANALYZE) el planificador podría empezar por agentes_actividades y
+        # ordenar todo el resultado en memoria
+        """
+        FROM actividades act
+        CROSS JOIN agentes_actividades aa ON aa.actividad_id = act.id
+        CROSS JOIN agentes ag ON ag.nip = aa.agente_nip
+        LEFT JOIN turno t ON t.id = act.turno_id
+        LEFT JOIN cursos c ON c.id = act.curso_id
+        """,
+        "act.fecha, act.id, aa.agente_nip",
+        campo_fecha="act.fecha",
+        indices=("idx_actividades_fecha", "idx_agentes_actividades_actividad_agente")
+    ),
+}
+
+
+def _codificar_ndjson(nombres, filas):
+    return b"".join(codificar(dict(zip(nombres, fila))) + b"\n" for fila in filas)
+
+
+def _codificar_csv(filas):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(filas)
+    return buffer.getvalue().encode("utf-8")
+
+
+def generar_exportacion(query, params, nombres, formato, tamano_bloque=TAMANO_BLOQUE_EXPORTACION):
+    """
+    Genera el contenido de una exportación bloque a bloque
+
+    La conexión se toma del pool dentro del generador y se devuelve al
+    terminar, aunque el cliente corte la descarga a medias.
+    """
+    conn = get_pool(DATABASE_PATH).checkout()
+    # Sin row_factory las filas son tuplas, más baratas de crear
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        cursor.execute(query, params)
+        if formato == "csv":
+            yield _codificar_csv([nombres])
+        while True:
+            filas = cursor.fetchmany(tamano_bloque)
+            if not filas:
+                break
+            yield _codificar_csv(filas) if formato == "csv" else _codificar_ndjson(nombres, filas)
+    finally:
+        # Cerrar el cursor finaliza la consulta y libera la instantánea de lectura
+        cursor.close()
+        conn.close()
+
+
+# Exportar una tabla o la asistencia completa
+@router.get("/export/{tabla}")
+def exportar(
+    tabla: str,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+):
+    exportacion = EXPORTACIONES.get(tabla)
+    if exportacion is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No se puede exportar {tabla}. Opciones: {', '.join(EXPORTACIONES)}"
+        )
+    if exportacion.campo_fecha is None and (fecha_desde or fecha_hasta):
+        raise HTTPException(status_code=400, detail=f"{tabla} no admite filtros de fecha")
+
+    query, params = exportacion.sql(fecha_desde, fecha_hasta)
+    return StreamingResponse(
+        generar_exportacion(query, params, exportacion.nombres, format),
+        media_type=TIPOS_CONTENIDO[format],
+        headers={"Content-Disposition": f'attachment; filename="{tabla}.{format}"'},
+    )
+
+
+def verificar_planes(conn):
+    """
+    Comprueba con EXPLAIN QUERY PLAN que ninguna exportación ordena en memoria
+    y que usan los índices esperados, con y sin filtros de fecha
+
+    Raises:
+        AssertionError: Si algún plan usa un B-tree temporal o no usa sus índices
+    """
+    errores = []
+    for tabla, exportacion in EXPORTACIONES.items():
+        variantes = [(tabla, exportacion.sql())]
+        if exportacion.campo_fecha is not None:
+            variantes.append((
+                f"{tabla} por fechas",
+                exportacion.sql(date(2024, 1, 1), date(2024, 1, 31))
+            ))
+        for descripcion, (query, params) in variantes:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            detalle = " | ".join(str(fila[-1]) for fila in plan)
+            faltan = [indice for indice in exportacion.indices if indice not in detalle]
+            if "TEMP B-TREE" in detalle or faltan:
+                errores.append(f"{descripcion}: {detalle}")
+            else:
+                print(f"OK  {descripcion}: {detalle}")
+    assert not errores, "Exportaciones que ordenan en memoria o no usan sus índices:\n" + "\n".join(errores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportación de tablas en streaming")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    parser.add_argument("--verificar", action="store_true", help="Comprueba los planes de las exportaciones")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    aplicar_pragmas(conn)
+    try:
+        if args.verificar:
+            try:
+                verificar_planes(conn)
+            except AssertionError as e:
+                print(e)
+                sys.exit(1)
+        else:
+            print(f"Exportaciones disponibles: {', '.join(EXPORTACIONES)}")
+    finally:
+        conn.close()
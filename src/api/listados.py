@@ -0,0 +1,172 @@
+"""
+Listados de la API con filtros, orden, paginación por cursor y selección de campos
+
+Cada listado declara sus campos (alias → expresión SQL) y los órdenes admitidos
+con la clave única que los desempata. La página se pide con limit y un cursor
+opaco que codifica el orden y la clave de la última fila devuelta, de modo que
+la consulta continúa por índice (ConsultaPaginada) sin OFFSET. Con fields solo
+se seleccionan en SQL los campos pedidos, más los de la clave si hacen falta
+para el cursor.
+"""
+
+import base64
+import binascii
+import json
+
+from src.database.paginacion import ConsultaPaginada
+
+# Máximo de filas por página
+LIMITE_MAXIMO = 1000
+
+
+def codificar_cursor(orden, clave):
+    """Codifica el orden y la clave de la última fila en un cursor opaco"""
+    datos = json.dumps({"orden": orden, "clave": list(clave)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor, orden):
+    """
+    Devuelve la clave codificada en un cursor
+
+    Raises:
+        ValueError: Si el cursor no es válido o se generó con otro orden
+    """
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        clave = tuple(datos["clave"])
+        orden_cursor = datos["orden"]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Cursor no válido")
+    # Cada valor de la clave se pasa como parámetro a SQLite
+    if not all(valor is None or isinstance(valor, (str, int, float)) for valor in clave):
+        raise ValueError("Cursor no válido")
+    if orden_cursor != orden:
+        raise ValueError("El cursor se generó con otro orden")
+    return clave
+
+
+class Listado:
+    """
+    Listado paginable de la API
+
+    Args:
+        campos: Diccionario ordenado alias → expresión SQL de cada campo
+        desde: Cláusula FROM con sus JOIN
+        ordenes: Diccionario nombre del orden → lista de alias que forman la
+            clave única, en orden
+        orden_defecto: Orden por defecto; un '-' delante indica descendente
+    """
+
+    def __init__(self, campos, desde, ordenes, orden_defecto):
+        self.campos = campos
+        self.desde = desde
+        self.ordenes = ordenes
+        self.orden_defecto = orden_defecto
+
+    def _consulta(self, orden):
+        nombre = orden.lstrip("-")
+        if nombre not in self.ordenes:
+            raise ValueError(f"Orden no válido: {orden}. Opciones: {', '.join(sorted(self.ordenes))}")
+        clave = [(self.campos[alias], alias) for alias in self.ordenes[nombre]]
+        return ConsultaPaginada([], self.desde, clave, descendente=orden.startswith("-"))
+
+    def _campos(self, fields):
+        if not fields:
+            return list(self.campos)
+        pedidos = list(dict.fromkeys(campo.strip() for campo in fields.split(",") if campo.strip()))
+        desconocidos = [campo for campo in pedidos if campo not in self.campos]
+        if desconocidos:
+            raise ValueError(f"Campos no válidos: {', '.join(desconocidos)}")
+        return pedidos
+
+    def pagina(self, conn, condiciones=(), params=(), orden=None, limite=None, cursor=None, fields=None):
+        """
+        Devuelve una página del listado
+
+        Args:
+            conn: Conexión a la base de datos
+            condiciones: Condiciones SQL de los filtros (se combinan con AND)
+            params: Parámetros de las condiciones
+            orden: Nombre del orden, con '-' delante para descendente
+            limite: Número máximo de filas (None para todas)
+            cursor: Cursor devuelto por la página anterior
+            fields: Campos separados por comas (None para todos)
+
+        Returns:
+            Tupla (filas, cursor_siguiente) con las filas como diccionarios y
+            cursor_siguiente None si no hay más filas
+
+        Raises:
+            ValueError: Si el orden, los campos o el cursor no son válidos
+        """
+        orden = orden or self.orden_defecto
+        consulta = self._consulta(orden)
+        pedidos = self._campos(fields)
+        despues_de = decodificar_cursor(cursor, orden) if cursor else None
+        if despues_de is not None and len(despues_de) != len(consulta.clave):
+            raise ValueError("Cursor no válido")
+
+        # Los campos de la clave se seleccionan también para poder generar el cursor
+        seleccion = list(dict.fromkeys(pedidos + [alias for _, alias in consulta.clave]))
+        columnas = [f"{self.campos[alias]} as {alias}" for alias in seleccion]
+        query, params = consulta.sql_pagina(
+            condiciones, params, None if limite is None else limite + 1, despues_de, columnas=columnas
+        )
+        filas = conn.execute(query, params).fetchall()
+
+        siguiente = None
+        if limite is not None and len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = codificar_cursor(orden, [filas[-1][alias] for _, alias in consulta.clave])
+        return [{alias: fila[alias] for alias in pedidos} for fila in filas], siguiente
+
+
+# GET /agentes: por apellidos por defecto, como antes
+LISTADO_AGENTES = Listado(
+    campos={
+        "nip": "a.nip",
+        "nombre": "a.nombre",
+        "apellido1": "a.apellido1",
+        "apellido2": "a.apellido2",
+        "nombre_completo": "a.nombre || ' ' || a.apellido1 || COALESCE(' ' || a.apellido2, '')",
+        "seccion": "a.seccion",
+        "grupo": "a.grupo",
+    },
+    desde="FROM agentes a",
+    ordenes={
+        "apellidos": ["apellido1", "nombre", "nip"],
+        "nip": ["nip"],
+    },
+    orden_defecto="apellidos",
+)
+
+# GET /actividades: de la más reciente a la más antigua por defecto, como antes
+LISTADO_ACTIVIDADES = Listado(
+    campos={
+        "id": "a.id",
+        "fecha": "a.fecha",
+        "turno_id": "a.turno_id",
+        "turno": "t.nombre",
+        "curso_id": "a.curso_id",
+        "curso": "c.nombre",
+        "monitor_nip": "a.monitor_nip",
+        "monitor_nombre": "m.nombre || ' ' || m.apellido1 || COALESCE(' ' || m.apellido2, '')",
+        "notas": "a.notas",
+        "total_agentes": "r.total_agentes",
+        "asistencia_confirmada": "r.asistencia_confirmada",
+        "asistencia_pendiente": "r.asistencia_pendiente",
+    },
+    desde="""
+        FROM actividades a
+        JOIN resumen_actividades r ON r.actividad_id = a.id
+        LEFT JOIN turno t ON a.turno_id = t.id
+        LEFT JOIN cursos c ON a.curso_id = c.id
+        LEFT JOIN monitores m ON a.monitor_nip = m.nip
+    """,
+    ordenes={
+        "fecha": ["fecha", "id"],
+        "id": ["id"],
+    },
+    orden_defecto="-fecha",
+)
@@ -0,0 +1,100 @@
+"""
+Endpoints de escritura por lotes
+
+Pensados para sincronizaciones masivas (por ejemplo, la plantilla que llega de
+RR. HH.): el lote completo se valida con Pydantic antes de tocar la base de
+datos (422 si algún elemento no es válido) y se aplica en una sola transacción
+con executemany (src.database.lotes). La respuesta incluye el resultado de cada
+elemento en el orden recibido y el recuento por resultado. Ambas APIs incluyen
+este router.
+"""
+
+import sqlite3
+from collections import Counter
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, conlist
+
+from src.api.cache_respuestas import invalidar_cache
+from src.api.dependencias import get_db
+from src.database.lotes import asignar_agentes_lote, guardar_agentes, guardar_asistencias_lote
+
+# Máximo de elementos por lote
+LIMITE_LOTE = 5000
+
+router = APIRouter()
+
+
+# Modelos Pydantic
+class AgenteLote(BaseModel):
+    nip: str
+    nombre: str
+    apellido1: str
+    apellido2: Optional[str] = None
+    seccion: Optional[str] = None
+    grupo: Optional[str] = None
+
+class AsignacionLote(BaseModel):
+    agente_nip: str
+    asistencia: Optional[Literal[0, 1]] = 0
+
+class AsistenciaLote(BaseModel):
+    actividad_id: int
+    agente_nip: str
+    asistencia: Optional[Literal[0, 1]]
+
+
+def respuesta_lote(claves, resultados):
+    """Cuerpo de respuesta con el resultado de cada elemento y el recuento por resultado"""
+    return {
+        "total": len(resultados),
+        "resumen": dict(Counter(resultados)),
+        "resultados": [dict(clave, resultado=resultado) for clave, resultado in zip(claves, resultados)],
+    }
+
+
+# Crear o actualizar agentes por NIP
+@router.post("/agentes/bulk")
+def upsert_agentes(agentes: conlist(AgenteLote, min_length=1, max_length=LIMITE_LOTE),
+                   db: sqlite3.Connection = Depends(get_db)):
+    try:
+        resultados = guardar_agentes(db, [agente.model_dump() for agente in agentes])
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error al guardar agentes: {str(e)}")
+    invalidar_cache("agentes")
+    return respuesta_lote([{"nip": agente.nip} for agente in agentes], resultados)
+
+
+# Asignar agentes a una actividad
+@router.post("/actividades/{actividad_id}/agentes/bulk")
+def asignar_agentes_bulk(actividad_id: int,
+                         asignaciones: conlist(AsignacionLote, min_length=1, max_length=LIMITE_LOTE),
+                         db: sqlite3.Connection = Depends(get_db)):
+    if db.execute("SELECT 1 FROM actividades WHERE id = ?", (actividad_id,)).fetchone() is None:
+        raise HTTPException(status_code=404, detail=f"Actividad con ID {actividad_id} no encontrada")
+    try:
+        resultados = asignar_agentes_lote(
+            db, actividad_id, [(item.agente_nip, item.asistencia) for item in asignaciones]
+        )
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error al asignar agentes: {str(e)}")
+    invalidar_cache("agentes_actividades")
+    return respuesta_lote([{"agente_nip": item.agente_nip} for item in asignaciones], resultados)
+
+
+# Actualizar la asistencia de asignaciones de una o varias actividades
+@router.patch("/asistencia/bulk")
+def actualizar_asistencia_bulk(asistencias: conlist(AsistenciaLote, min_length=1, max_length=LIMITE_LOTE),
+                               db: sqlite3.Connection = Depends(get_db)):
+    try:
+        resultados = guardar_asistencias_lote(
+            db, [(item.actividad_id, item.agente_nip, item.asistencia) for item in asistencias]
+        )
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error al actualizar asistencia: {str(e)}")
+    invalidar_cache("agentes_actividades")
+    return respuesta_lote(
+        [{"actividad_id": item.actividad_id, "agente_nip": item.agente_nip} for item in asistencias],
+        resultados
+    )
@@ -0,0 +1,77 @@
+"""
+Comparativa de serialización y compresión de los listados de la API
+
+Para GET /agentes y GET /actividades completos mide el tamaño y el tiempo de
+codificación con json.dumps (JSONResponse de Starlette, como antes), con
+orjson (ListaJSONResponse) y con orjson más gzip al nivel que aplica
+GZipMiddleware. No necesita la API en marcha: lee las filas igual que los
+endpoints y codifica las respuestas en proceso.
+
+Uso:
+    python -m src.api.serializacion [--database sistema_agentes.db] [--repeticiones 5]
+"""
+
+import argparse
+import gzip
+import time
+
+from fastapi.responses import JSONResponse
+
+from src.api.listados import LISTADO_ACTIVIDADES, LISTADO_AGENTES
+from src.api.respuestas import NIVEL_GZIP, ListaJSONResponse
+from src.database.pool import DATABASE_PATH, get_pool
+
+LISTADOS = {
+    "/agentes": LISTADO_AGENTES,
+    "/actividades": LISTADO_ACTIVIDADES,
+}
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta funcion varias veces y devuelve su resultado y el mejor tiempo en milisegundos"""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = (time.perf_counter() - inicio) * 1000
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return resultado, mejor
+
+
+def comparar_serializacion(filas, repeticiones=5):
+    """
+    Codifica las filas de las tres formas
+
+    Returns:
+        Diccionario nombre → (bytes, milisegundos)
+    """
+    antes, t_antes = medir(lambda: JSONResponse(content=filas).body, repeticiones)
+    orjson, t_orjson = medir(lambda: ListaJSONResponse(content=filas).body, repeticiones)
+    comprimido, t_gzip = medir(lambda: gzip.compress(orjson, compresslevel=NIVEL_GZIP), repeticiones)
+    return {
+        "json.dumps": (len(antes), t_antes),
+        "orjson": (len(orjson), t_orjson),
+        f"orjson + gzip {NIVEL_GZIP}": (len(comprimido), t_orjson + t_gzip),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparativa de serialización de los listados de la API")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Repeticiones de cada medición (se toma la mejor)")
+    args = parser.parse_args()
+
+    conn = get_pool(args.database).checkout()
+    try:
+        for ruta, listado in LISTADOS.items():
+            filas, _ = listado.pagina(conn)
+            print(f"GET {ruta} ({len(filas)} filas)")
+            resultados = comparar_serializacion(filas, args.repeticiones)
+            tamano_base, tiempo_base = resultados["json.dumps"]
+            for nombre, (tamano, tiempo) in resultados.items():
+                print(
+                    f"  {nombre:<16} {tamano / 1024:>10.1f} KB ({tamano / tamano_base:>6.1%})"
+                    f"  {tiempo:>8.1f} ms ({tiempo / tiempo_base:>6.1%})"
+                )
+    finally:
+        conn.close()
@@ -0,0 +1,267 @@
+"""
+Análisis de actividades calculado en memoria con operaciones vectorizadas
+
+Reproduce las columnas de vista_actividades_con_agentes a partir de las tablas
+base. La aplicación lo usa cuando la vista consolidada no está disponible.
+El estado de cada actividad depende del día, así que no forma parte del
+análisis: con_estado() lo añade para una fecha de referencia explícita.
+Todo se calcula por columnas con pandas/numpy (sumas booleanas, np.divide con
+where, np.select), sin lambdas por grupo ni apply por fila.
+
+Uso:
+    python -m src.database.analisis --verificar
+    python -m src.database.analisis --benchmark 1000000
+"""
+
+import argparse
+import sqlite3
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import aplicar_pragmas
+
+# Nombres en el orden de strftime('%w') (domingo = 0) y '%m', como en la vista
+DIAS_SEMANA = ["Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+MESES = [
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+
+# Columnas de la vista en su orden
+COLUMNAS_VISTA = [
+    "actividad_id", "fecha", "turno_nombre", "curso_nombre", "monitor_nombre",
+    "total_agentes", "asistencia_confirmada", "asistencia_pendiente", "asistencia_porcentaje",
+    "dia_semana_num", "dia_semana", "mes_num", "mes", "anio", "semana_del_anio"
+]
+
+
+def fecha_referencia():
+    """Devuelve la fecha local de hoy, referencia del estado de las actividades"""
+    return date.today()
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor))
+
+
+def totales_asistencia(agentes_actividades):
+    """
+    Agrega las asignaciones por actividad
+
+    Returns:
+        DataFrame indexado por actividad_id con total_agentes,
+        asistencia_confirmada y asistencia_pendiente
+    """
+    asistencia = agentes_actividades["asistencia"]
+    totales = pd.DataFrame({
+        "actividad_id": agentes_actividades["actividad_id"].to_numpy(),
+        "total_agentes": 1,
+        "asistencia_confirmada": (asistencia == 1).to_numpy(dtype=np.int64),
+        "asistencia_pendiente": asistencia.isna().to_numpy(dtype=np.int64),
+    })
+    return totales.groupby("actividad_id", sort=False).sum()
+
+
+def calcular_estado(fechas, hoy):
+    """
+    Clasifica cada fecha como 'Completada', 'En curso' o 'Pendiente'
+
+    Args:
+        fechas: Serie de fechas (texto 'YYYY-MM-DD' o datetime)
+        hoy: Fecha de referencia (date o 'YYYY-MM-DD')
+    """
+    dias = pd.to_datetime(fechas).dt.normalize().to_numpy()
+    referencia = np.datetime64(_a_fecha(hoy), "ns")
+    return np.select(
+        [dias < referencia, dias == referencia],
+        ["Completada", "En curso"],
+        default="Pendiente"
+    )
+
+
+def con_estado(df, hoy):
+    """Devuelve una copia de df con la columna estado calculada para la fecha de referencia"""
+    return df.assign(estado=calcular_estado(df["fecha"], hoy))
+
+
+def construir_analisis(actividades, cursos, turnos, monitores, agentes_actividades):
+    """
+    Calcula las columnas de vista_actividades_con_agentes a partir de las tablas
+
+    Args:
+        actividades: DataFrame de la tabla actividades
+        cursos: DataFrame con id y nombre de los cursos (incluidos los ocultos)
+        turnos: DataFrame con id y nombre de los turnos
+        monitores: DataFrame con nip y nombre_completo de los monitores
+        agentes_actividades: DataFrame con actividad_id y asistencia
+
+    Returns:
+        DataFrame con las columnas de la vista, de la actividad más reciente a la más antigua
+    """
+    ids = actividades["id"]
+    fechas = pd.to_datetime(actividades["fecha"])
+
+    df = pd.DataFrame({
+        "actividad_id": ids.to_numpy(),
+        "fecha": actividades["fecha"].astype(str).str[:10].to_numpy(),
+        "turno_nombre": actividades["turno_id"].map(turnos.set_index("id")["nombre"]).to_numpy(),
+        "curso_nombre": actividades["curso_id"].map(cursos.set_index("id")["nombre"]).to_numpy(),
+        "monitor_nombre": actividades["monitor_nip"]
+            .map(monitores.set_index("nip")["nombre_completo"])
+            .fillna("Sin monitor")
+            .to_numpy(),
+    })
+
+    # Totales por actividad; las actividades sin asignaciones quedan a 0
+    totales = totales_asistencia(agentes_actividades).reindex(ids.to_numpy(), fill_value=0)
+    for columna in ("total_agentes", "asistencia_confirmada", "asistencia_pendiente"):
+        df[columna] = totales[columna].to_numpy(dtype=np.int64)
+
+    total = df["total_agentes"].to_numpy(dtype=float)
+    confirmada = df["asistencia_confirmada"].to_numpy(dtype=float)
+    df["asistencia_porcentaje"] = np.round(
+        np.divide(confirmada * 100.0, total, out=np.zeros_like(total), where=total > 0), 2
+    )
+
+    # Campos de calendario con la misma codificación que strftime en SQLite
+    dia_num = ((fechas.dt.dayofweek.to_numpy() + 1) % 7)
+    mes_num = fechas.dt.month.to_numpy()
+    semana = (fechas.dt.dayofyear.to_numpy() - 1 + 7 - fechas.dt.dayofweek.to_numpy()) // 7
+    df["dia_semana_num"] = dia_num.astype(str)
+    df["dia_semana"] = np.asarray(DIAS_SEMANA, dtype=object)[dia_num]
+    df["mes_num"] = pd.Series(mes_num).astype(str).str.zfill(2).to_numpy()
+    df["mes"] = np.asarray(MESES, dtype=object)[mes_num - 1]
+    df["anio"] = fechas.dt.year.astype(str).to_numpy()
+    df["semana_del_anio"] = pd.Series(semana).astype(str).str.zfill(2).to_numpy()
+
+    return df.sort_values(["fecha", "actividad_id"], ascending=False, ignore_index=True)[COLUMNAS_VISTA]
+
+
+def filtrar_analisis(df_analisis, fecha_inicio=None, fecha_fin=None, curso=None, turno=None, estado=None):
+    """
+    Aplica en memoria los mismos filtros que construir_filtros aplica en SQL
+
+    Para filtrar por estado, df_analisis debe incluir la columna estado (con_estado).
+    """
+    mascara = np.ones(len(df_analisis), dtype=bool)
+    if fecha_inicio is not None:
+        mascara &= (df_analisis["fecha"] >= str(fecha_inicio)).to_numpy()
+    if fecha_fin is not None:
+        mascara &= (df_analisis["fecha"] <= str(fecha_fin)).to_numpy()
+    if curso and curso != "Todos":
+        mascara &= (df_analisis["curso_nombre"] == curso).to_numpy()
+    if turno and turno != "Todos":
+        mascara &= (df_analisis["turno_nombre"] == turno).to_numpy()
+    if estado and estado != "Todos":
+        mascara &= (df_analisis["estado"] == estado).to_numpy()
+    return df_analisis[mascara]
+
+
+def calcular_metricas(df_analisis):
+    """Devuelve los mismos agregados que consultar_metricas para un análisis ya filtrado"""
+    total_agentes = int(df_analisis["total_agentes"].sum())
+    confirmada = int(df_analisis["asistencia_confirmada"].sum())
+    return {
+        "total_actividades": len(df_analisis),
+        "total_agentes": total_agentes,
+        "asistencia_confirmada": confirmada,
+        "asistencia_porcentaje": (confirmada / total_agentes * 100) if total_agentes > 0 else 0
+    }
+
+
+def _leer_tablas(conn):
+    return (
+        pd.read_sql_query("SELECT * FROM actividades", conn),
+        pd.read_sql_query("SELECT id, nombre FROM cursos", conn),
+        pd.read_sql_query("SELECT id, nombre FROM turno", conn),
+        pd.read_sql_query(
+            """
+            SELECT nip, nombre || ' ' || apellido1 || CASE WHEN apellido2 IS NOT NULL THEN ' ' || apellido2 ELSE '' END as nombre_completo
+            FROM monitores
+            """,
+            conn
+        ),
+        pd.read_sql_query("SELECT actividad_id, asistencia FROM agentes_actividades", conn),
+    )
+
+
+def comparar_con_vista(conn):
+    """
+    Comprueba que construir_analisis devuelve lo mismo que vista_actividades_con_agentes
+
+    Raises:
+        AssertionError: Si alguna columna difiere
+    """
+    vista = pd.read_sql_query(
+        "SELECT * FROM vista_actividades_con_agentes ORDER BY fecha DESC, actividad_id DESC", conn
+    )
+    calculado = construir_analisis(*_leer_tablas(conn))
+    pd.testing.assert_frame_equal(
+        calculado.reset_index(drop=True)[COLUMNAS_VISTA],
+        vista.reset_index(drop=True)[COLUMNAS_VISTA],
+        check_dtype=False
+    )
+    return len(vista)
+
+
+def datos_sinteticos(asignaciones=1_000_000, agentes_por_actividad=20, semilla=0):
+    """Genera tablas aleatorias con el número de asignaciones indicado"""
+    rng = np.random.default_rng(semilla)
+    num_actividades = max(1, asignaciones // agentes_por_actividad)
+    fechas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, num_actividades), unit="D")
+    actividades = pd.DataFrame({
+        "id": np.arange(1, num_actividades + 1),
+        "fecha": fechas.strftime("%Y-%m-%d"),
+        "turno_id": rng.integers(1, 4, num_actividades),
+        "monitor_nip": pd.Series(rng.integers(1, 7, num_actividades)).map(lambda n: f"M{n:03d}").to_numpy(),
+        "curso_id": rng.integers(1, 6, num_actividades),
+    })
+    cursos = pd.DataFrame({"id": range(1, 6), "nombre": [f"Curso {i}" for i in range(1, 6)]})
+    turnos = pd.DataFrame({"id": [1, 2, 3], "nombre": ["Mañana", "Tarde", "Noche"]})
+    monitores = pd.DataFrame({"nip": [f"M{i:03d}" for i in range(1, 6)], "nombre_completo": [f"Monitor {i}" for i in range(1, 6)]})
+    asistencia = rng.choice(np.array([1.0, 0.0, np.nan]), asignaciones, p=[0.7, 0.1, 0.2])
+    agentes_actividades = pd.DataFrame({
+        "actividad_id": rng.integers(1, num_actividades + 1, asignaciones),
+        "asistencia": asistencia,
+    })
+    return actividades, cursos, turnos, monitores, agentes_actividades
+
+
+def benchmark(asignaciones=1_000_000, repeticiones=3):
+    """Mide construir_analisis sobre datos sintéticos y devuelve el mejor tiempo en segundos"""
+    tablas = datos_sinteticos(asignaciones)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        construir_analisis(*tablas)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análisis de actividades calculado en memoria")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    parser.add_argument("--verificar", action="store_true", help="Compara el cálculo con vista_actividades_con_agentes")
+    parser.add_argument("--benchmark", type=int, metavar="ASIGNACIONES", help="Mide el cálculo con N asignaciones sintéticas")
+    args = parser.parse_args()
+
+    if args.verificar:
+        conn = sqlite3.connect(args.database)
+        aplicar_pragmas(conn)
+        try:
+            filas = comparar_con_vista(conn)
+            print(f"OK  El análisis en memoria coincide con la vista en {filas} actividades.")
+        finally:
+            conn.close()
+
+    if args.benchmark:
+        segundos = benchmark(args.benchmark)
+        print(f"construir_analisis con {args.benchmark} asignaciones: {segundos * 1000:.0f} ms")
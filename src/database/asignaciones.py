@@ -0,0 +1,54 @@
+"""
+Asignación de agentes a actividades por lotes
+
+Inserta todos los agentes elegidos en una sola transacción con INSERT OR IGNORE
+sobre la clave primaria (agente_nip, actividad_id), de modo que las
+asignaciones que ya existían se ignoran sin una consulta previa por agente.
+"""
+
+
+def asignar_agentes(conn, actividad_id, agente_nips, asistencia=0):
+    """
+    Asigna varios agentes a una actividad en una transacción
+
+    Args:
+        conn: Conexión a la base de datos
+        actividad_id: ID de la actividad
+        agente_nips: Iterable con los NIP de los agentes
+        asistencia: Asistencia inicial de las nuevas asignaciones
+
+    Returns:
+        Tupla (añadidos, ya_asignados)
+    """
+    # Quitar duplicados conservando el orden para que no cuenten como ya asignados
+    nips = list(dict.fromkeys(str(nip) for nip in agente_nips))
+    if not nips:
+        return 0, 0
+
+    try:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO agentes_actividades (actividad_id, agente_nip, asistencia) VALUES (?, ?, ?)",
+            [(actividad_id, nip, asistencia) for nip in nips]
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    anadidos = cursor.rowcount
+    return anadidos, len(nips) - anadidos
+
+
+def nips_por_seccion_grupo(conn, seccion=None, grupo=None):
+    """Devuelve los NIP de los agentes de una sección y/o grupo ('Todas'/'Todos' o None no filtran)"""
+    condiciones = []
+    params = []
+    if seccion and seccion != "Todas":
+        condiciones.append("seccion = ?")
+        params.append(seccion)
+    if grupo and grupo != "Todos":
+        condiciones.append("grupo = ?")
+        params.append(grupo)
+
+    where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return [fila[0] for fila in conn.execute(f"SELECT nip FROM agentes{where} ORDER BY nip", params)]
@@ -0,0 +1,57 @@
+"""
+Registro de asistencia por lotes
+
+Guarda la asistencia de todos los agentes de una actividad con un único
+executemany dentro de una transacción, en lugar de una conexión, un UPDATE y
+un commit por agente. Lo usan la aplicación Streamlit y la API.
+"""
+
+import math
+
+# Valores de asistencia admitidos: confirmada, no confirmada y pendiente
+VALORES_ASISTENCIA = (1, 0, None)
+
+
+def guardar_asistencias(conn, actividad_id, asistencias):
+    """
+    Actualiza la asistencia de varios agentes de una actividad en una transacción
+
+    Args:
+        conn: Conexión a la base de datos
+        actividad_id: ID de la actividad
+        asistencias: Diccionario {agente_nip: asistencia} o iterable de pares
+            (agente_nip, asistencia) con asistencia 1, 0 o None
+
+    Returns:
+        Número de asignaciones actualizadas
+
+    Raises:
+        ValueError: Si algún valor de asistencia no es válido
+    """
+    if isinstance(asistencias, dict):
+        asistencias = asistencias.items()
+
+    filas = []
+    for agente_nip, asistencia in asistencias:
+        # Un NaN (asistencia pendiente leída con pandas) equivale a None
+        if isinstance(asistencia, float) and math.isnan(asistencia):
+            asistencia = None
+        if asistencia is not None:
+            asistencia = int(asistencia)
+        if asistencia not in VALORES_ASISTENCIA:
+            raise ValueError(f"Asistencia no válida para el agente {agente_nip}: {asistencia}")
+        filas.append((asistencia, actividad_id, str(agente_nip)))
+
+    if not filas:
+        return 0
+
+    try:
+        cursor = conn.executemany(
+            "UPDATE agentes_actividades SET asistencia = ? WHERE actividad_id = ? AND agente_nip = ?",
+            filas
+        )
+        conn.commit()
+        return cursor.rowcount
+    except Exception:
+        conn.rollback()
+        raise
@@ -0,0 +1,212 @@
+"""
+Búsqueda de agentes indexada con SQLite FTS5
+
+agentes_fts indexa el NIP, el nombre, los apellidos, la sección y el grupo de
+cada agente con el tokenizador unicode61 sin diacríticos, de modo que
+"Fernandez" encuentra "Fernández" y las mayúsculas no importan. Los triggers
+sobre agentes mantienen el índice al día, localizando la fila de cada agente
+por rowid con agentes_fts_claves, y buscar_agentes() devuelve los mejores
+resultados ordenados por relevancia (bm25) usando búsqueda por prefijo, sin
+recorrer la tabla de agentes en cada pulsación.
+
+Uso:
+    python -m src.database.busqueda --reconstruir
+"""
+
+import argparse
+import re
+import sqlite3
+import unicodedata
+
+import pandas as pd
+
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import aplicar_pragmas
+
+# Número máximo de resultados por defecto
+LIMITE_RESULTADOS = 50
+
+# Pesos bm25 de cada columna: nip, nombre, apellido1, apellido2, seccion, grupo
+_PESOS_COLUMNAS = (10.0, 5.0, 5.0, 5.0, 1.0, 1.0)
+
+_PATRON_TERMINO = re.compile(r"\w+", re.UNICODE)
+_PATRON_DIACRITICOS = "[\u0300-\u036f]"
+
+SQL_TABLA_BUSQUEDA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS agentes_fts USING fts5(
+    nip, nombre, apellido1, apellido2, seccion, grupo,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '1 2 3'
+)
+"""
+
+# Clave de cada agente en el índice: el rowid de su fila en agentes_fts. Un
+# DELETE o UPDATE sobre agentes_fts filtrando por la columna nip recorrería
+# todo el índice (las columnas de FTS5 no tienen índice propio), así que los
+# triggers localizan la fila por rowid a través de esta tabla. Se usa el NIP y
+# no el rowid de agentes porque este último puede cambiar con VACUUM
+SQL_TABLA_CLAVES_BUSQUEDA = """
+CREATE TABLE IF NOT EXISTS agentes_fts_claves (
+    id INTEGER PRIMARY KEY,
+    nip TEXT NOT NULL UNIQUE
+)
+"""
+
+TRIGGERS_BUSQUEDA = ("trg_agentes_fts_insert", "trg_agentes_fts_update", "trg_agentes_fts_delete")
+
+SQL_TRIGGERS_BUSQUEDA = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agentes_fts_insert
+    AFTER INSERT ON agentes
+    BEGIN
+        INSERT INTO agentes_fts_claves (nip) VALUES (NEW.nip);
+        INSERT INTO agentes_fts (rowid, nip, nombre, apellido1, apellido2, seccion, grupo)
+        VALUES ((SELECT id FROM agentes_fts_claves WHERE nip = NEW.nip),
+                NEW.nip, NEW.nombre, NEW.apellido1, NEW.apellido2, NEW.seccion, NEW.grupo);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agentes_fts_update
+    AFTER UPDATE OF nip, nombre, apellido1, apellido2, seccion, grupo ON agentes
+    BEGIN
+        UPDATE agentes_fts_claves SET nip = NEW.nip WHERE nip = OLD.nip;
+        UPDATE agentes_fts
+        SET nip = NEW.nip, nombre = NEW.nombre, apellido1 = NEW.apellido1,
+            apellido2 = NEW.apellido2, seccion = NEW.seccion, grupo = NEW.grupo
+        WHERE rowid = (SELECT id FROM agentes_fts_claves WHERE nip = NEW.nip);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agentes_fts_delete
+    AFTER DELETE ON agentes
+    BEGIN
+        DELETE FROM agentes_fts WHERE rowid = (SELECT id FROM agentes_fts_claves WHERE nip = OLD.nip);
+        DELETE FROM agentes_fts_claves WHERE nip = OLD.nip;
+    END
+    """,
+]
+
+
+def normalizar(texto):
+    """Pasa un texto a minúsculas y sin tildes para comparar sin distinguir acentos"""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def normalizar_serie(serie):
+    """Versión vectorizada de normalizar() para una columna de pandas"""
+    return (
+        serie.astype(str)
+        .str.normalize("NFKD")
+        .str.replace(_PATRON_DIACRITICOS, "", regex=True)
+        .str.lower()
+    )
+
+
+def construir_consulta_fts(texto):
+    """
+    Traduce el texto del buscador a una consulta FTS5 de prefijos
+
+    Cada término se entrecomilla (así los caracteres especiales de FTS5 no
+    cambian el significado) y debe aparecer como prefijo de alguna columna.
+
+    Returns:
+        Consulta MATCH o None si el texto no contiene ningún término
+    """
+    terminos = _PATRON_TERMINO.findall(normalizar(texto or ""))
+    if not terminos:
+        return None
+    return " ".join(f'"{termino}"*' for termino in terminos)
+
+
+def reconstruir_busqueda_agentes(conn):
+    """Vuelve a indexar todos los agentes (sin confirmar)"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM agentes_fts")
+    cursor.execute("DELETE FROM agentes_fts_claves")
+    cursor.execute("INSERT INTO agentes_fts_claves (nip) SELECT nip FROM agentes")
+    cursor.execute("""
+        INSERT INTO agentes_fts (rowid, nip, nombre, apellido1, apellido2, seccion, grupo)
+        SELECT k.id, a.nip, a.nombre, a.apellido1, a.apellido2, a.seccion, a.grupo
+        FROM agentes a
+        JOIN agentes_fts_claves k ON k.nip = a.nip
+    """)
+    return cursor.rowcount
+
+
+def crear_busqueda_agentes(conn):
+    """
+    Crea el índice FTS5 de agentes, su tabla de claves y sus triggers
+
+    Es idempotente: si el índice y sus claves ya existían solo se asegura de que
+    los triggers estén creados; si no, se rellena a partir de la tabla de agentes.
+    No confirma la transacción: así una migración puede aplicarlo junto con su
+    registro en schema_version.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('agentes_fts', 'agentes_fts_claves')"
+    )
+    existia = cursor.fetchone()[0] == 2
+
+    cursor.execute(SQL_TABLA_BUSQUEDA)
+    cursor.execute(SQL_TABLA_CLAVES_BUSQUEDA)
+    for trigger in SQL_TRIGGERS_BUSQUEDA:
+        cursor.execute(trigger)
+
+    if not existia:
+        reconstruir_busqueda_agentes(conn)
+
+
+def buscar_agentes(conn, texto, limite=LIMITE_RESULTADOS):
+    """
+    Busca agentes por NIP, nombre, apellidos, sección o grupo
+
+    Args:
+        conn: Conexión a la base de datos
+        texto: Texto escrito en el buscador
+        limite: Número máximo de resultados (None para todos)
+
+    Returns:
+        DataFrame con las columnas de get_agentes ordenado por relevancia, o
+        None si el texto no contiene ningún término que buscar
+    """
+    consulta = construir_consulta_fts(texto)
+    if consulta is None:
+        return None
+
+    pesos = ", ".join(str(peso) for peso in _PESOS_COLUMNAS)
+    query = f"""
+    SELECT
+        a.nip,
+        a.nombre,
+        a.apellido1,
+        a.apellido2,
+        a.nombre || ' ' || a.apellido1 || CASE WHEN a.apellido2 IS NOT NULL THEN ' ' || a.apellido2 ELSE '' END as nombre_completo,
+        a.seccion,
+        a.grupo
+    FROM agentes_fts f
+    JOIN agentes a ON a.nip = f.nip
+    WHERE agentes_fts MATCH ?
+    ORDER BY bm25(agentes_fts, {pesos}), a.apellido1, a.nombre
+    LIMIT ?
+    """
+    return pd.read_sql_query(query, conn, params=(consulta, -1 if limite is None else limite))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice FTS5 para la búsqueda de agentes")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    parser.add_argument("--reconstruir", action="store_true", help="Vuelve a indexar todos los agentes")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    aplicar_pragmas(conn)
+    crear_busqueda_agentes(conn)
+    if args.reconstruir:
+        filas = reconstruir_busqueda_agentes(conn)
+        print(f"Índice agentes_fts reconstruido con {filas} agentes.")
+    else:
+        print("Índice agentes_fts creado y actualizado por triggers.")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,91 @@
+"""
+Contadores de cambios por tabla mantenidos mediante triggers
+
+cambios_tablas guarda para cada tabla un número de versión y el instante
+(segundos Unix) de su última modificación. Los triggers de inserción,
+actualización y borrado los incrementan en la misma transacción que la
+escritura, venga de la API, de la aplicación Streamlit o de un script, así
+que leerlos basta para saber si un resultado cacheado sigue siendo válido.
+
+Uso:
+    python -m src.database.cambios
+"""
+
+import argparse
+import sqlite3
+
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import aplicar_pragmas
+
+# Tablas cuyas escrituras se cuentan
+TABLAS_VIGILADAS = ("agentes", "actividades", "agentes_actividades", "cursos", "turno", "monitores")
+
+SQL_TABLA_CAMBIOS = """
+CREATE TABLE IF NOT EXISTS cambios_tablas (
+    tabla TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    modificado INTEGER NOT NULL
+)
+"""
+
+
+def _sql_triggers(tabla):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_{tabla}_{operacion.lower()}
+        AFTER {operacion} ON {tabla}
+        BEGIN
+            UPDATE cambios_tablas
+            SET version = version + 1,
+                modificado = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE tabla = '{tabla}';
+        END
+        """
+        for operacion in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+def crear_cambios_tablas(conn):
+    """Crea la tabla de contadores y sus triggers (idempotente, sin confirmar)"""
+    cursor = conn.cursor()
+    cursor.execute(SQL_TABLA_CAMBIOS)
+    cursor.executemany(
+        "INSERT OR IGNORE INTO cambios_tablas (tabla, version, modificado) "
+        "VALUES (?, 0, CAST(strftime('%s', 'now') AS INTEGER))",
+        [(tabla,) for tabla in TABLAS_VIGILADAS]
+    )
+    for tabla in TABLAS_VIGILADAS:
+        for trigger in _sql_triggers(tabla):
+            cursor.execute(trigger)
+
+
+def versiones_tablas(conn, tablas):
+    """
+    Devuelve la versión y la última modificación de las tablas indicadas
+
+    Returns:
+        Lista de tuplas (tabla, version, modificado) en el orden de tablas
+    """
+    marcadores = ", ".join("?" for _ in tablas)
+    filas = {
+        fila[0]: (fila[1], fila[2])
+        for fila in conn.execute(
+            f"SELECT tabla, version, modificado FROM cambios_tablas WHERE tabla IN ({marcadores})",
+            list(tablas)
+        )
+    }
+    return [(tabla,) + filas.get(tabla, (0, 0)) for tabla in tablas]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Contadores de cambios por tabla")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    aplicar_pragmas(conn)
+    crear_cambios_tablas(conn)
+    conn.commit()
+    for tabla, version, modificado in versiones_tablas(conn, TABLAS_VIGILADAS):
+        print(f"{tabla:<22} versión {version:>8}  modificada {modificado}")
+    conn.close()
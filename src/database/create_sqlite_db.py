@@ -4,6 +4,9 @@ import os
 from datetime import datetime, timedelta
 import random
 
+from src.database.pragmas import aplicar_pragmas
+from src.database.migraciones import aplicar_migraciones
+
 # Crear la base de datos SQLite
 def create_database():
     # Verificar si la base de datos ya existe
@@ -14,6 +17,7 @@ def create_database():
     
     # Crear conexión a la base de datos
     conn = sqlite3.connect(db_path)
+    aplicar_pragmas(conn)
     cursor = conn.cursor()
     
     # Crear tablas
@@ -179,70 +183,9 @@ def create_database():
     
     cursor.executemany('INSERT INTO agentes_actividades (agente_nip, actividad_id, asistencia) VALUES (?, ?, ?)', asignaciones)
     
-    # Crear vista para facilitar consultas
-    cursor.execute('''
-    CREATE VIEW IF NOT EXISTS vista_actividades_con_agentes AS
-    SELECT 
-        a.id as actividad_id,
-        a.fecha,
-        t.nombre as turno_nombre,
-        c.nombre as curso_nombre,
-        COALESCE(m.nombre || ' ' || m.apellido1 || CASE WHEN m.apellido2 IS NOT NULL THEN ' ' || m.apellido2 ELSE '' END, 'Sin monitor') as monitor_nombre,
-        COUNT(aa.agente_nip) as total_agentes,
-        SUM(CASE WHEN aa.asistencia = 1 THEN 1 ELSE 0 END) as asistencia_confirmada,
-        SUM(CASE WHEN aa.asistencia IS NULL THEN 1 ELSE 0 END) as asistencia_pendiente,
-        CASE 
-            WHEN COUNT(aa.agente_nip) > 0 THEN 
-                ROUND((SUM(CASE WHEN aa.asistencia = 1 THEN 1 ELSE 0 END) * 100.0 / COUNT(aa.agente_nip)), 2)
-            ELSE 0
-        END as asistencia_porcentaje,
-        strftime('%w', a.fecha) as dia_semana_num,
-        CASE strftime('%w', a.fecha)
-            WHEN '0' THEN 'Domingo'
-            WHEN '1' THEN 'Lunes'
-            WHEN '2' THEN 'Martes'
-            WHEN '3' THEN 'Miércoles'
-            WHEN '4' THEN 'Jueves'
-            WHEN '5' THEN 'Viernes'
-            WHEN '6' THEN 'Sábado'
-        END as dia_semana,
-        strftime('%m', a.fecha) as mes_num,
-        CASE strftime('%m', a.fecha)
-            WHEN '01' THEN 'Enero'
-            WHEN '02' THEN 'Febrero'
-            WHEN '03' THEN 'Marzo'
-            WHEN '04' THEN 'Abril'
-            WHEN '05' THEN 'Mayo'
-            WHEN '06' THEN 'Junio'
-            WHEN '07' THEN 'Julio'
-            WHEN '08' THEN 'Agosto'
-            WHEN '09' THEN 'Septiembre'
-            WHEN '10' THEN 'Octubre'
-            WHEN '11' THEN 'Noviembre'
-            WHEN '12' THEN 'Diciembre'
-        END as mes,
-        strftime('%Y', a.fecha) as anio,
-        strftime('%W', a.fecha) as semana_del_anio,
-        CASE 
-            WHEN date(a.fecha) < date('now') THEN 'Completada'
-            WHEN date(a.fecha) = date('now') THEN 'En curso'
-            ELSE 'Pendiente'
-        END as estado
-    FROM 
-        actividades a
-    LEFT JOIN 
-        turno t ON a.turno_id = t.id
-    LEFT JOIN 
-        cursos c ON a.curso_id = c.id
-    LEFT JOIN 
-        monitores m ON a.monitor_nip = m.nip
-    LEFT JOIN 
-        agentes_actividades aa ON a.id = aa.actividad_id
-    GROUP BY 
-        a.id, a.fecha, t.nombre, c.nombre, monitor_nombre
-    ORDER BY 
-        a.fecha DESC
-    ''')
+    # Aplicar las migraciones: tabla resumen de asistencia, vista e índices
+    conn.commit()
+    aplicar_migraciones(conn)
     
     # Guardar cambios y cerrar conexión
     conn.commit()
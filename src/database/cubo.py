@@ -0,0 +1,168 @@
+"""
+Cubo de agregados para los gráficos y las métricas del dashboard
+
+El cubo tiene una celda por (día, curso, turno) con el número de actividades
+y las sumas de agentes y asistencia. Se calcula una vez por versión de los
+datos a partir de resumen_actividades, y cada gráfico o tarjeta del dashboard
+se responde sumando las celdas que cumplen los filtros en lugar de agrupar las
+actividades en cada recarga. El estado de cada celda depende solo de su día y
+se añade con con_estado() para la fecha de referencia, sin recalcular el cubo.
+
+Uso:
+    python -m src.database.cubo --verificar
+"""
+
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.database.analisis import DIAS_SEMANA, con_estado, fecha_referencia, filtrar_analisis, totales_asistencia
+from src.database.dashboard import consultar_metricas
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import aplicar_pragmas
+
+# Columnas sumables de cada celda
+MEDIDAS_CUBO = ["actividades", "total_agentes", "asistencia_confirmada", "asistencia_pendiente"]
+
+# Días de la semana de lunes a domingo con su número de strftime('%w')
+ORDEN_DIAS_SEMANA = [1, 2, 3, 4, 5, 6, 0]
+
+SQL_CUBO = """
+SELECT
+    date(r.fecha) as fecha,
+    r.curso_id,
+    r.turno_id,
+    c.nombre as curso_nombre,
+    t.nombre as turno_nombre,
+    COUNT(*) as actividades,
+    SUM(r.total_agentes) as total_agentes,
+    SUM(r.asistencia_confirmada) as asistencia_confirmada,
+    SUM(r.asistencia_pendiente) as asistencia_pendiente
+FROM resumen_actividades r
+LEFT JOIN cursos c ON r.curso_id = c.id
+LEFT JOIN turno t ON r.turno_id = t.id
+GROUP BY date(r.fecha), r.curso_id, r.turno_id
+"""
+
+
+def _completar_cubo(celdas):
+    """Añade el día de la semana de cada celda"""
+    fechas = pd.to_datetime(celdas["fecha"])
+    celdas["dia_semana_num"] = (fechas.dt.dayofweek.to_numpy() + 1) % 7
+    for medida in MEDIDAS_CUBO:
+        celdas[medida] = celdas[medida].fillna(0).astype(np.int64)
+    return celdas.reset_index(drop=True)
+
+
+def consultar_cubo(conn):
+    """Calcula el cubo del dashboard a partir de resumen_actividades"""
+    return _completar_cubo(pd.read_sql_query(SQL_CUBO, conn))
+
+
+def cubo_desde_tablas(actividades, cursos, turnos, agentes_actividades):
+    """Calcula el mismo cubo en memoria cuando resumen_actividades no está disponible"""
+    ids = actividades["id"].to_numpy()
+    totales = totales_asistencia(agentes_actividades).reindex(ids, fill_value=0)
+    filas = pd.DataFrame({
+        "fecha": actividades["fecha"].astype(str).str[:10].to_numpy(),
+        "curso_id": actividades["curso_id"].to_numpy(),
+        "turno_id": actividades["turno_id"].to_numpy(),
+        "actividades": 1,
+        "total_agentes": totales["total_agentes"].to_numpy(),
+        "asistencia_confirmada": totales["asistencia_confirmada"].to_numpy(),
+        "asistencia_pendiente": totales["asistencia_pendiente"].to_numpy(),
+    })
+    celdas = filas.groupby(["fecha", "curso_id", "turno_id"], as_index=False, dropna=False).sum()
+    celdas["curso_nombre"] = celdas["curso_id"].map(cursos.set_index("id")["nombre"])
+    celdas["turno_nombre"] = celdas["turno_id"].map(turnos.set_index("id")["nombre"])
+    return _completar_cubo(celdas)
+
+
+def filtrar_cubo(cubo, fecha_inicio=None, fecha_fin=None, curso=None, turno=None, estado=None):
+    """Devuelve las celdas que cumplen los filtros del dashboard (el cubo debe incluir el estado)"""
+    return filtrar_analisis(cubo, fecha_inicio, fecha_fin, curso, turno, estado)
+
+
+def metricas_cubo(celdas):
+    """Devuelve los mismos agregados que consultar_metricas sumando las celdas"""
+    total_actividades = int(celdas["actividades"].sum())
+    total_agentes = int(celdas["total_agentes"].sum())
+    confirmada = int(celdas["asistencia_confirmada"].sum())
+    return {
+        "total_actividades": total_actividades,
+        "total_agentes": total_agentes,
+        "asistencia_confirmada": confirmada,
+        "asistencia_porcentaje": (confirmada / total_agentes * 100) if total_agentes > 0 else 0
+    }
+
+
+def actividades_por_curso(celdas):
+    """Número de actividades de cada curso"""
+    return (
+        celdas.groupby("curso_nombre", as_index=False)["actividades"].sum()
+        .rename(columns={"actividades": "count"})
+    )
+
+
+def asistencia_por_dia(celdas):
+    """Agentes y asistencia confirmada por día de la semana, de lunes a domingo"""
+    dias = celdas["dia_semana_num"].to_numpy()
+    sumas = {
+        medida: np.bincount(dias, weights=celdas[medida].to_numpy(), minlength=7)[ORDEN_DIAS_SEMANA]
+        for medida in ("actividades", "total_agentes", "asistencia_confirmada")
+    }
+    total = sumas["total_agentes"]
+    por_dia = pd.DataFrame({
+        "dia_semana": [DIAS_SEMANA[dia] for dia in ORDEN_DIAS_SEMANA],
+        "total_agentes": total.astype(np.int64),
+        "asistencia_confirmada": sumas["asistencia_confirmada"].astype(np.int64),
+        "porcentaje": np.divide(
+            sumas["asistencia_confirmada"] * 100.0, total, out=np.zeros_like(total), where=total > 0
+        ),
+    })
+    # Solo los días con alguna actividad
+    return por_dia[sumas["actividades"] > 0].reset_index(drop=True)
+
+
+def actividades_por_estado(celdas):
+    """Número de actividades en cada estado"""
+    return (
+        celdas.groupby("estado", as_index=False)["actividades"].sum()
+        .rename(columns={"estado": "Estado", "actividades": "Cantidad"})
+    )
+
+
+def comparar_con_vista(conn):
+    """
+    Comprueba que las métricas del cubo coinciden con las de la vista para cada estado
+
+    Raises:
+        AssertionError: Si algún agregado difiere
+    """
+    hoy = fecha_referencia()
+    cubo = con_estado(consultar_cubo(conn), hoy)
+    for estado in ("Todos", "Pendiente", "En curso", "Completada"):
+        esperado = consultar_metricas(conn, hoy=hoy, estado=estado)
+        obtenido = metricas_cubo(filtrar_cubo(cubo, estado=estado))
+        assert obtenido == esperado, f"{estado}: {obtenido} != {esperado}"
+    return len(cubo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cubo de agregados del dashboard")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    parser.add_argument("--verificar", action="store_true", help="Compara las métricas del cubo con la vista")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    aplicar_pragmas(conn)
+    try:
+        if args.verificar:
+            celdas = comparar_con_vista(conn)
+            print(f"OK  Las métricas de las {celdas} celdas del cubo coinciden con la vista.")
+        else:
+            print(f"Cubo del dashboard con {len(consultar_cubo(conn))} celdas.")
+    finally:
+        conn.close()
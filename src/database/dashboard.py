@@ -0,0 +1,100 @@
+"""
+Consultas del dashboard de actividades con los filtros aplicados en SQL
+
+Los filtros de fecha, curso, turno y estado se traducen a la cláusula WHERE
+sobre vista_actividades_con_agentes, de modo que SQLite usa el índice por
+fecha de resumen_actividades y solo devuelve las filas del rango elegido.
+El estado se compara con una fecha de referencia pasada como parámetro, no
+con date('now'), para que el resultado solo dependa de los datos y del día.
+"""
+
+import pandas as pd
+
+from src.database.analisis import con_estado, fecha_referencia
+
+# Condición sobre la fecha equivalente a cada estado (el parámetro es la fecha de referencia)
+_CONDICIONES_ESTADO = {
+    "Completada": "fecha < ?",
+    "En curso": "fecha = ?",
+    "Pendiente": "fecha > ?",
+}
+
+
+def construir_filtros(fecha_inicio=None, fecha_fin=None, curso=None, turno=None, estado=None, hoy=None):
+    """
+    Construye la cláusula WHERE y sus parámetros para los filtros del dashboard
+
+    Args:
+        fecha_inicio: Fecha inicial (date o 'YYYY-MM-DD'), incluida
+        fecha_fin: Fecha final (date o 'YYYY-MM-DD'), incluida
+        curso: Nombre del curso o None / 'Todos'
+        turno: Nombre del turno o None / 'Todos'
+        estado: 'Pendiente', 'En curso', 'Completada' o None / 'Todos'
+        hoy: Fecha de referencia del estado (por defecto fecha_referencia())
+
+    Returns:
+        Tupla (where, params) con where vacío si no hay filtros
+    """
+    condiciones = []
+    params = []
+
+    if fecha_inicio is not None:
+        condiciones.append("fecha >= ?")
+        params.append(str(fecha_inicio))
+    if fecha_fin is not None:
+        condiciones.append("fecha <= ?")
+        params.append(str(fecha_fin))
+    if curso and curso != "Todos":
+        condiciones.append("curso_nombre = ?")
+        params.append(curso)
+    if turno and turno != "Todos":
+        condiciones.append("turno_nombre = ?")
+        params.append(turno)
+    if estado and estado != "Todos":
+        condiciones.append(_CONDICIONES_ESTADO[estado])
+        params.append(str(hoy or fecha_referencia()))
+
+    where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return where, params
+
+
+def consultar_actividades(conn, hoy=None, **filtros):
+    """
+    Devuelve las actividades de la vista que cumplen los filtros, de más reciente
+    a más antigua, con su estado respecto a hoy (por defecto fecha_referencia())
+    """
+    hoy = hoy or fecha_referencia()
+    where, params = construir_filtros(hoy=hoy, **filtros)
+    query = f"""
+    SELECT *
+    FROM vista_actividades_con_agentes
+    {where}
+    ORDER BY fecha DESC, actividad_id DESC
+    """
+    return con_estado(pd.read_sql_query(query, conn, params=params), hoy)
+
+
+def consultar_metricas(conn, hoy=None, **filtros):
+    """Devuelve los agregados de las tarjetas del dashboard para los filtros dados"""
+    where, params = construir_filtros(hoy=hoy, **filtros)
+    query = f"""
+    SELECT
+        COUNT(*) as total_actividades,
+        COALESCE(SUM(total_agentes), 0) as total_agentes,
+        COALESCE(SUM(asistencia_confirmada), 0) as asistencia_confirmada
+    FROM vista_actividades_con_agentes
+    {where}
+    """
+    total_actividades, total_agentes, asistencia_confirmada = conn.execute(query, params).fetchone()
+    porcentaje = (asistencia_confirmada / total_agentes * 100) if total_agentes > 0 else 0
+    return {
+        "total_actividades": total_actividades,
+        "total_agentes": total_agentes,
+        "asistencia_confirmada": asistencia_confirmada,
+        "asistencia_porcentaje": porcentaje
+    }
+
+
+def consultar_rango_fechas(conn):
+    """Devuelve la primera y la última fecha con actividades ('YYYY-MM-DD') o (None, None)"""
+    return tuple(conn.execute("SELECT MIN(fecha), MAX(fecha) FROM actividades").fetchone())
@@ -0,0 +1,214 @@
+"""
+Escrituras por lotes de la API
+
+Cada función aplica un lote completo en una sola transacción: comprueba con
+unas pocas consultas qué filas existen ya, escribe el lote con executemany y
+devuelve un resultado por elemento, en el orden recibido. La transacción se
+abre con BEGIN IMMEDIATE para que ninguna otra conexión escriba entre la
+comprobación y la escritura. Un elemento repetido dentro del lote se marca
+como 'duplicado' y solo se aplica su primera aparición.
+"""
+
+from src.database.asistencia import VALORES_ASISTENCIA
+
+# Variables por consulta al comprobar qué claves existen
+TAMANO_BLOQUE_CLAVES = 500
+
+CAMPOS_AGENTE = ("nip", "nombre", "apellido1", "apellido2", "seccion", "grupo")
+
+
+def _filas_existentes(conn, sql, claves, params=()):
+    """
+    Ejecuta sql por bloques de claves ({marcadores} tras params) y devuelve un
+    diccionario primera columna → fila completa como tupla
+    """
+    claves = list(claves)
+    filas = {}
+    for inicio in range(0, len(claves), TAMANO_BLOQUE_CLAVES):
+        bloque = claves[inicio:inicio + TAMANO_BLOQUE_CLAVES]
+        marcadores = ", ".join("?" for _ in bloque)
+        for fila in conn.execute(sql.format(marcadores=marcadores), list(params) + bloque):
+            filas[fila[0]] = tuple(fila)
+    return filas
+
+
+def _existentes(conn, sql, claves, params=()):
+    """Devuelve el conjunto de claves para las que sql devuelve fila"""
+    return set(_filas_existentes(conn, sql, claves, params))
+
+
+def _en_transaccion(conn, escribir):
+    """Ejecuta escribir() dentro de BEGIN IMMEDIATE y confirma o deshace"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        resultado = escribir()
+        conn.commit()
+        return resultado
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def guardar_agentes(conn, agentes):
+    """
+    Crea o actualiza varios agentes en una transacción
+
+    Args:
+        conn: Conexión a la base de datos
+        agentes: Lista de diccionarios con los campos de CAMPOS_AGENTE; los
+            campos ausentes se guardan como NULL
+
+    Returns:
+        Lista con 'creado', 'actualizado', 'sin_cambios' o 'duplicado' por agente
+    """
+    def escribir():
+        # Los agentes que no cambian no se reescriben: cada UPDATE reindexa el
+        # agente en agentes_fts (localizado por rowid con agentes_fts_claves) y
+        # avanza la versión de agentes en cambios_tablas, y una sincronización
+        # completa reenvía sobre todo agentes sin cambios
+        existentes = _filas_existentes(
+            conn,
+            f"SELECT {', '.join(CAMPOS_AGENTE)} FROM agentes WHERE nip IN ({{marcadores}})",
+            {agente["nip"] for agente in agentes}
+        )
+        resultados = []
+        filas = []
+        vistos = set()
+        for agente in agentes:
+            nip = agente["nip"]
+            if nip in vistos:
+                resultados.append("duplicado")
+                continue
+            vistos.add(nip)
+            fila = tuple(agente.get(campo) for campo in CAMPOS_AGENTE)
+            if nip not in existentes:
+                resultados.append("creado")
+            elif existentes[nip] != fila:
+                resultados.append("actualizado")
+            else:
+                resultados.append("sin_cambios")
+                continue
+            filas.append(fila)
+
+        actualizaciones = ", ".join(f"{campo} = excluded.{campo}" for campo in CAMPOS_AGENTE[1:])
+        conn.executemany(
+            f"INSERT INTO agentes ({', '.join(CAMPOS_AGENTE)}) VALUES ({', '.join('?' for _ in CAMPOS_AGENTE)}) "
+            f"ON CONFLICT(nip) DO UPDATE SET {actualizaciones}",
+            filas
+        )
+        return resultados
+
+    return _en_transaccion(conn, escribir) if agentes else []
+
+
+def asignar_agentes_lote(conn, actividad_id, asignaciones):
+    """
+    Asigna varios agentes a una actividad en una transacción
+
+    Args:
+        conn: Conexión a la base de datos
+        actividad_id: ID de la actividad
+        asignaciones: Lista de pares (agente_nip, asistencia inicial)
+
+    Returns:
+        Lista con 'asignado', 'ya_asignado', 'agente_no_encontrado' o
+        'duplicado' por asignación
+
+    Raises:
+        ValueError: Si alguna asistencia no es válida
+    """
+    for agente_nip, asistencia in asignaciones:
+        if asistencia not in VALORES_ASISTENCIA:
+            raise ValueError(f"Asistencia no válida para el agente {agente_nip}: {asistencia}")
+
+    def escribir():
+        nips = {agente_nip for agente_nip, _ in asignaciones}
+        agentes = _existentes(conn, "SELECT nip FROM agentes WHERE nip IN ({marcadores})", nips)
+        asignados = _existentes(
+            conn,
+            "SELECT agente_nip FROM agentes_actividades WHERE actividad_id = ? AND agente_nip IN ({marcadores})",
+            nips,
+            (actividad_id,)
+        )
+        resultados = []
+        filas = []
+        vistos = set()
+        for agente_nip, asistencia in asignaciones:
+            if agente_nip in vistos:
+                resultados.append("duplicado")
+                continue
+            vistos.add(agente_nip)
+            if agente_nip not in agentes:
+                resultados.append("agente_no_encontrado")
+            elif agente_nip in asignados:
+                resultados.append("ya_asignado")
+            else:
+                resultados.append("asignado")
+                filas.append((actividad_id, agente_nip, asistencia))
+
+        conn.executemany(
+            "INSERT INTO agentes_actividades (actividad_id, agente_nip, asistencia) VALUES (?, ?, ?)",
+            filas
+        )
+        return resultados
+
+    return _en_transaccion(conn, escribir) if asignaciones else []
+
+
+def guardar_asistencias_lote(conn, asistencias):
+    """
+    Actualiza la asistencia de varias asignaciones, de una o varias actividades,
+    en una transacción
+
+    Args:
+        conn: Conexión a la base de datos
+        asistencias: Lista de tuplas (actividad_id, agente_nip, asistencia)
+
+    Returns:
+        Lista con 'actualizada', 'no_asignado' o 'duplicado' por elemento
+
+    Raises:
+        ValueError: Si alguna asistencia no es válida
+    """
+    for actividad_id, agente_nip, asistencia in asistencias:
+        if asistencia not in VALORES_ASISTENCIA:
+            raise ValueError(f"Asistencia no válida para el agente {agente_nip}: {asistencia}")
+
+    def escribir():
+        # Las asignaciones existentes se buscan actividad por actividad con su índice
+        asignados = set()
+        por_actividad = {}
+        for actividad_id, agente_nip, _ in asistencias:
+            por_actividad.setdefault(actividad_id, set()).add(agente_nip)
+        for actividad_id, nips in por_actividad.items():
+            asignados.update(
+                (actividad_id, nip) for nip in _existentes(
+                    conn,
+                    "SELECT agente_nip FROM agentes_actividades WHERE actividad_id = ? AND agente_nip IN ({marcadores})",
+                    nips,
+                    (actividad_id,)
+                )
+            )
+
+        resultados = []
+        filas = []
+        vistos = set()
+        for actividad_id, agente_nip, asistencia in asistencias:
+            clave = (actividad_id, agente_nip)
+            if clave in vistos:
+                resultados.append("duplicado")
+                continue
+            vistos.add(clave)
+            if clave in asignados:
+                resultados.append("actualizada")
+                filas.append((asistencia, actividad_id, agente_nip))
+            else:
+                resultados.append("no_asignado")
+
+        conn.executemany(
+            "UPDATE agentes_actividades SET asistencia = ? WHERE actividad_id = ? AND agente_nip = ?",
+            filas
+        )
+        return resultados
+
+    return _en_transaccion(conn, escribir) if asistencias else []
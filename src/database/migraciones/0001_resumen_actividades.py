@@ -0,0 +1,9 @@
+"""
+Tabla resumen_actividades, sus triggers y la vista vista_actividades_con_agentes que la lee
+"""
+
+from src.database.resumen import crear_resumen_actividades
+
+
+def upgrade(conn):
+    crear_resumen_actividades(conn)
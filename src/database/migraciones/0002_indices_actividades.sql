@@ -0,0 +1,14 @@
+-- Índices para las consultas por actividad, fecha, curso y monitor
+
+-- get_agentes_por_actividad y el recuento correlacionado de get_actividades_detalle
+-- filtran por actividad_id, que no es el primer campo de la clave primaria
+CREATE INDEX IF NOT EXISTS idx_agentes_actividades_actividad ON agentes_actividades (actividad_id);
+
+-- Filtros por rango de fechas del dashboard y de los listados
+CREATE INDEX IF NOT EXISTS idx_actividades_fecha ON actividades (fecha);
+
+-- Comprobación de actividades asociadas al eliminar un curso y filtro por curso
+CREATE INDEX IF NOT EXISTS idx_actividades_curso ON actividades (curso_id);
+
+-- Actividades de un monitor
+CREATE INDEX IF NOT EXISTS idx_actividades_monitor ON actividades (monitor_nip);
@@ -0,0 +1,2 @@
+-- Índice por fecha de la tabla resumen para los filtros del dashboard
+CREATE INDEX IF NOT EXISTS idx_resumen_actividades_fecha ON resumen_actividades (fecha);
@@ -0,0 +1,9 @@
+"""
+Índice FTS5 agentes_fts para la búsqueda de agentes sin distinguir acentos, y sus triggers
+"""
+
+from src.database.busqueda import crear_busqueda_agentes
+
+
+def upgrade(conn):
+    crear_busqueda_agentes(conn)
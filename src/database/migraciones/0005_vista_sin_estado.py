@@ -0,0 +1,9 @@
+"""
+vista_actividades_con_agentes sin la columna estado, que dependía de date('now')
+"""
+
+from src.database.resumen import crear_vista_actividades
+
+
+def upgrade(conn):
+    crear_vista_actividades(conn)
@@ -0,0 +1,9 @@
+"""
+Tabla cambios_tablas con un contador de versión por tabla y los triggers que lo incrementan
+"""
+
+from src.database.cambios import crear_cambios_tablas
+
+
+def upgrade(conn):
+    crear_cambios_tablas(conn)
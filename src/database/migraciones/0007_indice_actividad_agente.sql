@@ -0,0 +1,8 @@
+-- Índice de asignaciones por actividad y agente
+
+-- La exportación de asistencia recorre las actividades por fecha y, dentro de
+-- cada una, sus agentes por NIP: con (actividad_id, agente_nip) las filas salen
+-- ya en ese orden y SQLite no tiene que ordenarlas en memoria. Sustituye al
+-- índice sobre actividad_id, que es un prefijo suyo y sirve para lo mismo
+CREATE INDEX IF NOT EXISTS idx_agentes_actividades_actividad_agente ON agentes_actividades (actividad_id, agente_nip);
+DROP INDEX IF EXISTS idx_agentes_actividades_actividad;
@@ -0,0 +1,12 @@
+"""
+Tabla agentes_fts_claves y triggers de agentes_fts que localizan cada agente por rowid
+"""
+
+from src.database.busqueda import TRIGGERS_BUSQUEDA, crear_busqueda_agentes
+
+
+def upgrade(conn):
+    # Los triggers anteriores borraban por la columna nip, recorriendo todo el índice
+    for trigger in TRIGGERS_BUSQUEDA:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    crear_busqueda_agentes(conn)
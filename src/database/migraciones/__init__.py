@@ -0,0 +1,258 @@
+"""
+Migraciones versionadas del esquema de la base de datos
+
+Cada migración es un archivo NNNN_descripcion.sql o NNNN_descripcion.py de este
+directorio (los .py definen upgrade(conn)). Se aplican en orden y la tabla
+schema_version registra las ya aplicadas, de modo que una base de datos
+existente recibe los cambios nuevos, como índices, sin recrearse.
+Varios procesos pueden aplicarlas a la vez (la API y Streamlit llaman a
+asegurar_esquema al arrancar): cada migración toma el bloqueo de escritura y
+se salta si otro proceso ya la ha registrado.
+
+Uso:
+    python -m src.database.migraciones [--dry-run] [--verificar]
+"""
+
+import importlib.util
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from src.database.pool import DATABASE_PATH, get_pool
+
+MIGRACIONES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_PATRON_MIGRACION = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+
+# Milisegundos que se espera al bloqueo de escritura mientras otro proceso
+# (la API y Streamlit arrancan a la vez) aplica una migración
+ESPERA_MIGRACIONES_MS = int(os.getenv("MIGRACIONES_BUSY_TIMEOUT", "60000"))
+
+# Consultas más frecuentes y el índice que debe usar cada una
+CONSULTAS_CRITICAS = [
+    (
+        "Agentes de una actividad",
+        """
+        SELECT a.nip, a.nombre, aa.asistencia
+        FROM agentes a
+        JOIN agentes_actividades aa ON a.nip = aa.agente_nip
+        WHERE aa.actividad_id = ?
+        """,
+        (1,),
+        "idx_agentes_actividades_actividad_agente"
+    ),
+    (
+        "Total de agentes por actividad (subconsulta correlacionada)",
+        """
+        SELECT a.id, (SELECT COUNT(*) FROM agentes_actividades aa WHERE aa.actividad_id = a.id) as total_agentes
+        FROM actividades a
+        """,
+        (),
+        "idx_agentes_actividades_actividad_agente"
+    ),
+    (
+        "Actividades en un rango de fechas",
+        "SELECT id, fecha FROM actividades WHERE fecha BETWEEN ? AND ?",
+        ("2024-01-01", "2024-01-31"),
+        "idx_actividades_fecha"
+    ),
+    (
+        "Dashboard filtrado por rango de fechas",
+        "SELECT * FROM vista_actividades_con_agentes WHERE fecha >= ? AND fecha <= ?",
+        ("2024-01-01", "2024-01-31"),
+        "idx_resumen_actividades_fecha"
+    ),
+    (
+        "Página siguiente del listado de actividades (keyset)",
+        """
+        SELECT a.id, a.fecha
+        FROM actividades a
+        WHERE (a.fecha, a.id) < (?, ?)
+        ORDER BY a.fecha DESC, a.id DESC
+        LIMIT 51
+        """,
+        ("2024-01-31", 100),
+        "idx_actividades_fecha"
+    ),
+    (
+        "Actividades de un curso",
+        "SELECT COUNT(*) FROM actividades WHERE curso_id = ?",
+        (1,),
+        "idx_actividades_curso"
+    ),
+    (
+        "Actividades de un monitor",
+        "SELECT id FROM actividades WHERE monitor_nip = ?",
+        ("M001",),
+        "idx_actividades_monitor"
+    ),
+]
+
+
+def listar_migraciones():
+    """Devuelve las migraciones disponibles como (version, nombre, ruta) ordenadas"""
+    migraciones = []
+    for archivo in os.listdir(MIGRACIONES_DIR):
+        coincidencia = _PATRON_MIGRACION.match(archivo)
+        if coincidencia:
+            migraciones.append((
+                int(coincidencia.group(1)),
+                coincidencia.group(2),
+                os.path.join(MIGRACIONES_DIR, archivo)
+            ))
+    return sorted(migraciones)
+
+
+def _crear_tabla_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            aplicada_en TEXT NOT NULL
+        )
+    """)
+    conn.commit()
+
+
+def version_actual(conn):
+    """Devuelve la última versión de esquema aplicada (0 si no hay ninguna), sin modificar la base de datos"""
+    existe = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()[0]
+    if not existe:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migraciones_pendientes(conn):
+    """Devuelve las migraciones que aún no se han aplicado"""
+    actual = version_actual(conn)
+    return [migracion for migracion in listar_migraciones() if migracion[0] > actual]
+
+
+def _cargar_modulo(ruta):
+    spec = importlib.util.spec_from_file_location(os.path.basename(ruta)[:-3], ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def describir_migracion(ruta):
+    """Devuelve el SQL de una migración .sql o la descripción de una .py"""
+    if ruta.endswith(".sql"):
+        with open(ruta, encoding="utf-8") as f:
+            return f.read()
+    return (_cargar_modulo(ruta).__doc__ or "").strip()
+
+
+def _sentencias(sql):
+    """Divide un script SQL en sentencias completas (los triggers incluyen sus ';' internos)"""
+    sentencias = []
+    actual = ""
+    for fragmento in sql.split(";"):
+        actual += fragmento + ";"
+        if sqlite3.complete_statement(actual):
+            sentencias.append(actual)
+            actual = ""
+    return [sentencia for sentencia in sentencias if sentencia.strip(" \t\n;")]
+
+
+def aplicar_migracion(conn, version, nombre, ruta):
+    """
+    Aplica una migración y la registra en schema_version en la misma transacción
+
+    La transacción empieza con BEGIN IMMEDIATE y vuelve a leer la versión
+    dentro de ella: si otro proceso ha aplicado la migración mientras tanto,
+    no se repite.
+
+    Returns:
+        True si se ha aplicado, False si ya estaba aplicada
+    """
+    try:
+        # sqlite3 no abre transacción antes de las sentencias DDL: sin este
+        # BEGIN cada CREATE se confirmaría por separado. IMMEDIATE toma el
+        # bloqueo de escritura antes de comprobar la versión
+        conn.execute("BEGIN IMMEDIATE")
+        if version_actual(conn) >= version:
+            conn.rollback()
+            return False
+        if ruta.endswith(".sql"):
+            # Sentencia a sentencia: executescript confirmaría la transacción
+            for sentencia in _sentencias(describir_migracion(ruta)):
+                conn.execute(sentencia)
+        else:
+            # Las funciones que llaman las migraciones .py no confirman por su cuenta
+            _cargar_modulo(ruta).upgrade(conn)
+        conn.execute(
+            "INSERT INTO schema_version (version, nombre, aplicada_en) VALUES (?, ?, ?)",
+            (version, nombre, datetime.now().isoformat(timespec="seconds"))
+        )
+        conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    return True
+
+
+def aplicar_migraciones(conn, dry_run=False):
+    """
+    Aplica en orden todas las migraciones pendientes
+
+    Args:
+        conn: Conexión a la base de datos
+        dry_run: Si es True solo muestra lo que se aplicaría
+
+    Returns:
+        Lista de (version, nombre) aplicadas o pendientes en modo dry-run
+    """
+    pendientes = migraciones_pendientes(conn)
+    if dry_run:
+        for version, nombre, ruta in pendientes:
+            print(f"-- Migración pendiente {version:04d}_{nombre}")
+            print(describir_migracion(ruta))
+        return [(version, nombre) for version, nombre, _ in pendientes]
+    if not pendientes:
+        return []
+
+    # Las pendientes se han leído sin bloqueo: si otro proceso está migrando,
+    # se espera a que termine y aplicar_migracion salta lo que ya aplicó
+    espera_anterior = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    conn.execute(f"PRAGMA busy_timeout = {max(espera_anterior, ESPERA_MIGRACIONES_MS)}")
+    aplicadas = []
+    try:
+        _crear_tabla_version(conn)
+        for version, nombre, ruta in pendientes:
+            if aplicar_migracion(conn, version, nombre, ruta):
+                aplicadas.append((version, nombre))
+                print(f"Migración {version:04d}_{nombre} aplicada.")
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {espera_anterior}")
+    return aplicadas
+
+
+def asegurar_esquema(database=DATABASE_PATH):
+    """Aplica al arrancar las migraciones pendientes si la base de datos ya existe"""
+    if not os.path.exists(database):
+        return []
+    with get_pool(database).connection() as conn:
+        return aplicar_migraciones(conn)
+
+
+def verificar_indices(conn):
+    """
+    Comprueba con EXPLAIN QUERY PLAN que las consultas críticas usan sus índices
+
+    Raises:
+        AssertionError: Si alguna consulta no usa el índice esperado
+    """
+    errores = []
+    for descripcion, consulta, parametros, indice in CONSULTAS_CRITICAS:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {consulta}", parametros).fetchall()
+        detalle = " | ".join(str(fila[-1]) for fila in plan)
+        if indice not in detalle:
+            errores.append(f"{descripcion}: no usa {indice} ({detalle})")
+        else:
+            print(f"OK  {descripcion}: {detalle}")
+    assert not errores, "Consultas sin índice:\n" + "\n".join(errores)
@@ -0,0 +1,31 @@
+import argparse
+import sqlite3
+import sys
+
+from src.database.migraciones import aplicar_migraciones, verificar_indices, version_actual
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import aplicar_pragmas
+
+parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+parser.add_argument("--dry-run", action="store_true", help="Muestra las migraciones pendientes sin aplicarlas")
+parser.add_argument("--verificar", action="store_true", help="Comprueba que las consultas críticas usan sus índices")
+args = parser.parse_args()
+
+conn = sqlite3.connect(args.database)
+aplicar_pragmas(conn)
+
+try:
+    print(f"Versión actual del esquema: {version_actual(conn)}")
+    migraciones = aplicar_migraciones(conn, dry_run=args.dry_run)
+    if not migraciones:
+        print("No hay migraciones pendientes.")
+
+    if args.verificar:
+        try:
+            verificar_indices(conn)
+        except AssertionError as e:
+            print(e)
+            sys.exit(1)
+finally:
+    conn.close()
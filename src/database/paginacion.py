@@ -0,0 +1,201 @@
+"""
+Paginación por clave (keyset) para los listados
+
+En lugar de OFFSET, cada página continúa a partir de la clave de la última
+fila mostrada (WHERE (fecha, id) < (?, ?) ORDER BY fecha DESC, id DESC LIMIT ?),
+de modo que SQLite recorre el índice desde ese punto y solo devuelve las filas
+de la página. El total se obtiene con un COUNT(*) sobre los mismos filtros.
+"""
+
+import pandas as pd
+
+# Tamaño de página por defecto y opciones del selector
+TAMANO_PAGINA = 50
+TAMANOS_PAGINA = (25, 50, 100)
+
+
+class ConsultaPaginada:
+    """
+    Consulta de un listado paginable por clave
+
+    Args:
+        columnas: Lista de columnas del SELECT
+        desde: Cláusula FROM con sus JOIN
+        clave: Lista de (expresión SQL, columna del resultado) que identifica
+            cada fila de forma única, en el orden del listado
+        descendente: True para ORDER BY ... DESC
+    """
+
+    def __init__(self, columnas, desde, clave, descendente=False):
+        self.columnas = columnas
+        self.desde = desde
+        self.clave = clave
+        self.descendente = descendente
+
+    def _where(self, condiciones, params, limite=None, anterior=False):
+        condiciones = list(condiciones)
+        params = list(params)
+        if limite is not None:
+            # Hacia delante en orden descendente se buscan claves menores
+            hacia_menores = self.descendente != anterior
+            expresiones = ", ".join(expresion for expresion, _ in self.clave)
+            marcadores = ", ".join("?" for _ in self.clave)
+            condiciones.append(f"({expresiones}) {'<' if hacia_menores else '>'} ({marcadores})")
+            params.extend(limite)
+        where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+        return where, params
+
+    def _order_by(self, invertido=False):
+        descendente = self.descendente != invertido
+        return ", ".join(f"{expresion} {'DESC' if descendente else 'ASC'}" for expresion, _ in self.clave)
+
+    def sql_pagina(self, condiciones=(), params=(), limite=None, despues_de=None, antes_de=None, columnas=None):
+        """
+        Devuelve la consulta y los parámetros de una página del listado
+
+        Args:
+            condiciones: Condiciones SQL de los filtros (se combinan con AND)
+            params: Parámetros de las condiciones
+            limite: Número máximo de filas (None para todas)
+            despues_de: Clave de la última fila de la página actual (página siguiente)
+            antes_de: Clave de la primera fila de la página actual (página anterior)
+            columnas: Columnas del SELECT si no son las de la consulta
+        """
+        anterior = antes_de is not None
+        where, params = self._where(condiciones, params, antes_de if anterior else despues_de, anterior)
+        query = f"""
+        SELECT {", ".join(columnas or self.columnas)}
+        {self.desde}
+        {where}
+        ORDER BY {self._order_by(invertido=anterior)}
+        LIMIT ?
+        """
+        # En SQLite un LIMIT negativo no limita
+        return query, params + [-1 if limite is None else limite]
+
+    def pagina(self, conn, condiciones=(), params=(), tamano=TAMANO_PAGINA, despues_de=None, antes_de=None):
+        """
+        Devuelve una página del listado
+
+        Args:
+            conn: Conexión a la base de datos
+            condiciones: Condiciones SQL de los filtros (se combinan con AND)
+            params: Parámetros de las condiciones
+            tamano: Número de filas por página
+            despues_de: Clave de la última fila de la página actual (página siguiente)
+            antes_de: Clave de la primera fila de la página actual (página anterior)
+
+        Returns:
+            Tupla (DataFrame, hay_mas) donde hay_mas indica si quedan filas en
+            la dirección pedida
+        """
+        anterior = antes_de is not None
+        # Se pide una fila de más para saber si hay otra página
+        query, params = self.sql_pagina(condiciones, params, tamano + 1, despues_de, antes_de)
+        df = pd.read_sql_query(query, conn, params=params)
+        hay_mas = len(df) > tamano
+        df = df.iloc[:tamano]
+        if anterior:
+            df = df.iloc[::-1]
+        return df.reset_index(drop=True), hay_mas
+
+    def contar(self, conn, condiciones=(), params=()):
+        """Devuelve el número total de filas que cumplen los filtros"""
+        where, params = self._where(condiciones, params)
+        return conn.execute(f"SELECT COUNT(*) {self.desde} {where}", params).fetchone()[0]
+
+    def clave_de(self, fila):
+        """Devuelve la clave de una fila del resultado como tupla de tipos de Python"""
+        return tuple(
+            valor.item() if hasattr(valor, "item") else valor
+            for valor in (fila[columna] for _, columna in self.clave)
+        )
+
+
+# Listado de actividades, de la más reciente a la más antigua
+CONSULTA_ACTIVIDADES = ConsultaPaginada(
+    columnas=[
+        "a.id",
+        "a.fecha",
+        "a.turno_id",
+        "t.nombre as turno_nombre",
+        "a.monitor_nip",
+        "m.nombre || ' ' || m.apellido1 || CASE WHEN m.apellido2 IS NOT NULL THEN ' ' || m.apellido2 ELSE '' END as monitor_nombre",
+        "a.curso_id",
+        "c.nombre as curso_nombre",
+        "a.notas",
+        "COALESCE(r.total_agentes, 0) as total_agentes",
+    ],
+    desde="""
+        FROM actividades a
+        JOIN turno t ON a.turno_id = t.id
+        JOIN cursos c ON a.curso_id = c.id
+        LEFT JOIN monitores m ON a.monitor_nip = m.nip
+        LEFT JOIN resumen_actividades r ON r.actividad_id = a.id
+    """,
+    clave=[("a.fecha", "fecha"), ("a.id", "id")],
+    descendente=True,
+)
+
+# Listado de agentes por NIP
+CONSULTA_AGENTES = ConsultaPaginada(
+    columnas=[
+        "a.nip",
+        "a.nombre",
+        "a.apellido1",
+        "a.apellido2",
+        "a.nombre || ' ' || a.apellido1 || CASE WHEN a.apellido2 IS NOT NULL THEN ' ' || a.apellido2 ELSE '' END as nombre_completo",
+        "a.seccion",
+        "a.grupo",
+    ],
+    desde="FROM agentes a",
+    clave=[("a.nip", "nip")],
+)
+
+# Listado de monitores por NIP
+CONSULTA_MONITORES = ConsultaPaginada(
+    columnas=[
+        "m.nip",
+        "m.nombre",
+        "m.apellido1",
+        "m.apellido2",
+        "m.nombre || ' ' || m.apellido1 || CASE WHEN m.apellido2 IS NOT NULL THEN ' ' || m.apellido2 ELSE '' END as nombre_completo",
+    ],
+    desde="FROM monitores m",
+    clave=[("m.nip", "nip")],
+)
+
+
+def filtros_actividades(fecha_inicio=None, fecha_fin=None, curso=None, turno=None):
+    """Condiciones y parámetros del listado de actividades ('Todos' o None no filtran)"""
+    condiciones = []
+    params = []
+    if fecha_inicio is not None:
+        condiciones.append("a.fecha >= ?")
+        params.append(str(fecha_inicio))
+    if fecha_fin is not None:
+        condiciones.append("a.fecha <= ?")
+        params.append(str(fecha_fin))
+    if curso and curso != "Todos":
+        condiciones.append("c.nombre = ?")
+        params.append(curso)
+    if turno and turno != "Todos":
+        condiciones.append("t.nombre = ?")
+        params.append(turno)
+    return condiciones, params
+
+
+def filtros_agentes(seccion=None, grupo=None, consulta_fts=None):
+    """Condiciones y parámetros del listado de agentes ('Todas'/'Todos' o None no filtran)"""
+    condiciones = []
+    params = []
+    if seccion and seccion != "Todas":
+        condiciones.append("a.seccion = ?")
+        params.append(seccion)
+    if grupo and grupo != "Todos":
+        condiciones.append("a.grupo = ?")
+        params.append(grupo)
+    if consulta_fts:
+        condiciones.append("a.nip IN (SELECT nip FROM agentes_fts WHERE agentes_fts MATCH ?)")
+        params.append(consulta_fts)
+    return condiciones, params
@@ -0,0 +1,204 @@
+"""
+Módulo con un pool de conexiones SQLite compartido por la aplicación Streamlit y la API
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from src.database.pragmas import PRAGMA_PROFILE, aplicar_pragmas
+
+# Ruta a la base de datos
+DATABASE_PATH = "sistema_agentes.db"
+
+# Tamaño máximo del pool y tiempo de espera por una conexión libre (segundos)
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Segundos que una conexión puede estar inactiva antes de comprobar que sigue viva
+HEALTH_CHECK_INTERVAL = 30.0
+
+
+class PoolAgotadoError(Exception):
+    """No hay conexiones libres en el pool dentro del tiempo de espera"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión SQLite que vuelve al pool al llamar a close()
+
+    Hereda de sqlite3.Connection para que pandas y el resto del código la
+    traten como una conexión normal.
+    """
+
+    _pool = None
+    _en_uso = False
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        elif self._en_uso:
+            self._pool.checkin(self)
+
+    def cerrar_definitivamente(self):
+        """Cierra la conexión real sin devolverla al pool"""
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones SQLite seguro entre hilos
+
+    Cada conexión solo la usa un hilo a la vez: se obtiene con checkout() y se
+    devuelve con checkin() (o con close() sobre la propia conexión).
+    """
+
+    def __init__(self, database=DATABASE_PATH, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT, pragmas=None):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(PRAGMA_PROFILE if pragmas is None else pragmas)
+        self._condicion = threading.Condition()
+        self._libres = []  # Pila de (conexión, instante de devolución)
+        self._creadas = 0
+        self._cerrado = False
+
+    def _crear_conexion(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            check_same_thread=False,
+            factory=PooledConnection
+        )
+        aplicar_pragmas(conn, self.pragmas)
+        conn._pool = self
+        return conn
+
+    def _descartar(self, conn):
+        try:
+            conn.cerrar_definitivamente()
+        except sqlite3.Error:
+            pass
+        with self._condicion:
+            self._creadas -= 1
+            self._condicion.notify()
+
+    @staticmethod
+    def _esta_viva(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def checkout(self, timeout=None):
+        """Obtiene una conexión del pool, esperando si están todas en uso"""
+        limite = time.monotonic() + (self.timeout if timeout is None else timeout)
+        conn = None
+        devuelta_en = None
+
+        with self._condicion:
+            while True:
+                if self._cerrado:
+                    raise PoolAgotadoError("El pool de conexiones está cerrado")
+                if self._libres:
+                    conn, devuelta_en = self._libres.pop()
+                    break
+                if self._creadas < self.max_size:
+                    self._creadas += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise PoolAgotadoError(
+                        f"No hay conexiones libres tras esperar {self.timeout} segundos "
+                        f"(máximo {self.max_size})"
+                    )
+                self._condicion.wait(restante)
+
+        # Comprobar la salud de las conexiones que llevan tiempo inactivas
+        if conn is not None and time.monotonic() - devuelta_en > HEALTH_CHECK_INTERVAL:
+            if not self._esta_viva(conn):
+                self._descartar(conn)
+                return self.checkout(timeout)
+
+        if conn is None:
+            try:
+                conn = self._crear_conexion()
+            except Exception:
+                with self._condicion:
+                    self._creadas -= 1
+                    self._condicion.notify()
+                raise
+
+        conn.row_factory = sqlite3.Row
+        conn._en_uso = True
+        return conn
+
+    def checkin(self, conn):
+        """Devuelve una conexión al pool deshaciendo cualquier transacción abierta"""
+        conn._en_uso = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._descartar(conn)
+            return
+
+        with self._condicion:
+            if self._cerrado:
+                self._creadas -= 1
+                conn.cerrar_definitivamente()
+                return
+            self._libres.append((conn, time.monotonic()))
+            self._condicion.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager que obtiene y devuelve una conexión"""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Cierra las conexiones libres y rechaza nuevas peticiones"""
+        with self._condicion:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+            self._creadas -= len(libres)
+            self._condicion.notify_all()
+        for conn, _ in libres:
+            conn.cerrar_definitivamente()
+
+    def stats(self):
+        """Devuelve el estado actual del pool"""
+        with self._condicion:
+            return {
+                "max_size": self.max_size,
+                "creadas": self._creadas,
+                "libres": len(self._libres),
+                "en_uso": self._creadas - len(self._libres)
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database=DATABASE_PATH):
+    """Devuelve el pool compartido por todo el proceso para una base de datos"""
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = ConnectionPool(database)
+            _pools[database] = pool
+        return pool
+
+
+def get_db_connection(database=DATABASE_PATH):
+    """Obtiene una conexión del pool compartido; close() la devuelve al pool"""
+    return get_pool(database).checkout()
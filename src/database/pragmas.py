@@ -0,0 +1,81 @@
+"""
+Perfil de PRAGMAs de SQLite aplicado a cada conexión y al crear la base de datos
+"""
+
+import os
+import sqlite3
+
+# Perfil por defecto, configurable mediante variables de entorno.
+# WAL permite que las lecturas largas del dashboard no bloqueen las escrituras
+# de asistencia, y busy_timeout evita los errores "database is locked".
+PRAGMA_PROFILE = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # milisegundos
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),  # negativo = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),  # bytes
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    # Necesario para que INSERT OR REPLACE dispare los triggers de borrado
+    # que mantienen la tabla resumen_actividades
+    "recursive_triggers": "ON",
+}
+
+# Valores numéricos que devuelve SQLite para los PRAGMAs con nombre
+_SYNCHRONOUS = {"0": "OFF", "1": "NORMAL", "2": "FULL", "3": "EXTRA"}
+_TEMP_STORE = {"0": "DEFAULT", "1": "FILE", "2": "MEMORY"}
+_BOOLEANO = {"0": "OFF", "1": "ON"}
+
+
+def aplicar_pragmas(conn, profile=None):
+    """Aplica el perfil de PRAGMAs a una conexión"""
+    profile = PRAGMA_PROFILE if profile is None else profile
+    for nombre, valor in profile.items():
+        conn.execute(f"PRAGMA {nombre} = {valor}")
+
+
+def obtener_pragmas_activos(conn, nombres=None):
+    """Devuelve los valores activos de los PRAGMAs del perfil en una conexión"""
+    activos = {}
+    for nombre in nombres or PRAGMA_PROFILE:
+        valor = str(conn.execute(f"PRAGMA {nombre}").fetchone()[0])
+        if nombre == "synchronous":
+            valor = _SYNCHRONOUS.get(valor, valor)
+        elif nombre == "temp_store":
+            valor = _TEMP_STORE.get(valor, valor)
+        elif nombre == "recursive_triggers":
+            valor = _BOOLEANO.get(valor, valor)
+        activos[nombre] = valor
+    return activos
+
+
+def verificar_pragmas(database, profile=None):
+    """
+    Comprueba al arrancar qué PRAGMAs están activos e informa de las diferencias
+
+    Args:
+        database: Ruta a la base de datos
+        profile: Perfil esperado (por defecto PRAGMA_PROFILE)
+
+    Returns:
+        Diccionario {pragma: (esperado, activo)} con todos los PRAGMAs del perfil
+    """
+    profile = PRAGMA_PROFILE if profile is None else profile
+    if not os.path.exists(database):
+        print(f"La base de datos {database} no existe. No se pueden comprobar los PRAGMAs.")
+        return {}
+
+    conn = sqlite3.connect(database)
+    try:
+        aplicar_pragmas(conn, profile)
+        activos = obtener_pragmas_activos(conn, profile)
+    finally:
+        conn.close()
+
+    resultado = {}
+    print(f"PRAGMAs activos en {database}:")
+    for nombre, esperado in profile.items():
+        activo = activos[nombre]
+        resultado[nombre] = (str(esperado), activo)
+        aviso = "" if str(esperado).lower() == activo.lower() else f"  (se esperaba {esperado})"
+        print(f"  {nombre} = {activo}{aviso}")
+    return resultado
@@ -0,0 +1,240 @@
+"""
+Tabla resumen de asistencia por actividad mantenida mediante triggers
+
+resumen_actividades guarda para cada actividad el total de agentes asignados,
+la asistencia confirmada y la pendiente. Los triggers sobre actividades y
+agentes_actividades la actualizan de forma incremental en cada escritura, y
+vista_actividades_con_agentes lee de ella en lugar de agrupar la tabla de
+asignaciones en cada consulta.
+
+Uso:
+    python -m src.database.resumen --reconstruir
+"""
+
+import argparse
+import sqlite3
+
+from src.database.pool import DATABASE_PATH
+from src.database.pragmas import aplicar_pragmas
+
+SQL_TABLA_RESUMEN = """
+CREATE TABLE IF NOT EXISTS resumen_actividades (
+    actividad_id INTEGER PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    turno_id INTEGER,
+    curso_id INTEGER,
+    monitor_nip TEXT,
+    total_agentes INTEGER NOT NULL DEFAULT 0,
+    asistencia_confirmada INTEGER NOT NULL DEFAULT 0,
+    asistencia_pendiente INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+SQL_TRIGGERS_RESUMEN = [
+    # Altas, cambios y bajas de actividades
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumen_actividad_insert
+    AFTER INSERT ON actividades
+    BEGIN
+        INSERT OR REPLACE INTO resumen_actividades (
+            actividad_id, fecha, turno_id, curso_id, monitor_nip,
+            total_agentes, asistencia_confirmada, asistencia_pendiente
+        )
+        SELECT
+            NEW.id, NEW.fecha, NEW.turno_id, NEW.curso_id, NEW.monitor_nip,
+            COUNT(agente_nip),
+            COALESCE(SUM(CASE WHEN asistencia = 1 THEN 1 ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN asistencia IS NULL THEN 1 ELSE 0 END), 0)
+        FROM agentes_actividades
+        WHERE actividad_id = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumen_actividad_update
+    AFTER UPDATE OF id, fecha, turno_id, curso_id, monitor_nip ON actividades
+    BEGIN
+        UPDATE resumen_actividades
+        SET actividad_id = NEW.id,
+            fecha = NEW.fecha,
+            turno_id = NEW.turno_id,
+            curso_id = NEW.curso_id,
+            monitor_nip = NEW.monitor_nip
+        WHERE actividad_id = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumen_actividad_delete
+    AFTER DELETE ON actividades
+    BEGIN
+        DELETE FROM resumen_actividades WHERE actividad_id = OLD.id;
+    END
+    """,
+    # Asignaciones de agentes y asistencia
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumen_asignacion_insert
+    AFTER INSERT ON agentes_actividades
+    BEGIN
+        UPDATE resumen_actividades
+        SET total_agentes = total_agentes + 1,
+            asistencia_confirmada = asistencia_confirmada + (CASE WHEN NEW.asistencia = 1 THEN 1 ELSE 0 END),
+            asistencia_pendiente = asistencia_pendiente + (CASE WHEN NEW.asistencia IS NULL THEN 1 ELSE 0 END)
+        WHERE actividad_id = NEW.actividad_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumen_asignacion_delete
+    AFTER DELETE ON agentes_actividades
+    BEGIN
+        UPDATE resumen_actividades
+        SET total_agentes = total_agentes - 1,
+            asistencia_confirmada = asistencia_confirmada - (CASE WHEN OLD.asistencia = 1 THEN 1 ELSE 0 END),
+            asistencia_pendiente = asistencia_pendiente - (CASE WHEN OLD.asistencia IS NULL THEN 1 ELSE 0 END)
+        WHERE actividad_id = OLD.actividad_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumen_asignacion_update
+    AFTER UPDATE OF actividad_id, asistencia ON agentes_actividades
+    BEGIN
+        UPDATE resumen_actividades
+        SET total_agentes = total_agentes - 1,
+            asistencia_confirmada = asistencia_confirmada - (CASE WHEN OLD.asistencia = 1 THEN 1 ELSE 0 END),
+            asistencia_pendiente = asistencia_pendiente - (CASE WHEN OLD.asistencia IS NULL THEN 1 ELSE 0 END)
+        WHERE actividad_id = OLD.actividad_id;
+        UPDATE resumen_actividades
+        SET total_agentes = total_agentes + 1,
+            asistencia_confirmada = asistencia_confirmada + (CASE WHEN NEW.asistencia = 1 THEN 1 ELSE 0 END),
+            asistencia_pendiente = asistencia_pendiente + (CASE WHEN NEW.asistencia IS NULL THEN 1 ELSE 0 END)
+        WHERE actividad_id = NEW.actividad_id;
+    END
+    """,
+]
+
+# La vista mantiene el nombre y las columnas de la versión agrupada original
+# salvo el estado, que depende del día y se calcula al leerla con una fecha de
+# referencia explícita (analisis.con_estado); así el resultado de la vista solo
+# cambia cuando cambian los datos
+SQL_VISTA_RESUMEN = """
+CREATE VIEW vista_actividades_con_agentes AS
+SELECT
+    r.actividad_id,
+    r.fecha,
+    t.nombre as turno_nombre,
+    c.nombre as curso_nombre,
+    COALESCE(m.nombre || ' ' || m.apellido1 || CASE WHEN m.apellido2 IS NOT NULL THEN ' ' || m.apellido2 ELSE '' END, 'Sin monitor') as monitor_nombre,
+    r.total_agentes,
+    r.asistencia_confirmada,
+    r.asistencia_pendiente,
+    CASE
+        WHEN r.total_agentes > 0 THEN
+            ROUND(r.asistencia_confirmada * 100.0 / r.total_agentes, 2)
+        ELSE 0
+    END as asistencia_porcentaje,
+    strftime('%w', r.fecha) as dia_semana_num,
+    CASE strftime('%w', r.fecha)
+        WHEN '0' THEN 'Domingo'
+        WHEN '1' THEN 'Lunes'
+        WHEN '2' THEN 'Martes'
+        WHEN '3' THEN 'Miércoles'
+        WHEN '4' THEN 'Jueves'
+        WHEN '5' THEN 'Viernes'
+        WHEN '6' THEN 'Sábado'
+    END as dia_semana,
+    strftime('%m', r.fecha) as mes_num,
+    CASE strftime('%m', r.fecha)
+        WHEN '01' THEN 'Enero'
+        WHEN '02' THEN 'Febrero'
+        WHEN '03' THEN 'Marzo'
+        WHEN '04' THEN 'Abril'
+        WHEN '05' THEN 'Mayo'
+        WHEN '06' THEN 'Junio'
+        WHEN '07' THEN 'Julio'
+        WHEN '08' THEN 'Agosto'
+        WHEN '09' THEN 'Septiembre'
+        WHEN '10' THEN 'Octubre'
+        WHEN '11' THEN 'Noviembre'
+        WHEN '12' THEN 'Diciembre'
+    END as mes,
+    strftime('%Y', r.fecha) as anio,
+    strftime('%W', r.fecha) as semana_del_anio
+FROM
+    resumen_actividades r
+LEFT JOIN
+    turno t ON r.turno_id = t.id
+LEFT JOIN
+    cursos c ON r.curso_id = c.id
+LEFT JOIN
+    monitores m ON r.monitor_nip = m.nip
+ORDER BY
+    r.fecha DESC
+"""
+
+
+def reconstruir_resumen_actividades(conn):
+    """Recalcula por completo la tabla resumen a partir de las asignaciones (sin confirmar)"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM resumen_actividades")
+    cursor.execute("""
+        INSERT INTO resumen_actividades (
+            actividad_id, fecha, turno_id, curso_id, monitor_nip,
+            total_agentes, asistencia_confirmada, asistencia_pendiente
+        )
+        SELECT
+            a.id, a.fecha, a.turno_id, a.curso_id, a.monitor_nip,
+            COUNT(aa.agente_nip),
+            SUM(CASE WHEN aa.asistencia = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN aa.agente_nip IS NOT NULL AND aa.asistencia IS NULL THEN 1 ELSE 0 END)
+        FROM actividades a
+        LEFT JOIN agentes_actividades aa ON aa.actividad_id = a.id
+        GROUP BY a.id
+    """)
+    return cursor.rowcount
+
+
+def crear_vista_actividades(conn):
+    """Vuelve a crear vista_actividades_con_agentes con la definición actual (sin confirmar)"""
+    cursor = conn.cursor()
+    cursor.execute("DROP VIEW IF EXISTS vista_actividades_con_agentes")
+    cursor.execute(SQL_VISTA_RESUMEN)
+
+
+def crear_resumen_actividades(conn):
+    """
+    Crea la tabla resumen, sus triggers y la vista que la lee
+
+    Es idempotente: si la tabla ya existía solo se asegura de que los triggers
+    y la vista estén creados; si es nueva se rellena a partir de los datos.
+    No confirma la transacción: así una migración puede aplicarlo junto con su
+    registro en schema_version.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'resumen_actividades'"
+    )
+    existia = cursor.fetchone()[0] > 0
+
+    cursor.execute(SQL_TABLA_RESUMEN)
+    for trigger in SQL_TRIGGERS_RESUMEN:
+        cursor.execute(trigger)
+    crear_vista_actividades(conn)
+
+    if not existia:
+        reconstruir_resumen_actividades(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tabla resumen de asistencia por actividad")
+    parser.add_argument("--database", default=DATABASE_PATH, help="Ruta a la base de datos")
+    parser.add_argument("--reconstruir", action="store_true", help="Recalcula la tabla resumen completa")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    aplicar_pragmas(conn)
+    crear_resumen_actividades(conn)
+    if args.reconstruir:
+        filas = reconstruir_resumen_actividades(conn)
+        print(f"Tabla resumen_actividades reconstruida con {filas} actividades.")
+    else:
+        print("Tabla resumen_actividades creada y actualizada por triggers.")
+    conn.commit()
+    conn.close()
@@ -0,0 +1,51 @@
+"""
+Índices clave→etiqueta para los selectores de Streamlit
+
+Los format_func de los selectbox buscaban la etiqueta de cada opción con una
+máscara booleana sobre el DataFrame completo, lo que recorre la tabla una vez
+por opción. IndiceEtiquetas se construye una sola vez por versión de los datos
+y resuelve cada etiqueta con una búsqueda en un diccionario.
+"""
+
+import numbers
+
+
+class IndiceEtiquetas:
+    """
+    Diccionario inmutable clave→etiqueta utilizable directamente como format_func
+
+    Args:
+        claves: Iterable de claves (NIP, ID...)
+        etiquetas: Iterable de etiquetas en el mismo orden que las claves
+        formato: Plantilla con {clave} y {etiqueta} que devuelve formatear()
+    """
+
+    def __init__(self, claves, etiquetas, formato="{etiqueta}"):
+        # Las claves numéricas de pandas (numpy.int64) se guardan como int de Python
+        self._etiquetas = {
+            int(clave) if isinstance(clave, numbers.Integral) else clave: etiqueta
+            for clave, etiqueta in zip(claves, etiquetas)
+        }
+        self.formato = formato
+
+    def etiqueta(self, clave, por_defecto=""):
+        """Devuelve la etiqueta de una clave o por_defecto si no existe"""
+        return self._etiquetas.get(clave, por_defecto)
+
+    def formatear(self, clave):
+        """Devuelve el texto de una opción del selector ('' para la opción vacía)"""
+        if clave == "" or clave is None:
+            return ""
+        return self.formato.format(clave=clave, etiqueta=self.etiqueta(clave))
+
+    __call__ = formatear
+
+    def claves(self):
+        """Devuelve las claves en el orden en que se construyó el índice"""
+        return list(self._etiquetas)
+
+    def __contains__(self, clave):
+        return clave in self._etiquetas
+
+    def __len__(self):
+        return len(self._etiquetas)
@@ -1,6 +1,10 @@
 import requests
 import json
+import threading
+from collections import OrderedDict
+
 import streamlit as st
+from requests.structures import CaseInsensitiveDict
 
 # URL base de la API
 API_BASE_URL = "http://localhost:8000"
@@ -15,15 +19,69 @@ def handle_api_error(response):
     
     return error_message
 
+# Número máximo de respuestas guardadas para revalidar
+MAX_COPIAS_HTTP = 64
+
+class CopiasHTTP:
+    """Últimas respuestas de la API con su ETag, para revalidarlas con If-None-Match"""
+
+    def __init__(self, max_entradas=MAX_COPIAS_HTTP):
+        self.max_entradas = max_entradas
+        self._copias = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            copia = self._copias.get(clave)
+            if copia is not None:
+                self._copias.move_to_end(clave)
+            return copia
+
+    def guardar(self, clave, etag, datos, cabeceras):
+        with self._lock:
+            self._copias[clave] = (etag, datos, cabeceras)
+            self._copias.move_to_end(clave)
+            while len(self._copias) > self.max_entradas:
+                self._copias.popitem(last=False)
+
+@st.cache_resource
+def copias_http():
+    """Devuelve el registro de copias compartido por todas las sesiones"""
+    return CopiasHTTP()
+
+def get_revalidado(ruta, params=None):
+    """
+    GET que revalida la última copia de la misma URL en lugar de descargarla de nuevo
+
+    Returns:
+        Tupla (response, datos, cabeceras): con 200 o 304 datos es el JSON de
+        la respuesta (el guardado si es 304) y cabeceras las de la respuesta
+        completa; con cualquier otro estado datos es None
+    """
+    clave = (ruta, tuple(sorted((params or {}).items())))
+    copia = copias_http().obtener(clave)
+    cabeceras_peticion = {"If-None-Match": copia[0]} if copia else {}
+    response = requests.get(f"{API_BASE_URL}{ruta}", params=params, headers=cabeceras_peticion)
+    if response.status_code == 304 and copia:
+        return response, copia[1], copia[2]
+    if response.status_code == 200:
+        datos = response.json()
+        cabeceras = CaseInsensitiveDict(response.headers)
+        etag = cabeceras.get("ETag")
+        if etag:
+            copias_http().guardar(clave, etag, datos, cabeceras)
+        return response, datos, cabeceras
+    return response, None, CaseInsensitiveDict()
+
 # Funciones para interactuar con la API
 
-@st.cache_data(ttl=60)  # Caché de 60 segundos
+@st.cache_data(ttl=60)  # Caché de 60 segundos; después se revalida con la ETag
 def get_agentes_http():
     """Obtiene la lista de agentes desde la API"""
     try:
-        response = requests.get(f"{API_BASE_URL}/agentes")
-        if response.status_code == 200:
-            return response.json()
+        response, agentes, _ = get_revalidado("/agentes")
+        if agentes is not None:
+            return agentes
         else:
             st.error(handle_api_error(response))
             return []
@@ -34,9 +92,9 @@ def get_agentes_http():
 def get_agente_http(nip):
     """Obtiene un agente específico por su NIP"""
     try:
-        response = requests.get(f"{API_BASE_URL}/agentes/{nip}")
-        if response.status_code == 200:
-            return response.json()
+        response, agente, _ = get_revalidado(f"/agentes/{nip}")
+        if agente is not None:
+            return agente
         else:
             st.error(handle_api_error(response))
             return None
@@ -107,27 +165,88 @@ def delete_agente_http(nip):
     except Exception as e:
         return False, f"Error de conexión: {str(e)}"
 
-@st.cache_data(ttl=60)  # Caché de 60 segundos
-def get_actividades_http():
-    """Obtiene la lista de actividades desde la API"""
+def _get_pagina(ruta, params):
+    """Pide un listado con sus filtros; devuelve (filas, cursor de la página siguiente)"""
+    params = {clave: valor for clave, valor in params.items() if valor is not None}
+    if "fields" in params and not isinstance(params["fields"], str):
+        params["fields"] = ",".join(params["fields"])
     try:
-        response = requests.get(f"{API_BASE_URL}/actividades")
-        if response.status_code == 200:
-            return response.json()
+        response, filas, cabeceras = get_revalidado(ruta, params)
+        if filas is not None:
+            return filas, cabeceras.get("X-Next-Cursor")
         else:
             st.error(handle_api_error(response))
-            return []
+            return [], None
     except Exception as e:
         st.error(f"Error de conexión: {str(e)}")
-        return []
+        return [], None
 
-@st.cache_data(ttl=60)  # Caché de 60 segundos
+@st.cache_data(ttl=60)  # Caché de 60 segundos; después se revalida con la ETag
+def get_actividades_http(fecha_desde=None, fecha_hasta=None, curso=None, turno=None, sort=None, fields=None):
+    """Obtiene las actividades desde la API, filtradas en el servidor"""
+    actividades, _ = _get_pagina("/actividades", {
+        "fecha_desde": fecha_desde,
+        "fecha_hasta": fecha_hasta,
+        "curso": curso,
+        "turno": turno,
+        "sort": sort,
+        "fields": fields,
+    })
+    return actividades
+
+@st.cache_data(ttl=60)  # Caché de 60 segundos; después se revalida con la ETag
+def get_pagina_actividades_http(limit, cursor=None, fecha_desde=None, fecha_hasta=None, curso=None, turno=None, sort=None, fields=None):
+    """Obtiene una página de actividades; devuelve (actividades, cursor de la siguiente o None)"""
+    return _get_pagina("/actividades", {
+        "limit": limit,
+        "cursor": cursor,
+        "fecha_desde": fecha_desde,
+        "fecha_hasta": fecha_hasta,
+        "curso": curso,
+        "turno": turno,
+        "sort": sort,
+        "fields": fields,
+    })
+
+@st.cache_data(ttl=60)  # Caché de 60 segundos; después se revalida con la ETag
+def get_pagina_agentes_http(limit, cursor=None, seccion=None, grupo=None, q=None, sort=None, fields=None):
+    """Obtiene una página de agentes; devuelve (agentes, cursor de la siguiente o None)"""
+    return _get_pagina("/agentes", {
+        "limit": limit,
+        "cursor": cursor,
+        "seccion": seccion,
+        "grupo": grupo,
+        "q": q,
+        "sort": sort,
+        "fields": fields,
+    })
+
+@st.cache_data(ttl=60)  # Caché de 60 segundos; después se revalida con la ETag
 def get_agentes_actividad_http(actividad_id):
     """Obtiene los agentes asignados a una actividad específica"""
     try:
-        response = requests.get(f"{API_BASE_URL}/actividades/{actividad_id}/agentes")
-        if response.status_code == 200:
-            return response.json()
+        response, agentes, _ = get_revalidado(f"/actividades/{actividad_id}/agentes")
+        if agentes is not None:
+            return agentes
+        else:
+            st.error(handle_api_error(response))
+            return []
+    except Exception as e:
+        st.error(f"Error de conexión: {str(e)}")
+        return []
+
+@st.cache_data(ttl=60)  # Caché de 60 segundos; después se revalida con la ETag
+def get_actividades_con_agentes_http(ids=None, fecha_desde=None, fecha_hasta=None):
+    """Obtiene en una petición varias actividades (por IDs o rango de fechas) con sus agentes"""
+    params = {"fecha_desde": fecha_desde, "fecha_hasta": fecha_hasta}
+    if ids is not None:
+        params["ids"] = ",".join(str(actividad_id) for actividad_id in ids)
+    try:
+        response, actividades, _ = get_revalidado(
+            "/actividades/detalle", {clave: valor for clave, valor in params.items() if valor is not None}
+        )
+        if actividades is not None:
+            return actividades
         else:
             st.error(handle_api_error(response))
             return []
@@ -0,0 +1,110 @@
+"""
+Caché de datos de Streamlit invalidada por tabla
+
+Cada función cacheada declara las tablas que lee. Las funciones de escritura
+incrementan la versión de las tablas que modifican, de forma que solo se
+vuelven a calcular las entradas que dependen de ellas en lugar de vaciar toda
+la caché con st.cache_data.clear().
+"""
+
+import functools
+import threading
+
+import streamlit as st
+
+
+class VersionesTablas:
+    """Contador de versiones por tabla compartido por todas las sesiones"""
+
+    def __init__(self):
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, tablas):
+        """Devuelve la tupla de versiones actuales de las tablas indicadas"""
+        with self._lock:
+            return tuple(self._versiones.get(tabla, 0) for tabla in tablas)
+
+    def incrementar(self, *tablas):
+        """Marca las tablas indicadas como modificadas"""
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+
+@st.cache_resource
+def versiones_tablas():
+    """Devuelve el registro de versiones del proceso"""
+    return VersionesTablas()
+
+
+def cache_tablas(*tablas, ttl=300):
+    """
+    Decorador equivalente a st.cache_data(ttl=ttl) que depende de unas tablas
+
+    Args:
+        tablas: Nombres de las tablas que lee la función
+        ttl: Tiempo de vida de las entradas en segundos
+
+    Returns:
+        Decorador que cachea la función por argumentos y versión de sus tablas
+    """
+    def decorador(func):
+        # La versión se pasa como argumento con nombre para que forme parte de
+        # la clave de caché sin alterar el resto de argumentos de la función
+        @functools.wraps(func)
+        def con_version(*args, version_tablas=None, **kwargs):
+            return func(*args, **kwargs)
+
+        cacheada = st.cache_data(ttl=ttl)(con_version)
+
+        @functools.wraps(func)
+        def cargar(*args, **kwargs):
+            version = versiones_tablas().obtener(tablas)
+            return cacheada(*args, version_tablas=version, **kwargs)
+
+        cargar.tablas = tablas
+        cargar.clear = cacheada.clear
+        return cargar
+
+    return decorador
+
+
+def recurso_tablas(*tablas, max_entries=8):
+    """
+    Decorador equivalente a st.cache_resource que depende de unas tablas
+
+    A diferencia de cache_tablas, todas las sesiones reciben el mismo objeto en
+    lugar de una copia, por lo que el resultado debe tratarse como de solo
+    lectura. Se usa para datos grandes que no conviene copiar en cada sesión.
+
+    Args:
+        tablas: Nombres de las tablas que lee la función
+        max_entries: Número máximo de versiones que se conservan
+
+    Returns:
+        Decorador que comparte el resultado por argumentos y versión de sus tablas
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def con_version(*args, version_tablas=None, **kwargs):
+            return func(*args, **kwargs)
+
+        compartida = st.cache_resource(max_entries=max_entries)(con_version)
+
+        @functools.wraps(func)
+        def cargar(*args, **kwargs):
+            version = versiones_tablas().obtener(tablas)
+            return compartida(*args, version_tablas=version, **kwargs)
+
+        cargar.tablas = tablas
+        cargar.version = lambda: versiones_tablas().obtener(tablas)
+        cargar.clear = compartida.clear
+        return cargar
+
+    return decorador
+
+
+def invalidar_tablas(*tablas):
+    """Invalida las entradas de caché que dependen de las tablas indicadas"""
+    versiones_tablas().incrementar(*tablas)